@@ -1,29 +1,148 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
 import json
 import io
 import hashlib
+import os
+import sqlite3
+import time
+import uuid
+from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
-try:
-    from docx import Document
-    from docx.enum.table import WD_TABLE_ALIGNMENT
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    from docx.oxml import parse_xml
-    from docx.oxml.ns import nsdecls
-    from docx.shared import Pt
-    DOCX_AVAILABLE = True
-except ModuleNotFoundError:
-    DOCX_AVAILABLE = False
+from resource_core import (
+    BAND_LEVELS,
+    BRACKETED_TOLERANCE,
+    DOCX_AVAILABLE,
+    FIGURE_FORMATS,
+    FIXED_POINT_TOLERANCE,
+    REJECTION_HORIZONS_DEFAULT,
+    SOLVER_BRACKETED,
+    SOLVER_FIXED_POINT,
+    SOLVER_LABELS,
+    TEST_DATA_COLUMNS,
+    TEST_DATA_LIMITS,
+    assign_unique_calculation_ids,
+    build_group_approximations,
+    build_strength_figure,
+    build_test_results_table,
+    build_word_documents,
+    cached_stage,
+    calculate_allowable_curve,
+    calculate_parameter_P,
+    calculate_pipe_stress,
+    calculate_regression_bands,
+    calculate_rejection_stress,
+    calculate_rejection_thickness,
+    calculate_residual_resource,
+    calculation_fingerprint,
+    clamp_number,
+    create_stage_cache,
+    default_test_records,
+    diff_test_data,
+    evaluate_C_candidates,
+    fit_parameter_C,
+    format_reduced_equation,
+    get_project_C,
+    hash_stage_inputs,
+    get_solver_inputs,
+    is_main_calculation,
+    make_test_dataframe,
+    next_calculation_id,
+    peek_stage,
+    prepare_tests_for_calculation,
+    read_test_excel,
+    render_figure,
+    set_default_coefficients,
+    stage_cache_stats,
+    stage_is_cached,
+    store_calculation_result,
+    stored_calculation_result,
+    student_t_critical,
+    test_data_records,
+    validate_test_data,
+)
+from materials import check_allowable_margin, get_material, material_names
+from thickness_maps import (
+    WORST_TUBES_DEFAULT,
+    build_tube_heatmap,
+    calculate_tube_rejection,
+    calculate_tube_resources,
+    rank_worst_tubes,
+    read_thickness_map,
+    reduce_tube_thickness,
+    summarize_tube_rejection,
+    summarize_tube_resources,
+)
+from background_jobs import (
+    JOB_CANCELLED,
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_POLL_SECONDS,
+    JOB_STATUS_LABELS,
+    active_jobs,
+    cancel_job,
+    find_job,
+    is_job_active,
+    remove_finished_jobs,
+    report_progress,
+    solve_calculations_job,
+    submit_job,
+)
+from columnar_store import (
+    STORE_SUFFIX,
+    TESTS_DATASET,
+    THICKNESS_DATASET,
+    THICKNESS_GROUP_COLUMNS,
+    dataset_frame,
+    describe_store,
+    open_store,
+    reduce_store_tubes,
+    write_store,
+)
+from monte_carlo import DEFAULT_UNCERTAINTY, MONTE_CARLO_SAMPLE_SIZES, run_monte_carlo
+from operating_history import (
+    SCHEDULE_COLUMNS,
+    accumulate_history_damage,
+    calculate_schedule_life,
+    parse_schedule_table,
+)
+from resource_sweep import (
+    SWEEP_DEFAULT_POINTS,
+    SWEEP_MAX_POINTS,
+    build_sweep_figure,
+    calculate_resource_sweep,
+    sweep_axis,
+    sweep_table,
+)
+from sensitivity import (
+    SENSITIVITY_PARAMETERS,
+    SENSITIVITY_STEP,
+    SENSITIVITY_STEP_RANGE,
+    build_tornado_figure,
+    calculate_sensitivity,
+    sensitivity_C_values,
+)
+from project_db import (
+    DB_SUFFIX,
+    calculation_history,
+    distinct_values,
+    list_projects,
+    load_project,
+    open_shared_database,
+    query_calculations,
+    save_project,
+)
+from fleet_rollup import FLEET_INDEX_FILE, fleet_table, load_fleet_index, summarize_fleet, update_fleet_index
 
 st.set_page_config(page_title="Расчёт остаточного ресурса змеевиков", layout="wide")
 st.title("Определение остаточного ресурса змеевиков ВРЧ")
 
 # --- Инициализация session_state ---
-if 'test_data_input' not in st.session_state:
-    st.session_state.test_data_input = []
+if 'test_data_changelog' not in st.session_state:
+    st.session_state.test_data_changelog = []
+if 'test_data_base_version' not in st.session_state:
+    st.session_state.test_data_base_version = 0
 if 'widget_prefix' not in st.session_state:
     st.session_state.widget_prefix = "default"
 if 'steel_grade' not in st.session_state:
@@ -32,128 +151,226 @@ if 'selected_param' not in st.session_state:
     st.session_state.selected_param = "Трунина"
 if 'resource_calculations' not in st.session_state:
     st.session_state.resource_calculations = []
+if 'last_calculation_id' not in st.session_state:
+    st.session_state.last_calculation_id = 0
 if 'group_names' not in st.session_state:
     st.session_state.group_names = {}
 if 'show_calculation_results' not in st.session_state:
     st.session_state.show_calculation_results = False
 if 'active_calculation_id' not in st.session_state:
     st.session_state.active_calculation_id = None
+if 'solver_warm_start' not in st.session_state:
+    st.session_state.solver_warm_start = {}
+if 'stage_cache' not in st.session_state:
+    st.session_state.stage_cache = create_stage_cache()
+if 'fitted_C' not in st.session_state:
+    st.session_state.fitted_C = {}
+if 'data_store' not in st.session_state:
+    st.session_state.data_store = None
+if 'project_defaults' not in st.session_state:
+    st.session_state.project_defaults = None
+if 'last_resource_sweep' not in st.session_state:
+    st.session_state.last_resource_sweep = None
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = {}
+
+# Файлы Excel больше этого размера читаются фоновой задачей, байт
+EXCEL_BACKGROUND_BYTES = 2 * 2**20
+
+
+def log_test_data_change(action: str, test_data: pd.DataFrame, diff: Optional[Dict] = None) -> None:
+    """Добавляет запись в журнал изменений данных испытаний (журнал только дополняется)."""
+    entry = {
+        "ревизия": len(st.session_state.test_data_changelog) + 1,
+        "время": datetime.now().isoformat(timespec='seconds'),
+        "действие": action,
+        "строк": len(test_data)
+    }
+    entry.update(diff or {})
+    st.session_state.test_data_changelog.append(entry)
+
 
+def set_test_data(records, action: str) -> None:
+    """Заменяет таблицу испытаний целиком (загрузка, добавление строк) и сбрасывает редактор."""
+    test_data = make_test_dataframe(records)
+    st.session_state.test_data = test_data
+    st.session_state.test_data_base = test_data
+    st.session_state.test_data_base_version += 1
+    log_test_data_change(action, test_data)
 
-def clamp_number(value, min_value, max_value):
-    return max(min_value, min(float(value), float(max_value)))
 
+@st.cache_data(max_entries=16, show_spinner=False)
+def parse_test_excel(content_hash: str, _excel_bytes: bytes) -> Tuple[List[Dict], List[str]]:
+    """Читает испытания из Excel; результат кэшируется по хэшу содержимого файла."""
+    return read_test_excel(_excel_bytes)
 
-def calculate_pipe_stress(p_MPa: float, d_max: float, s_min: float) -> float:
-    return (float(p_MPa) / 2) * (float(d_max) / float(s_min) + 1)
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def parse_thickness_map(content_hash: str, _data: bytes, filename: str) -> Tuple[pd.DataFrame, pd.DataFrame, List[str]]:
+    """Читает карту толщин и сводит ее по трубам; кэшируется по хэшу содержимого файла."""
+    readings, missing_columns = read_thickness_map(_data, filename)
+    if missing_columns:
+        return readings, pd.DataFrame(), missing_columns
+    return readings, reduce_tube_thickness(readings), []
+
+
+def apply_finished_jobs() -> None:
+    """Переносит результаты фоновых задач в состояние сессии.
+
+    Рабочие потоки не изменяют session_state: готовые расчеты сохраняются в
+    расчетах, а документы Word — в кэше этапов только здесь, при перезапуске.
+    """
+    calculations = {calc['id']: calc for calc in st.session_state.resource_calculations}
+    for job in list(st.session_state.jobs.values()):
+        finished = not is_job_active(job)
+        if job['kind'] == "calculations":
+            partial = job['partial'][job['partial_applied']:]
+            for calc_id, fingerprint, tau_prognoz, details in partial:
+                if calc_id in calculations:
+                    store_calculation_result(calculations[calc_id], fingerprint, tau_prognoz, details)
+            job['partial_applied'] += len(partial)
+        elif job['kind'] == "word" and finished and not job['handled'] and job['status'] == JOB_DONE:
+            cached_stage(st.session_state.stage_cache, "Word", job['payload']['inputs'], lambda: job['result'])
+        if finished:
+            job['handled'] = True
+
+
+def background_calculation_ids() -> set:
+    """Идентификаторы расчетов, которые сейчас решаются в фоне."""
+    return {calc_id for job in active_jobs(st.session_state.jobs, "calculations")
+            for calc_id in job['payload']['calc_ids']}
+
+
+apply_finished_jobs()
+
+
+def parse_number_list(text: str) -> List[float]:
+    """Числа через запятую или точку с запятой; некорректные значения пропускаются."""
+    values = []
+    for item in text.replace(";", ",").split(","):
+        try:
+            values.append(float(item.strip()))
+        except ValueError:
+            continue
+    return values
 
 
 # --- Загрузка / сохранение проекта ---
 st.sidebar.header("📁 Сохранить / загрузить проект")
 uploaded_file = st.sidebar.file_uploader("Загрузите проект (.json)", type=["json"])
 uploaded_excel = st.sidebar.file_uploader("Загрузите данные испытаний (.xlsx, .xls)", type=["xlsx", "xls"])
-project_data = None
 
-# Управление префиксом ключей для сброса кэша виджетов при загрузке
+
+def apply_project(project_data: Dict, project_hash: str) -> None:
+    """Применяет загруженный проект к состоянию сессии; вызывается один раз на содержимое файла."""
+    selected_param = project_data.get("выбранный_параметр", "Трунина")
+    selected_steel = project_data.get("марка_стали", "12Х1МФ")
+    # Префикс ключей сбрасывает кэш виджетов, значения по умолчанию берутся из проекта
+    st.session_state.widget_prefix = f"loaded_{project_hash[:12]}"
+    st.session_state.project_defaults = {
+        'params': project_data.get("параметры_трубы", {}),
+        'series_name': project_data.get("название_серии", "Образцы"),
+        'C_trunin': project_data.get("коэффициент_C_trunin", 24.88),
+        'C_larson': project_data.get("коэффициент_C_larson", 20.0),
+    }
+    set_test_data(project_data.get("испытания", []), "Загрузка проекта")
+    st.session_state.test_data_source = st.session_state.widget_prefix
+    st.session_state.steel_grade = selected_steel
+    st.session_state.selected_param = selected_param
+    st.session_state.fitted_C[f"{selected_steel}|{selected_param}"] = get_project_C(project_data, selected_param)
+    if 'resource_calculations' in project_data:
+        st.session_state.resource_calculations = assign_unique_calculation_ids(project_data['resource_calculations'])
+    st.session_state.group_names = project_data.get('group_names', {})
+
+
+# Проект применяется один раз на содержимое файла: пока файл лежит в загрузчике,
+# повторные перезапуски не разбирают его заново и не отменяют правки после загрузки
 if uploaded_file is not None:
-    try:
-        project_data = json.load(uploaded_file)
+    project_bytes = uploaded_file.getvalue()
+    project_hash = hashlib.md5(project_bytes).hexdigest()
+    if st.session_state.get('project_loaded_hash') != project_hash:
+        try:
+            apply_project(json.loads(project_bytes), project_hash)
+            st.session_state.project_loaded_hash = project_hash
+        except Exception as e:
+            st.sidebar.error(f"❌ Ошибка при загрузке: {e}")
+            st.session_state.widget_prefix = "default"
+    if st.session_state.get('project_loaded_hash') == project_hash:
         st.sidebar.success("✅ Проект загружен!")
-        prefix_seed = json.dumps(project_data, sort_keys=True, ensure_ascii=False)
-        st.session_state.widget_prefix = "loaded_" + str(hash(prefix_seed))[:12]
-    except Exception as e:
-        st.sidebar.error(f"❌ Ошибка при загрузке: {e}")
-        st.session_state.widget_prefix = "default"
 else:
-    pass
+    st.session_state.project_loaded_hash = None
 
 # --- Загрузка данных из Excel ---
+# Файл разбирается один раз на содержимое: пока он лежит в загрузчике, повторные
+# перезапуски не перезаписывают данные испытаний, отредактированные вручную.
+# Большой файл читается фоновой задачей, которая заполняет кэш parse_test_excel
+excel_job = None
 if uploaded_excel is not None:
+    excel_bytes = uploaded_excel.getvalue()
+    excel_hash = hashlib.md5(excel_bytes).hexdigest()
+    if len(excel_bytes) > EXCEL_BACKGROUND_BYTES and st.session_state.get('excel_loaded_hash') != excel_hash:
+        excel_job = find_job(st.session_state.jobs, "excel", excel_hash)
+        if excel_job is None:
+            excel_job = submit_job(
+                st.session_state.jobs, f"Чтение {uploaded_excel.name}", "excel",
+                lambda job: parse_test_excel(excel_hash, excel_bytes), payload={'key': excel_hash}
+            )
+if excel_job is not None and excel_job['status'] != JOB_DONE:
+    if excel_job['status'] == JOB_FAILED:
+        st.sidebar.error(f"❌ Ошибка при чтении Excel файла: {excel_job['error']}")
+    elif excel_job['status'] == JOB_CANCELLED:
+        st.sidebar.warning("Чтение файла Excel отменено")
+    else:
+        st.sidebar.info("⏳ Файл Excel читается в фоне: данные испытаний обновятся после завершения")
+elif uploaded_excel is not None:
     try:
-        excel_bytes = uploaded_excel.getvalue()
-        
-        try:
-            excel_data = pd.read_excel(io.BytesIO(excel_bytes), engine='openpyxl')
-        except Exception:
-            try:
-                excel_data = pd.read_excel(io.BytesIO(excel_bytes), engine='xlrd')
-            except Exception:
-                excel_data = pd.read_excel(io.BytesIO(excel_bytes))
-        
-        # Проверяем наличие необходимых столбцов
-        required_columns = ['Образец', 'sigma_MPa', 'T_C', 'tau_h']
-        optional_columns = ['Группа_аппроксимации', 'group_approx', 'Группа']
-        
-        # Находим столбец группы аппроксимации
-        group_col = None
-        for col_name in optional_columns:
-            if col_name in excel_data.columns:
-                group_col = col_name
-                break
-        
-        missing_columns = [col for col in required_columns if col not in excel_data.columns]
+        test_data_from_excel, missing_columns = parse_test_excel(excel_hash, excel_bytes)
         
         if missing_columns:
             st.sidebar.error(f"❌ В файле Excel отсутствуют необходимые столбцы: {missing_columns}")
             st.sidebar.info("📋 Нужные столбцы: Образец, sigma_MPa, T_C, tau_h")
         else:
-            test_data_from_excel = []
-            for _, row in excel_data.iterrows():
-                # Определяем группу аппроксимации
-                if group_col:
-                    try:
-                        group_val = int(row[group_col])
-                    except:
-                        group_val = 0
-                else:
-                    group_val = 0
-                
-                test_data_from_excel.append({
-                    "Образец": str(row['Образец']),
-                    "sigma_MPa": float(row['sigma_MPa']),
-                    "T_C": float(row['T_C']),
-                    "tau_h": float(row['tau_h']),
-                    "Группа_аппроксимации": group_val
-                })
-            
-            st.session_state.test_data_input = test_data_from_excel
+            if st.session_state.get('excel_loaded_hash') != excel_hash:
+                set_test_data(test_data_from_excel, "Загрузка из Excel")
+                st.session_state.excel_loaded_hash = excel_hash
+                st.session_state.widget_prefix = f"excel_{excel_hash[:12]}"
             st.sidebar.success(f"✅ Загружено {len(test_data_from_excel)} испытаний из Excel")
             
-            data_str = json.dumps(test_data_from_excel, sort_keys=True)
-            hash_obj = hashlib.md5(data_str.encode()).hexdigest()[:12]
-            st.session_state.widget_prefix = f"excel_{hash_obj}"
-            
     except Exception as e:
         st.sidebar.error(f"❌ Ошибка при чтении Excel файла: {str(e)}")
+else:
+    st.session_state.excel_loaded_hash = None
 
-# --- Загрузка параметров или установка значений по умолчанию ---
-if project_data is not None:
-    loaded_test_data = project_data.get("испытания", [])
-    params = project_data.get("параметры_трубы", {})
-    selected_param = project_data.get("выбранный_параметр", "Трунина")
-    selected_steel = project_data.get("марка_стали", "12Х1МФ")
-    C_trunin_val = project_data.get("коэффициент_C_trunin", 24.88)
-    C_larson_val = project_data.get("коэффициент_C_larson", 20.0)
-    series_name = project_data.get("название_серии", "Образцы")
-    st.session_state.test_data_input = loaded_test_data.copy()
-    st.session_state.steel_grade = selected_steel
-    st.session_state.selected_param = selected_param
-    if 'resource_calculations' in project_data:
-        st.session_state.resource_calculations = project_data['resource_calculations']
-    st.session_state.group_names = project_data.get('group_names', {})
+# --- Хранилище больших наборов данных ---
+# Открытие читает только манифест; массивы отображаются в память по мере обращения
+st.sidebar.header("🗄️ Хранилище данных")
+store_path = st.sidebar.text_input(f"Путь к хранилищу ({STORE_SUFFIX})", key="store_path")
+if store_path.strip():
+    try:
+        st.session_state.data_store = open_store(store_path.strip())
+        data_store = st.session_state.data_store
+        st.sidebar.dataframe(describe_store(data_store), hide_index=True)
+        # Испытания из хранилища применяются один раз на хранилище, как данные проекта
+        store_source = f"store_{data_store['manifest']['id'][:12]}"
+        if TESTS_DATASET in data_store['manifest']['datasets'] and \
+                st.session_state.get('test_data_source') != store_source:
+            set_test_data(dataset_frame(data_store, TESTS_DATASET), "Загрузка из хранилища")
+            st.session_state.test_data_source = store_source
+            st.session_state.widget_prefix = store_source
+    except (OSError, ValueError) as e:
+        st.session_state.data_store = None
+        st.sidebar.error(f"❌ Не удалось открыть хранилище: {e}")
 else:
-    params = {}
-    selected_param = "Трунина"
-    selected_steel = st.session_state.steel_grade
-    series_name = "Образцы"
-    if not st.session_state.test_data_input:
-        st.session_state.test_data_input = [{
-            "Образец": f"Обр.{i+1}", 
-            "sigma_MPa": 120.0, 
-            "T_C": 600.0, 
-            "tau_h": 500.0,
-            "Группа_аппроксимации": 0
-        } for i in range(6)]
+    st.session_state.data_store = None
+
+# --- Загрузка параметров или установка значений по умолчанию ---
+project_defaults = st.session_state.project_defaults
+params = project_defaults['params'] if project_defaults else {}
+series_name = project_defaults['series_name'] if project_defaults else "Образцы"
+selected_param = st.session_state.selected_param
+selected_steel = st.session_state.steel_grade
+if 'test_data' not in st.session_state:
+    set_test_data(default_test_records(0, 6), "Значения по умолчанию")
 
 # --- Название серии испытаний ---
 st.header("0. Название серии испытаний")
@@ -161,7 +378,7 @@ series_name = st.text_input("Введите название серии обра
 
 # --- Выбор марки стали ---
 st.header("1. Выберите марку стали")
-steel_options = ["12Х1МФ", "12Х18Н12Т", "ДИ82"]
+steel_options = material_names()
 selected_steel = st.selectbox(
     "Марка стали",
     options=steel_options,
@@ -179,233 +396,12 @@ selected_param = st.selectbox(
 )
 st.session_state.selected_param = selected_param
 
-# --- Автоматическая установка коэффициентов в зависимости от марки стали ---
-def set_default_coefficients(steel_grade: str, parameter: str) -> float:
-    """Устанавливает коэффициенты по умолчанию в зависимости от марки стали и параметра."""
-    coefficients = {
-        "12Х1МФ": {
-            "Трунина": 24.88,
-            "Ларсона-Миллера": 20.0
-        },
-        "12Х18Н12Т": {
-            "Трунина": 26.3,
-            "Ларсона-Миллера": 20.0
-        },
-        "ДИ82": {
-            "Трунина": 39.87,
-            "Ларсона-Миллера": 30.0
-        }
-    }
-    return coefficients.get(steel_grade, {}).get(parameter, 20.0)
-
-
-def format_approximation_equation(a: float, b: float, selected_param: str) -> str:
-    """Возвращает уравнение аппроксимации в понятном виде."""
-    sign = "+" if b >= 0 else "-"
-    return f"lg(σ) = {a:.4f} · P {sign} {abs(b):.4f}"
-
-
-def build_regression(P_values: np.ndarray, sigma_values: np.ndarray) -> Tuple[float, float, float]:
-    """Строит линейную регрессию lg(σ) = a·P + b и возвращает a, b, R²."""
-    X = np.asarray(P_values, dtype=float)
-    sigma = np.asarray(sigma_values, dtype=float)
-    y = np.log10(sigma)
-    A = np.vstack([X, np.ones(len(X))]).T
-    a, b = np.linalg.lstsq(A, y, rcond=None)[0]
-    y_pred = a * X + b
-    ss_tot = np.sum((y - np.mean(y)) ** 2)
-    ss_res = np.sum((y - y_pred) ** 2)
-    R2 = 1 - ss_res / ss_tot if ss_tot != 0 else 1.0
-    return float(a), float(b), float(R2)
-
-
-def format_reduced_equation(a: float, b: float) -> str:
-    """Возвращает уравнение регрессии для напряжений, сниженных на коэффициент запаса."""
-    sign = "+" if b >= 0 else "-"
-    return f"lg(σ) = {a:.4f} · P {sign} {abs(b):.4f}"
-
-
-def format_word_table_number(value: float) -> str:
-    """Форматирует число для таблицы Word без лишних нулей."""
-    numeric_value = float(value)
-    if numeric_value.is_integer():
-        return str(int(numeric_value))
-    return f"{numeric_value:.2f}".rstrip("0").rstrip(".").replace('.', ',')
-
-
-def build_test_results_table(df_tests: pd.DataFrame) -> pd.DataFrame:
-    """Формирует таблицу режимов и результатов испытаний из введенных данных."""
-    if df_tests.empty:
-        return pd.DataFrame(columns=[
-            "Образец",
-            "Напряжение, σ, МПа",
-            "Температура, °C",
-            "Длительность испытания, ч"
-        ])
-
-    table_df = df_tests.copy()
-    table_df = table_df.rename(columns={
-        "sigma_MPa": "Напряжение, σ, МПа",
-        "T_C": "Температура, °C",
-        "tau_h": "Длительность испытания, ч"
-    })
-
-    desired_columns = [
-        "Образец",
-        "Напряжение, σ, МПа",
-        "Температура, °C",
-        "Длительность испытания, ч"
-    ]
-    table_df = table_df[desired_columns]
-
-    numeric_columns = [
-        "Напряжение, σ, МПа",
-        "Температура, °C",
-        "Длительность испытания, ч"
-    ]
-    for column in numeric_columns:
-        table_df[column] = table_df[column].round().astype(int)
-
-    return table_df
-
-
-def create_word_test_table(series_name: str, df_tests: pd.DataFrame) -> io.BytesIO:
-    """Создает Word-файл с таблицей режимов и результатов испытаний."""
-    if not DOCX_AVAILABLE:
-        raise ModuleNotFoundError("python-docx не установлен")
-
-    table_df = build_test_results_table(df_tests)
-    doc = Document()
-    style = doc.styles["Normal"]
-    style.font.name = "Times New Roman"
-    style.font.size = Pt(14)
-
-    title = doc.add_paragraph()
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    title_run = title.add_run("Таблица 1 — Режимы и результаты испытания образцов на длительную прочность")
-    title_run.font.name = "Times New Roman"
-    title_run.font.size = Pt(14)
-
-    if series_name.strip():
-        series_paragraph = doc.add_paragraph()
-        series_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        series_run = series_paragraph.add_run(f"Серия образцов: {series_name}")
-        series_run.font.name = "Times New Roman"
-        series_run.font.size = Pt(14)
-
-    doc.add_paragraph("")
-    table = doc.add_table(rows=1, cols=len(table_df.columns))
-    table.style = "Table Grid"
-    table.alignment = WD_TABLE_ALIGNMENT.CENTER
-
-    for i, header in enumerate(table_df.columns):
-        cell = table.rows[0].cells[i]
-        p = cell.paragraphs[0]
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        run = p.add_run(header)
-        run.bold = True
-        run.font.name = "Times New Roman"
-        run.font.size = Pt(14)
-
-    for _, row in table_df.iterrows():
-        cells = table.add_row().cells
-        values = [
-            str(row["Образец"]),
-            format_word_table_number(row["Напряжение, σ, МПа"]),
-            format_word_table_number(row["Температура, °C"]),
-            format_word_table_number(row["Длительность испытания, ч"]),
-        ]
-        for i, value in enumerate(values):
-            p = cells[i].paragraphs[0]
-            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            run = p.add_run(value)
-            run.font.name = "Times New Roman"
-            run.font.size = Pt(14)
-
-    output = io.BytesIO()
-    doc.save(output)
-    output.seek(0)
-    return output
-
-
-def create_word_report(series_name: str, df_tests: pd.DataFrame, selected_param: str, c_value: float) -> io.BytesIO:
-    """Создает Word-отчет по испытаниям."""
-    if not DOCX_AVAILABLE:
-        raise ModuleNotFoundError("python-docx не установлен")
-
-    doc = Document()
-    style = doc.styles["Normal"]
-    style.font.name = "Times New Roman"
-    style.font.size = Pt(14)
-
-    title = doc.add_paragraph()
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    r = title.add_run(f"Отчет по испытаниям — {series_name}")
-    r.bold = True
-    r.font.name = "Times New Roman"
-    r.font.size = Pt(14)
-
-    subtitle = doc.add_paragraph()
-    subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    r2 = subtitle.add_run(f"Параметр долговечности: {selected_param}")
-    r2.font.name = "Times New Roman"
-    r2.font.size = Pt(14)
-
-    doc.add_paragraph("")
-    table = doc.add_table(rows=1, cols=5)
-    table.style = "Table Grid"
-    table.alignment = WD_TABLE_ALIGNMENT.CENTER
-
-    headers = [
-        "Образец",
-        "Напряжение, МПа",
-        "Температура, °C",
-        "Время, ч",
-        "РТр",
-    ]
-
-    for i, header in enumerate(headers):
-        cell = table.rows[0].cells[i]
-        cell._tc.get_or_add_tcPr().append(
-            parse_xml(r'<w:shd {} w:fill="F2F2F2"/>'.format(nsdecls('w')))
-        )
-        p = cell.paragraphs[0]
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        rr = p.add_run(header)
-        rr.bold = True
-        rr.font.name = "Times New Roman"
-        rr.font.size = Pt(14)
-
-    for _, row in df_tests.iterrows():
-        T_K = float(row["T_C"]) + 273.15
-        tau_h = float(row["tau_h"])
-        if selected_param == "Трунина":
-            p_value = T_K * (np.log10(tau_h) - 2 * np.log10(T_K) + c_value) * 1e-3
-        else:
-            p_value = T_K * (np.log10(tau_h) + c_value) * 1e-3
-
-        values = [
-            str(row["Образец"]),
-            f"{round(float(row['sigma_MPa']))}".replace('.', ','),
-            f"{round(float(row['T_C']))}".replace('.', ','),
-            f"{round(float(row['tau_h']))}".replace('.', ','),
-            f"{p_value:.2f}".replace('.', ','),
-        ]
-        cells = table.add_row().cells
-        for i, value in enumerate(values):
-            p = cells[i].paragraphs[0]
-            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            rr = p.add_run(value)
-            rr.font.name = "Times New Roman"
-            rr.font.size = Pt(14)
-
-    output = io.BytesIO()
-    doc.save(output)
-    output.seek(0)
-    return output
 
 # Начальные значения коэффициентов по умолчанию
-if project_data is None:
+if project_defaults:
+    C_trunin_val = project_defaults['C_trunin']
+    C_larson_val = project_defaults['C_larson']
+else:
     C_trunin_val = set_default_coefficients(selected_steel, "Трунина")
     C_larson_val = set_default_coefficients(selected_steel, "Ларсона-Миллера")
 
@@ -428,29 +424,25 @@ if (st.session_state.prev_steel != selected_steel or
 
 # --- Настройка количества испытаний ---
 st.header("3. Настройка количества испытаний")
-num_tests = st.slider(
-    "Количество испытаний (образцов)",
-    min_value=0,
-    max_value=100,
-    value=len(st.session_state.test_data_input),
-    step=1
-)
-
-# --- Синхронизация session_state с num_tests ---
-if len(st.session_state.test_data_input) != num_tests:
-    current = st.session_state.test_data_input
-    if num_tests > len(current):
-        for i in range(len(current), num_tests):
-            current.append({
-                "Образец": f"Обр.{i+1}", 
-                "sigma_MPa": 120.0, 
-                "T_C": 600.0, 
-                "tau_h": 500.0,
-                "Группа_аппроксимации": 0
-            })
-    else:
-        current = current[:num_tests]
-    st.session_state.test_data_input = current
+col1, col2 = st.columns([3, 1])
+with col1:
+    rows_to_add = st.number_input(
+        "Добавить строк со значениями по умолчанию",
+        min_value=1,
+        max_value=10000,
+        value=1,
+        step=1
+    )
+with col2:
+    st.write("")
+    if st.button("➕ Добавить строки"):
+        current = st.session_state.test_data
+        set_test_data(
+            pd.concat([current, make_test_dataframe(default_test_records(len(current), rows_to_add))]),
+            "Добавление строк"
+        )
+        st.rerun()
+st.caption(f"Испытаний в таблице: {len(st.session_state.test_data)}")
 
 # --- Ввод данных испытаний с группами аппроксимации ---
 st.header("4. Введите данные испытаний")
@@ -459,65 +451,69 @@ st.info("""
 - **0** = только на графике (без аппроксимации)
 - **1, 2, 3...** = разные блоки точек для аппроксимации
 Для построения аппроксимации в группе должно быть минимум 2 точки
+
+Строки можно добавлять и удалять прямо в таблице, а также вставлять блоком из Excel (Ctrl+V).
 """)
 
-if num_tests > 0:
-    for i in range(num_tests):
-        col1, col2, col3, col4, col5 = st.columns([2, 2, 2, 2, 1])
-        with col1:
-            sample = col1.text_input(
-                f"Образец {i+1}",
-                value=st.session_state.test_data_input[i]["Образец"],
-                key=f"{st.session_state.widget_prefix}_sample_{i}"
-            )
-        with col2:
-            sigma = col2.number_input(
-                f"σ, МПа",
-                value=float(st.session_state.test_data_input[i]["sigma_MPa"]),
-                min_value=0.1,
-                max_value=500.0,
-                key=f"{st.session_state.widget_prefix}_sigma_{i}"
-            )
-        with col3:
-            T_C = col3.number_input(
-                f"T, °C",
-                value=float(st.session_state.test_data_input[i]["T_C"]),
-                min_value=100.0,
-                max_value=1000.0,
-                key=f"{st.session_state.widget_prefix}_T_{i}"
-            )
-        with col4:
-            tau_h = col4.number_input(
-                f"τ, ч",
-                value=float(st.session_state.test_data_input[i]["tau_h"]),
-                min_value=1.0,
-                max_value=1e7,
-                key=f"{st.session_state.widget_prefix}_tau_{i}"
-            )
-        with col5:
-            group = col5.number_input(
-                f"Группа",
-                value=int(st.session_state.test_data_input[i]["Группа_аппроксимации"]),
-                min_value=0,
-                max_value=10,
-                step=1,
-                key=f"{st.session_state.widget_prefix}_group_{i}"
-            )
-        st.session_state.test_data_input[i] = {
-            "Образец": sample,
-            "sigma_MPa": sigma,
-            "T_C": T_C,
-            "tau_h": tau_h,
-            "Группа_аппроксимации": group
-        }
-else:
-    st.info("Нет данных испытаний. График будет построен только с кривой допускаемых напряжений.")
+edited_test_data = st.data_editor(
+    st.session_state.test_data_base,
+    column_config={
+        "Образец": st.column_config.TextColumn("Образец", default=""),
+        "sigma_MPa": st.column_config.NumberColumn(
+            "σ, МПа", min_value=TEST_DATA_LIMITS["sigma_MPa"][0],
+            max_value=TEST_DATA_LIMITS["sigma_MPa"][1], default=120.0
+        ),
+        "T_C": st.column_config.NumberColumn(
+            "T, °C", min_value=TEST_DATA_LIMITS["T_C"][0],
+            max_value=TEST_DATA_LIMITS["T_C"][1], default=600.0
+        ),
+        "tau_h": st.column_config.NumberColumn(
+            "τ, ч", min_value=TEST_DATA_LIMITS["tau_h"][0],
+            max_value=TEST_DATA_LIMITS["tau_h"][1], default=500.0
+        ),
+        "Группа_аппроксимации": st.column_config.NumberColumn(
+            "Группа", min_value=TEST_DATA_LIMITS["Группа_аппроксимации"][0],
+            max_value=TEST_DATA_LIMITS["Группа_аппроксимации"][1], step=1, default=0
+        ),
+    },
+    num_rows="dynamic",
+    hide_index=True,
+    width="stretch",
+    key=f"{st.session_state.widget_prefix}_test_editor_{st.session_state.test_data_base_version}"
+)
+if not edited_test_data.equals(st.session_state.test_data):
+    log_test_data_change(
+        "Редактирование", edited_test_data,
+        diff_test_data(st.session_state.test_data, edited_test_data)
+    )
+    st.session_state.test_data = edited_test_data
+
+test_data_checks = validate_test_data(st.session_state.test_data)
+valid_test_rows = test_data_checks.all(axis=1)
+if not valid_test_rows.all():
+    bad_counts = (~test_data_checks).sum()
+    details = ", ".join(f"{column}: {count}" for column, count in bad_counts.items() if count)
+    st.warning(
+        f"⚠️ Строк с пустыми или недопустимыми значениями: {int((~valid_test_rows).sum())} "
+        f"({details}). Они не участвуют в расчете."
+    )
+
+with st.expander(f"Журнал изменений данных испытаний ({len(st.session_state.test_data_changelog)})"):
+    st.dataframe(
+        pd.DataFrame(st.session_state.test_data_changelog).drop(columns=["ячейки"], errors='ignore'),
+        hide_index=True
+    )
 
-df_tests = pd.DataFrame(st.session_state.test_data_input) if st.session_state.test_data_input else pd.DataFrame()
+df_tests = prepare_tests_for_calculation(st.session_state.test_data[valid_test_rows])
 
-if not df_tests.empty:
+if df_tests.empty:
+    st.info("Нет данных испытаний. График будет построен только с кривой допускаемых напряжений.")
+else:
     st.header("Таблица режимов и результатов испытаний")
-    st.table(build_test_results_table(df_tests))
+    if len(df_tests) <= 100:
+        st.table(build_test_results_table(df_tests))
+    else:
+        st.dataframe(build_test_results_table(df_tests), hide_index=True)
 
 # --- Ввод общих параметров трубы для графика ---
 st.header("5. Введите общие параметры трубы для графика")
@@ -552,11 +548,13 @@ st.header("6. Дополнительные настройки")
 col1, col2, col3 = st.columns(3)
 
 with col1:
+    # Подобранное в разделе 10 значение C заменяет значение по умолчанию
+    fitted_C_key = f"{selected_steel}|{selected_param}"
     if selected_param == "Трунина":
         default_C_value = set_default_coefficients(selected_steel, selected_param)
         C = st.number_input(
             "Коэффициент C в параметре Трунина",
-            value=float(default_C_value),
+            value=float(st.session_state.fitted_C.get(fitted_C_key, default_C_value)),
             min_value=0.0,
             max_value=50.0,
             format="%.3f",
@@ -566,7 +564,7 @@ with col1:
         default_C_value = set_default_coefficients(selected_steel, selected_param)
         C = st.number_input(
             "Коэффициент C в параметре Ларсона-Миллера",
-            value=float(default_C_value),
+            value=float(st.session_state.fitted_C.get(fitted_C_key, default_C_value)),
             min_value=0.0,
             max_value=50.0,
             format="%.3f",
@@ -577,7 +575,7 @@ with col2:
     # Выбор групп для построения аппроксимации
     if len(df_tests) > 0:
         # Находим все уникальные группы (кроме 0)
-        groups = sorted([g for g in df_tests["Группа_аппроксимации"].unique() if g > 0])
+        groups = sorted(int(g) for g in df_tests["Группа_аппроксимации"].unique() if g > 0)
         if groups:
             st.markdown("**Названия групп**")
             for g in groups:
@@ -585,7 +583,7 @@ with col2:
                 st.session_state.group_names[str(g)] = st.text_input(
                     f"Название для группы {g}",
                     value=default_name,
-                    key=f"group_name_{g}"
+                    key=f"{st.session_state.widget_prefix}_group_name_{g}"
                 )
 
             group_options = {}
@@ -614,6 +612,14 @@ with col3:
     fig_width_in = fig_width_cm / 2.54
     fig_height_cm = st.slider("Высота графика (см)", min_value=8, max_value=15, value=10, step=1)
     fig_height_in = fig_height_cm / 2.54
+    figure_format = st.radio("Формат графика", options=list(FIGURE_FORMATS.keys()), horizontal=True)
+    show_bands = st.checkbox("Показать доверительный и прогнозный интервалы аппроксимаций")
+    band_level = st.selectbox(
+        "Доверительная вероятность интервалов",
+        options=list(BAND_LEVELS),
+        index=BAND_LEVELS.index(0.95),
+        format_func=lambda x: f"{x:.0%}"
+    )
 
 # --- Управление несколькими расчетами остаточного ресурса ---
 st.header("7. Управление расчетами остаточного ресурса")
@@ -632,16 +638,17 @@ def get_current_pipe_params() -> Dict:
     }
 
 
-def is_main_calculation(calc: Dict) -> bool:
-    return calc.get('id') == 1 or calc.get('name') == 'Основной расчет'
-
-
 def get_params_for_calculation(calc: Dict) -> Dict:
     if is_main_calculation(calc):
         calc['params'] = get_current_pipe_params()
     return calc['params']
 
 
+def new_calculation_id() -> int:
+    """Идентификатор нового расчета; номера удаленных расчетов в сессии не повторяются."""
+    return next_calculation_id(st.session_state.resource_calculations, st.session_state.last_calculation_id)
+
+
 def create_resource_calculation(calc_id: int, name: str, selected_group: int = 0) -> Dict:
     return {
         'id': calc_id,
@@ -660,19 +667,20 @@ if not st.session_state.resource_calculations:
 
 # Кнопка для добавления нового расчета
 if st.button("➕ Добавить новый расчет остаточного ресурса"):
-    next_id = len(st.session_state.resource_calculations) + 1
+    next_id = new_calculation_id()
     default_group = selected_approx_groups[0] if selected_approx_groups else 0
     st.session_state.resource_calculations.append(
         create_resource_calculation(next_id, f'Расчет {next_id}', default_group)
     )
 
-# Отображение существующих расчетов
+# Отображение существующих расчетов; префикс ключей сбрасывает виджеты при загрузке проекта
+prefix = st.session_state.widget_prefix
 for idx, calc in enumerate(st.session_state.resource_calculations):
     with st.expander(f"📊 {calc['name']} (ID: {calc['id']})", expanded=False):
         col1, col2 = st.columns(2)
         
         with col1:
-            calc['name'] = st.text_input(f"Название расчета", value=calc['name'], key=f"calc_name_{idx}")
+            calc['name'] = st.text_input(f"Название расчета", value=calc['name'], key=f"{prefix}_calc_name_{idx}")
             
             # Выбор группы для расчета
             if len(df_tests) > 0 and selected_approx_groups:
@@ -681,7 +689,7 @@ for idx, calc in enumerate(st.session_state.resource_calculations):
                     options=[0] + selected_approx_groups,
                     format_func=lambda x: "Только график" if x == 0 else st.session_state.group_names.get(str(x), f"Группа {x}"),
                     index=selected_approx_groups.index(calc['selected_group']) + 1 if calc['selected_group'] in selected_approx_groups else 0,
-                    key=f"calc_group_{idx}"
+                    key=f"{prefix}_calc_group_{idx}"
                 )
             else:
                 calc['selected_group'] = 0
@@ -695,56 +703,57 @@ for idx, calc in enumerate(st.session_state.resource_calculations):
             st.subheader("Параметры трубы")
             calc['params']['s_nom'] = st.number_input(
                 "s_н, мм", value=float(calc['params']['s_nom']), 
-                min_value=0.1, max_value=1000.0, key=f"calc_s_nom_{idx}"
+                min_value=0.1, max_value=1000.0, key=f"{prefix}_calc_s_nom_{idx}"
             )
             calc['params']['s_min'] = clamp_number(
                 calc['params']['s_min'], 0.1, calc['params']['s_nom']
             )
             calc['params']['s_min'] = st.number_input(
                 "s_мин, мм", value=float(calc['params']['s_min']), 
-                min_value=0.1, max_value=calc['params']['s_nom'], key=f"calc_s_min_{idx}"
+                min_value=0.1, max_value=calc['params']['s_nom'], key=f"{prefix}_calc_s_min_{idx}"
             )
             calc['params']['s_max'] = st.number_input(
                 "s_макс, мм", value=float(calc['params']['s_max']), 
-                min_value=0.1, max_value=1000.0, key=f"calc_s_max_{idx}"
+                min_value=0.1, max_value=1000.0, key=f"{prefix}_calc_s_max_{idx}"
             )
             calc['params']['tau_exp'] = st.number_input(
                 "τ_э, ч", value=int(calc['params']['tau_exp']), 
-                min_value=1, max_value=5_000_000, key=f"calc_tau_exp_{idx}"
+                min_value=1, max_value=5_000_000, key=f"{prefix}_calc_tau_exp_{idx}"
             )
             calc['params']['d_max'] = st.number_input(
                 "d_макс, мм", value=float(calc['params']['d_max']), 
-                min_value=0.1, max_value=1000.0, key=f"calc_d_max_{idx}"
+                min_value=0.1, max_value=1000.0, key=f"{prefix}_calc_d_max_{idx}"
             )
             calc['params']['T_rab_C'] = st.number_input(
                 "T_раб, °C", value=float(calc['params']['T_rab_C']), 
-                min_value=100.0, max_value=1000.0, key=f"calc_T_rab_C_{idx}"
+                min_value=100.0, max_value=1000.0, key=f"{prefix}_calc_T_rab_C_{idx}"
             )
             calc['params']['p_MPa'] = st.number_input(
                 "p, МПа", value=float(calc['params']['p_MPa']), 
-                min_value=0.1, max_value=100.0, key=f"calc_p_MPa_{idx}"
+                min_value=0.1, max_value=100.0, key=f"{prefix}_calc_p_MPa_{idx}"
             )
             calc['params']['k_zapas'] = st.number_input(
                 "k_зап", value=float(calc['params']['k_zapas']), 
-                min_value=1.0, max_value=5.0, key=f"calc_k_zapas_{idx}"
+                min_value=1.0, max_value=5.0, key=f"{prefix}_calc_k_zapas_{idx}"
             )
         
         # Кнопки управления
         col_btn1, col_btn2, col_btn3 = st.columns(3)
         with col_btn1:
-            if st.button(f"🔄 Рассчитать", key=f"calc_button_{idx}"):
+            if st.button(f"🔄 Рассчитать", key=f"{prefix}_calc_button_{idx}"):
                 st.session_state.show_calculation_results = True
                 st.session_state.active_calculation_id = calc['id']
                 st.rerun()
         with col_btn2:
-            if st.button(f"🗑️ Удалить", key=f"delete_calc_{idx}"):
+            if st.button(f"🗑️ Удалить", key=f"{prefix}_delete_calc_{idx}"):
+                st.session_state.last_calculation_id = max(st.session_state.last_calculation_id, calc['id'])
                 st.session_state.resource_calculations.pop(idx)
                 st.rerun()
         with col_btn3:
-            if st.button(f"📋 Скопировать параметры", key=f"copy_calc_{idx}"):
+            if st.button(f"📋 Скопировать параметры", key=f"{prefix}_copy_calc_{idx}"):
                 # Копирование текущих параметров в новый расчет
                 st.session_state.resource_calculations.append({
-                    'id': len(st.session_state.resource_calculations) + 1,
+                    'id': new_calculation_id(),
                     'name': f'Копия {calc["name"]}',
                     'params': calc['params'].copy(),
                     'selected_group': calc['selected_group'] if calc['selected_group'] > 0 else (selected_approx_groups[0] if selected_approx_groups else 0),
@@ -753,11 +762,12 @@ for idx, calc in enumerate(st.session_state.resource_calculations):
                 st.rerun()
 
 # --- Кнопка сохранения проекта ---
-if st.sidebar.button("💾 Сохранить проект"):
-    data_to_save = {
+def collect_project_data() -> Dict:
+    """Проект в формате «проект_ресурса.json» по текущему состоянию интерфейса."""
+    return {
         "название_серии": series_name,
         "марка_стали": selected_steel,
-        "испытания": st.session_state.test_data_input,
+        "испытания": test_data_records(st.session_state.test_data),
         "параметры_трубы": {
             "s_nom": s_nom,
             "s_min": s_min,
@@ -775,7 +785,10 @@ if st.sidebar.button("💾 Сохранить проект"):
         "коэффициент_C_larson": C if selected_param == "Ларсона-Миллера" else 20.0,
         "resource_calculations": st.session_state.resource_calculations
     }
-    json_str = json.dumps(data_to_save, indent=2, ensure_ascii=False)
+
+
+if st.sidebar.button("💾 Сохранить проект"):
+    json_str = json.dumps(collect_project_data(), indent=2, ensure_ascii=False)
     st.sidebar.download_button(
         label="📥 Скачать проект (.json)",
         data=json_str,
@@ -784,29 +797,44 @@ if st.sidebar.button("💾 Сохранить проект"):
     )
 
 # --- Скачать Word-отчет ---
-if len(st.session_state.test_data_input) > 0:
+# Документы формируются только по запросу и кэшируются по хэшу своих входных данных
+if len(df_tests) > 0:
     if DOCX_AVAILABLE:
-        try:
-            df_word_table = pd.DataFrame(st.session_state.test_data_input)
-            word_table = create_word_test_table(series_name, df_word_table)
+        c_for_report = C_trunin_val if selected_param == "Трунина" else C_larson_val
+        word_inputs = (series_name, df_tests[TEST_DATA_COLUMNS], selected_param, c_for_report)
+        stage_cache = st.session_state.stage_cache
+        word_documents = peek_stage(stage_cache, "Word", word_inputs)
+        if word_documents is None:
+            # Документы формируются фоновой задачей; готовые попадают в кэш этапов при перезапуске
+            word_key = hash_stage_inputs(word_inputs)
+            word_job = find_job(st.session_state.jobs, "word", word_key)
+            if word_job is not None and is_job_active(word_job):
+                st.sidebar.caption("⏳ Документы Word формируются в фоне")
+            elif st.sidebar.button("📄 Сформировать документы Word"):
+                word_tests = df_tests.copy()
+                submit_job(
+                    st.session_state.jobs, "Документы Word", "word",
+                    lambda job: build_word_documents(series_name, word_tests, selected_param, c_for_report),
+                    payload={'key': word_key, 'inputs': word_inputs}
+                )
+                st.sidebar.caption("⏳ Документы Word формируются в фоне")
+            elif word_job is not None and word_job['status'] == JOB_FAILED:
+                st.sidebar.warning(f"Не удалось сформировать Word-отчет: {word_job['error']}")
+
+        if word_documents is not None:
+            word_table, word_report = word_documents
             st.sidebar.download_button(
                 label="📄 Скачать таблицу Word",
                 data=word_table,
                 file_name="tablitsa_ispytanii_dlitelnoi_prochnosti.docx",
                 mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
             )
-
-            df_word_report = pd.DataFrame(st.session_state.test_data_input)
-            c_for_report = C_trunin_val if selected_param == "Трунина" else C_larson_val
-            word_report = create_word_report(series_name, df_word_report, selected_param, c_for_report)
             st.sidebar.download_button(
                 label="📄 Скачать отчет Word",
                 data=word_report,
                 file_name="otchet_dlitelnoi_prochnosti.docx",
                 mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
             )
-        except Exception as e:
-            st.sidebar.warning(f"Не удалось сформировать Word-отчет: {e}")
     else:
         st.sidebar.info("Word-отчет недоступен: в окружении не установлен пакет python-docx")
 
@@ -832,108 +860,865 @@ if st.sidebar.button("📥 Скачать шаблон Excel"):
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
 
-# --- Функция для расчета остаточного ресурса ---
-def calculate_residual_resource(params: Dict, approx: Dict, selected_param: str, C: float, 
-                                steel_grade: str, s_nom: float) -> Tuple[Optional[float], Dict]:
-    """Рассчитывает остаточный ресурс по заданным параметрам."""
-    
+
+def get_warm_start(calc_id, solver_inputs: Dict) -> Optional[float]:
+    """Возвращает прошлый результат расчета, если с тех пор изменился не более чем один параметр."""
+    previous = st.session_state.solver_warm_start.get(calc_id)
+    if previous is None:
+        return None
+    changed = [
+        key for key in set(previous['inputs']) | set(solver_inputs)
+        if previous['inputs'].get(key) != solver_inputs.get(key)
+    ]
+    return previous['tau_prognoz'] if len(changed) <= 1 else None
+
+
+# --- Метод расчета остаточного ресурса ---
+st.header("8. Метод расчета остаточного ресурса")
+col1, col2 = st.columns(2)
+with col1:
+    solver_method = st.selectbox(
+        "Метод решения уравнения τ_прогн = τ_р(τ_прогн)",
+        options=list(SOLVER_LABELS.keys()),
+        format_func=lambda x: SOLVER_LABELS[x]
+    )
+with col2:
+    solver_tolerance = st.number_input(
+        "Допуск сходимости, ч",
+        value=BRACKETED_TOLERANCE,
+        min_value=0.01,
+        max_value=1000.0,
+        disabled=solver_method == SOLVER_FIXED_POINT,
+        help=f"Для исходного метода допуск фиксирован: {FIXED_POINT_TOLERANCE:.0f} ч"
+    )
+conservative_enabled = st.checkbox(
+    "Дополнительно рассчитать консервативный ресурс по нижней границе прогнозного интервала",
+    help="Время до разрушения берется по нижней границе прогнозного интервала регрессии "
+         "с доверительной вероятностью, выбранной в разделе 6"
+)
+
+# --- Оценка неопределенности методом Монте-Карло ---
+st.header("9. Оценка неопределенности (Монте-Карло)")
+monte_carlo_enabled = st.checkbox(
+    "Оценить разброс остаточного ресурса методом Монте-Карло",
+    help="Коэффициенты регрессии разыгрываются по их ковариации, толщины — с погрешностью "
+         "измерения, давление и температура — равномерно в пределах допуска"
+)
+if monte_carlo_enabled:
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        monte_carlo_samples = st.selectbox(
+            "Число наборов", options=list(MONTE_CARLO_SAMPLE_SIZES), index=1,
+            format_func=lambda x: f"{x:,}".replace(",", " ")
+        )
+        monte_carlo_seed = st.number_input("Начальное число генератора", value=0, min_value=0, step=1)
+    with col2:
+        thickness_sd = st.number_input(
+            "Погрешность толщиномера (ско), мм", value=DEFAULT_UNCERTAINTY['thickness_sd'],
+            min_value=0.0, max_value=5.0, step=0.01
+        )
+        monte_carlo_regression = st.checkbox(
+            "Учитывать разброс коэффициентов регрессии", value=DEFAULT_UNCERTAINTY['regression']
+        )
+    with col3:
+        pressure_tol = st.number_input(
+            "Допуск давления ±, МПа", value=DEFAULT_UNCERTAINTY['pressure_tol'],
+            min_value=0.0, max_value=10.0, step=0.1
+        )
+        temperature_tol = st.number_input(
+            "Допуск температуры ±, °C", value=DEFAULT_UNCERTAINTY['temperature_tol'],
+            min_value=0.0, max_value=100.0, step=1.0
+        )
+    monte_carlo_uncertainty = {
+        'thickness_sd': thickness_sd,
+        'pressure_tol': pressure_tol,
+        'temperature_tol': temperature_tol,
+        'regression': monte_carlo_regression,
+    }
+
+# --- Подбор коэффициента C ---
+st.header("10. Подбор коэффициента C по данным испытаний")
+
+
+def build_approximations_for_C(C_value: float, groups: List[int]) -> Dict:
+    """Аппроксимации групп при заданном значении C (регрессии берутся из кэша этапов)."""
+    df_C = df_tests.copy()
+    df_C["P"] = calculate_parameter_P(df_C["T_C"].values + 273.15, df_C["tau_h"].values, selected_param, C_value)
+    return build_group_approximations(
+        df_C, groups, st.session_state.group_names, selected_param, st.session_state.stage_cache
+    )[0]
+
+
+def show_C_fit_resources(C_fit: Dict) -> None:
+    """Сравнивает остаточный ресурс расчетов при текущем и подобранном C."""
+    approximations_by_C = {
+        C_value: build_approximations_for_C(C_value, C_fit['groups']) for C_value in (C, C_fit['C'])
+    }
+    rows = []
+    for calc in st.session_state.resource_calculations:
+        if calc['selected_group'] not in C_fit['groups']:
+            continue
+        calc_params = get_params_for_calculation(calc)
+        row = {"Расчет": calc['name']}
+        for label, C_value in (("при текущем C", C), ("при подобранном C", C_fit['C'])):
+            approx = approximations_by_C[C_value].get(calc['selected_group'])
+            if approx is None:
+                row[f"Ресурс {label}, ч"] = "—"
+                continue
+            tau_prognoz, _ = cached_stage(
+                st.session_state.stage_cache, "Остаточный ресурс",
+                (calc_params, approx['P_values'], approx['sigma_values'], selected_param, C_value,
+                 selected_steel, solver_method, solver_tolerance),
+                lambda: calculate_residual_resource(
+                    calc_params, approx, selected_param, C_value, selected_steel, calc_params['s_nom'],
+                    method=solver_method, tolerance=solver_tolerance
+                )
+            )
+            row[f"Ресурс {label}, ч"] = f"{tau_prognoz:,.0f}" if tau_prognoz is not None else "ошибка"
+        rows.append(row)
+    if rows:
+        st.table(pd.DataFrame(rows))
+
+
+if len(df_tests) > 0 and st.checkbox(
+    f"Подобрать коэффициент C параметра {selected_param}",
+    help="C перебирается по всему допустимому диапазону и уточняется так, чтобы суммарный "
+         "разброс точек вокруг регрессий групп был минимальным"
+):
+    fit_groups = selected_approx_groups or sorted(
+        int(g) for g in df_tests["Группа_аппроксимации"].unique() if g > 0
+    )
     try:
-        # Извлекаем параметры
-        s_min = params['s_min']
-        s_max = params['s_max']
-        tau_exp = params['tau_exp']
-        d_max = params['d_max']
-        T_rab_C = params['T_rab_C']
-        p_MPa = params['p_MPa']
-        k_zapas = params['k_zapas']
-        
-        T_rab = T_rab_C + 273.15
-        reduced_a, reduced_b, reduced_R2 = build_regression(
-            approx['P_values'], approx['sigma_values'] / k_zapas
+        C_fit = cached_stage(
+            st.session_state.stage_cache, "Подбор C",
+            (df_tests[TEST_DATA_COLUMNS], fit_groups, selected_param, dict(st.session_state.group_names)),
+            lambda: fit_parameter_C(df_tests, fit_groups, st.session_state.group_names, selected_param)
         )
-        
-        # Скорость коррозии
-        if s_max > s_nom:
-            v_corr = (s_max - s_min) / tau_exp
+    except ValueError as e:
+        st.warning(f"Подбор C невозможен: {e}")
+        C_fit = None
+
+    if C_fit is not None and C_fit['flat']:
+        st.warning(
+            "Разброс точек не зависит от C: в каждой группе все испытания проведены при одной "
+            "температуре или в группах по две точки"
+        )
+    elif C_fit is not None:
+        current = evaluate_C_candidates(df_tests, C_fit['groups'], selected_param, [C])
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Подобранное C", f"{C_fit['C']:.3f}", delta=f"{C_fit['C'] - C:+.3f} к текущему")
+        with col2:
+            st.metric(
+                "Сводный R² групп", f"{C_fit['pooled_R2']:.4f}",
+                delta=f"{C_fit['pooled_R2'] - current['pooled_R2'][0]:+.4f} к текущему"
+            )
+        st.table(pd.DataFrame([{
+            "Группа": st.session_state.group_names.get(str(group), f"Группа {group}"),
+            "R² при текущем C": round(float(current['R2'][0, column]), 4),
+            "R² при подобранном C": round(C_fit['R2'][group], 4)
+        } for column, group in enumerate(C_fit['groups'])]))
+        st.line_chart(C_fit['curve'].set_index("C"), x_label="C", y_label="R²")
+        show_C_fit_resources(C_fit)
+        if st.button(f"Применить C = {C_fit['C']:.3f}"):
+            st.session_state.fitted_C[fitted_C_key] = round(C_fit['C'], 3)
+            st.rerun()
+
+
+# --- Ресурс труб по картам толщинометрии ---
+st.header("11. Остаточный ресурс труб по картам толщинометрии")
+thickness_file = st.file_uploader(
+    "Загрузите карту толщин (.csv, .xlsx): столбцы Змеевик, Труба, Позиция, Толщина (и при наличии Диаметр)",
+    type=["csv", "xlsx", "xls"]
+)
+readings = None
+data_store = st.session_state.data_store
+if thickness_file is not None:
+    thickness_bytes = thickness_file.getvalue()
+    readings, tubes, missing_columns = parse_thickness_map(
+        hashlib.md5(thickness_bytes).hexdigest(), thickness_bytes, thickness_file.name
+    )
+    readings_count = len(readings)
+elif data_store is not None and THICKNESS_DATASET in data_store['manifest']['datasets']:
+    # Замеры из хранилища не загружаются целиком: трубы сводятся порциями по отображенным массивам
+    st.caption(f"Карта толщин из хранилища {data_store['path']}")
+    tubes = cached_stage(
+        st.session_state.stage_cache, "Трубы хранилища", (data_store['path'], data_store['manifest']['id']),
+        lambda: reduce_store_tubes(data_store)
+    )
+    readings_count = data_store['manifest']['datasets'][THICKNESS_DATASET]['rows']
+    missing_columns = []
+if thickness_file is not None or (
+        data_store is not None and THICKNESS_DATASET in data_store['manifest']['datasets']):
+    if missing_columns:
+        st.error(f"❌ В карте толщин отсутствуют столбцы: {missing_columns}")
+    elif tubes.empty:
+        st.warning("В карте толщин нет корректных замеров")
+    elif not selected_approx_groups:
+        st.info(
+            f"Загружено замеров: {readings_count:,}, труб: {len(tubes):,}. "
+            "Для расчета выберите группы аппроксимации в разделе 6"
+        )
+    else:
+        st.caption(f"Замеров: {readings_count:,}; труб: {len(tubes):,}; змеевиков: {tubes['Змеевик'].nunique():,}")
+        col1, col2 = st.columns(2)
+        with col1:
+            tube_group = st.selectbox(
+                "Группа аппроксимации для расчета труб",
+                options=selected_approx_groups,
+                format_func=lambda x: st.session_state.group_names.get(str(x), f"Группа {x}")
+            )
+        with col2:
+            worst_count = st.number_input(
+                "Число худших труб в таблице", value=WORST_TUBES_DEFAULT, min_value=1, max_value=1000
+            )
+        tube_approx = build_approximations_for_C(C, [tube_group]).get(tube_group)
+        if tube_approx is None:
+            st.warning(f"Группа {tube_group} не имеет аппроксимации")
         else:
-            v_corr = (s_nom - s_min) / tau_exp
-        
-        # Итерационный расчет
-        tau_prognoz = 50000.0
-        iteration_data = []
-        
-        for iter_num in range(100):
-            # Будущая минимальная толщина
-            s_min2 = s_min - v_corr * tau_prognoz
-            if s_min2 <= 0:
-                return None, {"error": "Толщина стенки станет ≤ 0"}
-            
-            # Фактическое напряжение для будущего состояния
-            sigma_fact2 = calculate_pipe_stress(p_MPa, d_max, s_min2)
-            
-            # Параметр P из новой регрессии, построенной по напряжениям, сниженным на коэффициент запаса
-            P_rab = (np.log10(sigma_fact2) - reduced_b) / reduced_a
-            
-            # Время до разрушения
-            if selected_param == "Трунина":
-                log_tau_r = P_rab / T_rab * 1000 + 2 * np.log10(T_rab) - C
-            else:
-                log_tau_r = P_rab / T_rab * 1000 - C
-            
-            tau_r = 10**log_tau_r
-            
-            iteration_data.append({
-                "Итерация": iter_num + 1,
-                "τ_прогн, ч": round(tau_prognoz, 0),
-                "τ_р, ч": round(tau_r, 0),
-                "Разница, ч": round(tau_prognoz - tau_r, 0),
-                "s_min2, мм": round(s_min2, 3),
-                "σ_факт2, МПа": round(sigma_fact2, 1)
-            })
-            
-            if not np.isfinite(tau_r) or tau_r <= 0:
-                return None, {"error": "Некорректное время до разрушения"}
-            
-            delta = tau_prognoz - tau_r
-            if abs(delta) <= 200:
-                # Сходимость достигнута
-                return tau_prognoz, {
-                    "iterations": iteration_data,
-                    "final_tau_r": tau_r,
-                    "final_s_min2": s_min2,
-                    "final_sigma_fact2": sigma_fact2,
-                    "v_corr": v_corr,
-                    "delta": delta,
-                    "reduced_a": reduced_a,
-                    "reduced_b": reduced_b,
-                    "reduced_R2": reduced_R2,
-                    "converged": True
-                }
-            
-            # Коррекция прогноза
-            correction = delta * 0.5
-            correction = np.clip(correction, -10000, 10000)
-            tau_prognoz = tau_prognoz - correction
-            
-            if tau_prognoz <= 0:
-                tau_prognoz = 1000
-        
-        # Не сошлось за 100 итераций
-        return tau_prognoz, {
-            "iterations": iteration_data,
-            "final_tau_r": tau_r,
-            "final_s_min2": s_min2,
-            "final_sigma_fact2": sigma_fact2,
-            "v_corr": v_corr,
-            "delta": delta,
-            "reduced_a": reduced_a,
-            "reduced_b": reduced_b,
-            "reduced_R2": reduced_R2,
-            "converged": False
-        }
-        
-    except Exception as e:
-        return None, {"error": str(e)}
+            pipe_params = get_current_pipe_params()
+            tube_results = cached_stage(
+                st.session_state.stage_cache, "Ресурс труб",
+                (tubes, pipe_params, tube_approx['P_values'], tube_approx['sigma_values'],
+                 selected_param, C, solver_method, solver_tolerance),
+                lambda: calculate_tube_resources(
+                    tubes, pipe_params, tube_approx, selected_param, C,
+                    method=solver_method, tolerance=solver_tolerance
+                )
+            )
+            summary = summarize_tube_resources(tube_results)
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Труб рассчитано", f"{summary['tubes'] - summary['failed']:,} из {summary['tubes']:,}")
+            if summary['min_tau'] is not None:
+                col2.metric("Минимальный ресурс", f"{summary['min_tau']:,.0f} ч",
+                            help=f"{summary['min_tau'] / 8760:.1f} лет")
+            col3.metric("Труб с ошибкой расчета", f"{summary['failed']:,}")
+
+            st.subheader("Трубы с наименьшим остаточным ресурсом")
+            st.dataframe(rank_worst_tubes(tube_results, int(worst_count)), hide_index=True)
+
+            heatmap_png = cached_stage(
+                st.session_state.stage_cache, "Тепловая карта труб",
+                (tube_results["Остаточный ресурс, лет"].values, tubes[["Змеевик", "Труба"]],
+                 series_name, fig_width_in, fig_height_in),
+                lambda: render_figure(build_tube_heatmap(
+                    tube_results, f"Остаточный ресурс труб — {series_name}", (fig_width_in, fig_height_in)
+                ))
+            )
+            st.image(heatmap_png, width="content")
+
+            st.subheader("Отбраковочная толщина")
+            rejection_horizons = sorted(set(horizon for horizon in parse_number_list(st.text_input(
+                "Горизонты эксплуатации, ч (через запятую)",
+                value=", ".join(f"{horizon:.0f}" for horizon in REJECTION_HORIZONS_DEFAULT),
+                help="Минимальная толщина s_мин, при которой остаточный ресурс трубы не меньше горизонта"
+            )) if horizon > 0))
+            if rejection_horizons:
+                sigma_allow = cached_stage(
+                    st.session_state.stage_cache, "Напряжение отбраковки",
+                    (tube_approx['P_values'], tube_approx['sigma_values'], pipe_params['T_rab_C'],
+                     pipe_params['k_zapas'], rejection_horizons, selected_param, C),
+                    lambda: calculate_rejection_stress(
+                        tube_approx, pipe_params['T_rab_C'], rejection_horizons, pipe_params['k_zapas'],
+                        selected_param, C
+                    )
+                )
+                tube_rejection = calculate_tube_rejection(tubes, pipe_params, sigma_allow, rejection_horizons)
+                st.table(summarize_tube_rejection(tube_rejection, rejection_horizons))
+                tube_results = tube_results.merge(tube_rejection.drop(columns="s_min"), on=["Змеевик", "Труба"])
+
+            st.download_button(
+                label="📥 Скачать ресурс всех труб (.csv)",
+                data=tube_results.to_csv(index=False).encode("utf-8-sig"),
+                file_name="resurs_trub.csv",
+                mime="text/csv"
+            )
+
+# --- Накопление повреждаемости по истории эксплуатации ---
+st.header("12. Повреждаемость по истории эксплуатации")
+history_file = st.file_uploader(
+    "Загрузите выгрузку АСУ ТП (.csv): столбцы Время, T_C (°C), p_MPa (МПа); без столбца времени строка — 1 ч",
+    type=["csv"]
+)
+history_path = st.text_input(
+    "или путь к файлу выгрузки на сервере", value="",
+    help="Для многолетних выгрузок: файл читается порциями и не загружается в память целиком"
+).strip()
+history_source = None
+history_damage = None
+if history_file is not None:
+    history_bytes = history_file.getvalue()
+    history_source, history_key = history_bytes, hashlib.md5(history_bytes).hexdigest()
+elif history_path:
+    if os.path.isfile(history_path):
+        history_source = history_path
+        history_key = (os.path.abspath(history_path), os.path.getmtime(history_path), os.path.getsize(history_path))
+    else:
+        st.error(f"❌ Файл не найден: {history_path}")
+if history_source is not None:
+    if not selected_approx_groups:
+        st.info("Для расчета выберите группы аппроксимации в разделе 6")
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            history_group = st.selectbox(
+                "Группа аппроксимации для истории эксплуатации",
+                options=selected_approx_groups,
+                format_func=lambda x: st.session_state.group_names.get(str(x), f"Группа {x}")
+            )
+        with col2:
+            history_start_hour = st.number_input(
+                "Наработка к началу выгрузки, ч", value=0, min_value=0, max_value=5_000_000,
+                help="Толщина стенки к началу выгрузки: s_н − v_корр·(наработка)"
+            )
+        history_approx = build_approximations_for_C(C, [history_group]).get(history_group)
+        if history_approx is None:
+            st.warning(f"Группа {history_group} не имеет аппроксимации")
+        else:
+            pipe_params = get_current_pipe_params()
+            history_inputs = (history_key, pipe_params, history_approx['P_values'], history_approx['sigma_values'],
+                              selected_param, C, history_start_hour)
+
+            def compute_history_damage() -> Dict:
+                status = st.empty()
+                damage = accumulate_history_damage(
+                    history_source, pipe_params, history_approx, selected_param, C, float(history_start_hour),
+                    progress=lambda rows: status.caption(f"Обработано записей: {rows:,}")
+                )
+                status.empty()
+                return damage
+
+            if stage_is_cached(st.session_state.stage_cache, "Повреждаемость по истории", history_inputs) or \
+                    st.button("Рассчитать повреждаемость"):
+                try:
+                    history_damage = cached_stage(
+                        st.session_state.stage_cache, "Повреждаемость по истории", history_inputs,
+                        compute_history_damage
+                    )
+                except (ValueError, pd.errors.ParserError) as e:
+                    st.error(f"❌ Ошибка чтения выгрузки: {e}")
+
+            if history_damage is not None:
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Израсходовано ресурса", f"{history_damage['damage']:.2%}")
+                col2.metric("Остаток ресурса", f"{history_damage['remaining']:.2%}")
+                col3.metric("Наработка по выгрузке", f"{history_damage['operating_hours']:,.0f} ч",
+                            help=f"Средняя температура {history_damage['T_mean']:.1f} °C, "
+                                 f"максимальная {history_damage['T_max']:.1f} °C")
+                st.caption(
+                    f"Записей: {history_damage['rows']:,}; не учтено (останов, пропуски): "
+                    f"{history_damage['skipped_rows']:,}; толщина стенки к концу выгрузки: "
+                    f"{history_damage['final_thickness']:.2f} мм"
+                )
+                if history_damage['thickness_exhausted'] or history_damage['remaining'] <= 0:
+                    st.error("❌ Ресурс исчерпан: накопленная повреждаемость достигла 1 или стенка утонена полностью")
+                elif history_damage['remaining_hours'] is not None:
+                    st.success(
+                        f"При режиме последнего года остаток ресурса исчерпается через "
+                        f"**{history_damage['remaining_hours']:,.0f} ч** "
+                        f"({history_damage['remaining_hours'] / 8760:.1f} лет) без учета дальнейшего утонения"
+                    )
+                st.bar_chart(
+                    history_damage['yearly'].set_index("Год эксплуатации")["Повреждаемость за год"],
+                    x_label="Год эксплуатации", y_label="Повреждаемость за год"
+                )
+                st.dataframe(history_damage['yearly'], hide_index=True)
+
+# --- Прогноз ресурса по плановому графику эксплуатации ---
+st.header("13. Ресурс при плановом графике эксплуатации")
+st.markdown("""
+Каждый сценарий — последовательность режимов (строки с одним названием идут по порядку).
+Последний режим сценария продолжается до исчерпания ресурса, его длительность можно не указывать.
+Повреждаемость суммируется по правилу Робинсона с учетом утонения стенки от s_мин со скоростью v_корр.
+
+При коррозии ресурс при постоянном режиме здесь больше, чем в основном расчете: основной расчет берет
+время до разрушения τ_р по толщине стенки на конец прогнозного срока, как если бы она была такой весь срок,
+а здесь стенка утоняется постепенно и в начале срока повреждаемость накапливается медленнее.
+Без коррозии (v_корр = 0) оба расчета совпадают.
+""")
+if 'schedule_table' not in st.session_state:
+    st.session_state.schedule_table = pd.DataFrame([
+        {"Сценарий": "Текущий режим", "Длительность, ч": None, "T_C": T_rab_C, "p_MPa": p_MPa},
+        {"Сценарий": "2 года с повышенной температурой", "Длительность, ч": 17520.0,
+         "T_C": T_rab_C + 28, "p_MPa": p_MPa},
+        {"Сценарий": "2 года с повышенной температурой", "Длительность, ч": None,
+         "T_C": T_rab_C + 13, "p_MPa": p_MPa},
+    ], columns=SCHEDULE_COLUMNS)
+schedule_table = st.data_editor(
+    st.session_state.schedule_table,
+    column_config={
+        "Сценарий": st.column_config.TextColumn("Сценарий", default=""),
+        "Длительность, ч": st.column_config.NumberColumn("Длительность, ч", min_value=1.0),
+        "T_C": st.column_config.NumberColumn("T, °C", min_value=100.0, max_value=1000.0),
+        "p_MPa": st.column_config.NumberColumn("p, МПа", min_value=0.01, max_value=100.0),
+    },
+    num_rows="dynamic", hide_index=True, key="schedule_editor"
+)
+if selected_approx_groups:
+    col1, col2 = st.columns(2)
+    with col1:
+        schedule_group = st.selectbox(
+            "Группа аппроксимации для графиков эксплуатации",
+            options=selected_approx_groups,
+            format_func=lambda x: st.session_state.group_names.get(str(x), f"Группа {x}")
+        )
+    with col2:
+        initial_damage = st.number_input(
+            "Накопленная повреждаемость к началу графика", value=0.0, min_value=0.0, max_value=1.0, step=0.01,
+            help="0 — ресурс от текущего состояния металла без накопленной повреждаемости; "
+                 "можно подставить повреждаемость по истории эксплуатации из раздела 12"
+        )
+    if history_damage is not None and st.checkbox("Начать с повреждаемости по истории эксплуатации (раздел 12)"):
+        initial_damage = min(history_damage['damage'], 1.0)
+    schedule_approx = build_approximations_for_C(C, [schedule_group]).get(schedule_group)
+    try:
+        schedules = parse_schedule_table(schedule_table)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        schedules = {}
+    if schedule_approx is None:
+        st.warning(f"Группа {schedule_group} не имеет аппроксимации")
+    elif schedules:
+        pipe_params = get_current_pipe_params()
+        schedule_life = cached_stage(
+            st.session_state.stage_cache, "Плановые графики",
+            (schedules, pipe_params, schedule_approx['P_values'], schedule_approx['sigma_values'],
+             selected_param, C, initial_damage),
+            lambda: calculate_schedule_life(
+                schedules, pipe_params, schedule_approx, selected_param, C, initial_damage
+            )
+        )
+        st.table(pd.DataFrame({
+            "Сценарий": schedule_life['names'],
+            "Ресурс, ч": [f"{life:,.0f}" if pd.notna(life) else f"> {schedule_life['horizon']:,.0f}"
+                          for life in schedule_life['life']],
+            "Ресурс, лет": [f"{life / 8760:.1f}" if pd.notna(life) else "—" for life in schedule_life['life']],
+            "Ограничение": [limit or "горизонт расчета" for limit in schedule_life['limit']],
+        }))
+        st.line_chart(
+            schedule_life['curve'].set_index("Время, лет"),
+            x_label="Время от текущего момента, лет", y_label="Повреждаемость"
+        )
+else:
+    st.info("Для расчета выберите группы аппроксимации в разделе 6")
+
+# --- Карта остаточного ресурса по температуре и давлению ---
+st.header("14. Карта остаточного ресурса по температуре и давлению")
+
+
+if selected_approx_groups and st.checkbox(
+    "Построить карту ресурса",
+    help="Остаточный ресурс во всех узлах сетки T × p рассчитывается одним пакетным расчетом; "
+         "при изменении одной оси пересчитываются только ее новые значения"
+):
+    sweep_group = st.selectbox(
+        "Группа аппроксимации для карты ресурса",
+        options=selected_approx_groups,
+        format_func=lambda x: st.session_state.group_names.get(str(x), f"Группа {x}")
+    )
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sweep_T_min = st.number_input("T_раб от, °C", value=float(T_rab_C - 30), min_value=100.0, max_value=1000.0)
+        sweep_T_max = st.number_input("T_раб до, °C", value=float(T_rab_C + 30), min_value=100.0, max_value=1000.0)
+        sweep_T_points = st.number_input("Узлов по T", value=SWEEP_DEFAULT_POINTS, min_value=2,
+                                         max_value=SWEEP_MAX_POINTS)
+    with col2:
+        sweep_p_min = st.number_input("p от, МПа", value=round(p_MPa * 0.7, 2), min_value=0.01, max_value=100.0)
+        sweep_p_max = st.number_input("p до, МПа", value=round(p_MPa * 1.3, 2), min_value=0.01, max_value=100.0)
+        sweep_p_points = st.number_input("Узлов по p", value=SWEEP_DEFAULT_POINTS, min_value=2,
+                                         max_value=SWEEP_MAX_POINTS)
+    with col3:
+        sweep_k_values = [k for k in parse_number_list(
+            st.text_input("Значения k_зап через запятую", value=f"{k_zapas:g}")
+        ) if k >= 1] or [k_zapas]
+        sweep_levels = sorted(level for level in parse_number_list(
+            st.text_input("Изолинии ресурса, лет (через запятую)", value="",
+                          help="Пусто — изолинии на границах цветовых уровней")
+        ) if level > 0)
+
+    sweep_approx = build_approximations_for_C(C, [sweep_group]).get(sweep_group)
+    if sweep_approx is None:
+        st.warning(f"Группа {sweep_group} не имеет аппроксимации")
+    elif sweep_T_min >= sweep_T_max or sweep_p_min >= sweep_p_max:
+        st.warning("Начало диапазона T и p должно быть меньше его конца")
+    else:
+        pipe_params = get_current_pipe_params()
+        sweep_T = sweep_axis(sweep_T_min, sweep_T_max, sweep_T_points)
+        sweep_p = sweep_axis(sweep_p_min, sweep_p_max, sweep_p_points)
+        resource_sweep = cached_stage(
+            st.session_state.stage_cache, "Карта ресурса",
+            (pipe_params, sweep_approx['P_values'], sweep_approx['sigma_values'], selected_param, C,
+             sweep_T, sweep_p, sweep_k_values, solver_method, solver_tolerance),
+            lambda: calculate_resource_sweep(
+                pipe_params, sweep_approx, selected_param, C, sweep_T, sweep_p, sweep_k_values,
+                method=solver_method, tolerance=solver_tolerance,
+                previous=st.session_state.last_resource_sweep
+            )
+        )
+        st.session_state.last_resource_sweep = resource_sweep
+        st.caption(
+            f"Узлов сетки: {resource_sweep['tau'].size:,}; рассчитано заново: {resource_sweep['solved_points']:,}; "
+            f"без результата: {int(pd.isna(resource_sweep['tau']).sum()):,}"
+        )
+        sweep_k_index = 0
+        if len(resource_sweep['k']) > 1:
+            sweep_k_index = st.selectbox(
+                "k_зап на карте", options=list(range(len(resource_sweep['k']))),
+                format_func=lambda index: f"{resource_sweep['k'][index]:g}"
+            )
+        sweep_png = cached_stage(
+            st.session_state.stage_cache, "График карты ресурса",
+            (resource_sweep['tau'][sweep_k_index], resource_sweep['T'], resource_sweep['p'],
+             resource_sweep['k'][sweep_k_index], sweep_levels, T_rab_C, p_MPa, series_name,
+             fig_width_in, fig_height_in),
+            lambda: render_figure(build_sweep_figure(
+                resource_sweep, sweep_k_index, f"Остаточный ресурс — {series_name}",
+                (fig_width_in, fig_height_in), levels=sweep_levels or None, operating_point=(p_MPa, T_rab_C)
+            ))
+        )
+        st.image(sweep_png, width="content")
+        st.download_button(
+            label="📥 Скачать сетку ресурса (.csv)",
+            data=sweep_table(resource_sweep).to_csv(index=False).encode("utf-8-sig"),
+            file_name="karta_resursa.csv",
+            mime="text/csv"
+        )
+
+# --- Чувствительность остаточного ресурса ---
+st.header("15. Чувствительность остаточного ресурса к параметрам")
+if st.session_state.resource_calculations and selected_approx_groups and st.checkbox(
+    "Рассчитать чувствительность",
+    help="Каждый параметр каждого расчета отклоняется вниз и вверх; все варианты решаются одним пакетным расчетом"
+):
+    sensitivity_step = st.number_input(
+        "Отклонение параметров δ, %", value=SENSITIVITY_STEP * 100,
+        min_value=SENSITIVITY_STEP_RANGE[0] * 100, max_value=SENSITIVITY_STEP_RANGE[1] * 100, step=0.5
+    ) / 100
+    sensitivity_calculations = [
+        {'name': calc['name'], 'params': get_params_for_calculation(calc), 'group': calc['selected_group']}
+        for calc in st.session_state.resource_calculations
+    ]
+    sensitivity_groups = sorted({calc['group'] for calc in sensitivity_calculations} & set(selected_approx_groups))
+    sensitivity_approximations = {
+        C_value: build_approximations_for_C(C_value, sensitivity_groups)
+        for C_value in (C, *sensitivity_C_values(C, sensitivity_step))
+    }
+    sensitivity = cached_stage(
+        st.session_state.stage_cache, "Чувствительность",
+        (sensitivity_calculations,
+         {str(C_value): {group: (approx['a'], approx['b']) for group, approx in approximations.items()}
+          for C_value, approximations in sensitivity_approximations.items()},
+         selected_param, C, sensitivity_step, solver_method, solver_tolerance),
+        lambda: calculate_sensitivity(
+            sensitivity_calculations, sensitivity_approximations, selected_param, C, sensitivity_step,
+            method=solver_method, tolerance=solver_tolerance
+        )
+    )
+    if sensitivity.empty:
+        st.warning("Нет расчетов с аппроксимированной группой")
+    else:
+        st.caption(
+            "Эластичность — относительное изменение ресурса на 1 % изменения параметра "
+            "(для температуры — в кельвинах)"
+        )
+        elasticities = sensitivity.pivot(index="Расчет", columns="Параметр", values="Эластичность")
+        elasticities = elasticities.reindex(
+            index=sensitivity["Расчет"].unique(), columns=list(SENSITIVITY_PARAMETERS.values())
+        )
+        st.dataframe(elasticities.round(3))
+        tornado_calc = st.selectbox("Диаграмма «торнадо» для расчета", options=list(elasticities.index))
+        tornado_rows = sensitivity[sensitivity["Расчет"] == tornado_calc]
+        tornado_png = cached_stage(
+            st.session_state.stage_cache, "Диаграмма чувствительности",
+            (tornado_rows, sensitivity_step, fig_width_in, fig_height_in),
+            lambda: render_figure(build_tornado_figure(
+                tornado_rows, f"Чувствительность ресурса — {tornado_calc}",
+                (fig_width_in, fig_height_in), sensitivity_step
+            ))
+        )
+        st.image(tornado_png, width="content")
+        st.download_button(
+            label="📥 Скачать анализ чувствительности (.csv)",
+            data=sensitivity.to_csv(index=False).encode("utf-8-sig"),
+            file_name="chuvstvitelnost.csv",
+            mime="text/csv"
+        )
+
+# --- Отбраковочная толщина для расчетов ---
+st.header("16. Отбраковочная толщина стенки")
+st.caption(
+    "Минимальная текущая толщина s_мин, при которой остаточный ресурс не меньше заданного горизонта "
+    "(обратная задача основного расчета при тех же T_раб, p, d_макс, k_зап и скорости коррозии)"
+)
+calculation_horizons = sorted(set(horizon for horizon in parse_number_list(st.text_input(
+    "Горизонты эксплуатации для расчетов, ч (через запятую)",
+    value=", ".join(f"{horizon:.0f}" for horizon in REJECTION_HORIZONS_DEFAULT)
+)) if horizon > 0))
+rejection_rows = []
+if calculation_horizons and selected_approx_groups:
+    rejection_approximations = build_approximations_for_C(C, selected_approx_groups)
+    for calc in st.session_state.resource_calculations:
+        calc_params = get_params_for_calculation(calc)
+        calc_approx = rejection_approximations.get(calc['selected_group'])
+        if calc_approx is None:
+            continue
+        sigma_allow = cached_stage(
+            st.session_state.stage_cache, "Напряжение отбраковки",
+            (calc_approx['P_values'], calc_approx['sigma_values'], calc_params['T_rab_C'],
+             calc_params['k_zapas'], calculation_horizons, selected_param, C),
+            lambda: calculate_rejection_stress(
+                calc_approx, calc_params['T_rab_C'], calculation_horizons, calc_params['k_zapas'], selected_param, C
+            )
+        )
+        thickness = calculate_rejection_thickness(
+            sigma_allow, calc_params['d_max'], calc_params['p_MPa'], calc_params['s_nom'],
+            calc_params['s_max'], calc_params['tau_exp'], calculation_horizons
+        )[0]
+        row = {"Расчет": calc['name'], "s_мин, мм": calc_params['s_min']}
+        for horizon, value in zip(calculation_horizons, thickness):
+            row[f"s_отбр на {horizon:,.0f} ч, мм"] = (
+                "недостижим" if pd.isna(value) else f"{value:.2f}{'' if calc_params['s_min'] >= value else ' ⚠️'}"
+            )
+        rejection_rows.append(row)
+if rejection_rows:
+    st.table(pd.DataFrame(rejection_rows))
+    if any("⚠️" in str(value) for row in rejection_rows for value in row.values()):
+        st.caption("⚠️ — текущая толщина меньше отбраковочной: ресурса не хватит до горизонта")
+elif calculation_horizons:
+    st.info("Для расчета выберите группы аппроксимации в разделе 6 и добавьте расчеты в разделе 7")
+
+# --- База проектов (SQLite) ---
+# Сохранение и загрузка проектов через локальную базу; раздел 17 — запросы по всем проектам базы
+@st.cache_resource(max_entries=4, show_spinner=False)
+def get_project_db(path: str) -> Dict:
+    """База проектов: одно соединение на файл для всех перезапусков и сессий.
+
+    Каждое обращение к соединению выполняется под блокировкой базы.
+    """
+    return open_shared_database(path)
+
+
+project_db = None
+with st.sidebar.expander("🗃️ База проектов"):
+    project_db_path = st.text_input(f"Файл базы ({DB_SUFFIX})", value=f"проекты_ресурса{DB_SUFFIX}",
+                                    key="project_db_path").strip()
+    db_project_name = st.text_input("Название проекта", value=series_name, key="db_project_name")
+    db_project_unit = st.text_input("Объект (станция, котел)", key="db_project_unit")
+    if project_db_path and st.button("🗃️ Сохранить в базу"):
+        try:
+            project_db = get_project_db(os.path.abspath(project_db_path))
+            with project_db['lock']:
+                revision = save_project(
+                    project_db['connection'], collect_project_data(), db_project_name.strip() or series_name,
+                    db_project_unit.strip(), method=solver_method, tolerance=solver_tolerance
+                )
+            st.success(f"✅ Сохранена ревизия {revision}")
+        except (OSError, sqlite3.Error, ValueError) as e:
+            st.error(f"❌ Не удалось сохранить проект в базу: {e}")
+    if project_db is None and project_db_path and os.path.exists(project_db_path):
+        try:
+            project_db = get_project_db(os.path.abspath(project_db_path))
+        except (sqlite3.Error, ValueError) as e:
+            st.error(f"❌ Не удалось открыть базу: {e}")
+    if project_db is not None:
+        with project_db['lock']:
+            db_projects = list_projects(project_db['connection'])
+        if not db_projects.empty:
+            db_revision = st.selectbox(
+                "Проект", options=db_projects["Ревизия"].tolist(),
+                format_func=lambda revision: " / ".join(str(value) for value in db_projects.loc[
+                    db_projects["Ревизия"] == revision, ["Объект", "Проект", "Сохранен"]
+                ].iloc[0] if value)
+            )
+            if st.button("📂 Загрузить из базы"):
+                with project_db['lock']:
+                    db_project = load_project(project_db['connection'], db_revision)
+                apply_project(db_project, uuid.uuid4().hex)
+                st.rerun()
+
+# --- Запросы по базе проектов ---
+st.header("17. База проектов")
+if project_db is None:
+    st.info("Укажите файл базы проектов на боковой панели и сохраните в нее хотя бы один проект")
+else:
+    with project_db['lock']:
+        db_options = {column: distinct_values(project_db['connection'], column)
+                      for column in ('steel_grade', 'series', 'parameter')}
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        db_steels = st.multiselect("Марка стали", options=db_options['steel_grade'])
+        db_series = st.multiselect("Серия испытаний", options=db_options['series'])
+    with col2:
+        db_parameters = st.multiselect("Параметр долговечности", options=db_options['parameter'])
+        db_max_tau = st.number_input("Остаточный ресурс менее, ч (0 — без ограничения)",
+                                     value=0.0, min_value=0.0, step=10000.0)
+    with col3:
+        db_dates = st.date_input("Период сохранения", value=(), format="DD.MM.YYYY")
+        db_latest_only = st.checkbox("Только последние ревизии проектов", value=True)
+    query_start = time.perf_counter()
+    with project_db['lock']:
+        db_results = query_calculations(
+            project_db['connection'], steel_grades=db_steels, parameters=db_parameters, series=db_series,
+            max_tau=db_max_tau or None,
+            date_from=db_dates[0].isoformat() if len(db_dates) > 0 else None,
+            date_to=db_dates[-1].isoformat() if len(db_dates) > 0 else None,
+            latest_only=db_latest_only
+        )
+    st.caption(f"Найдено расчетов: {len(db_results):,}; запрос — {(time.perf_counter() - query_start) * 1000:.0f} мс")
+    st.dataframe(db_results, hide_index=True)
+    if not db_results.empty:
+        st.download_button(
+            "📥 Скачать выборку (CSV)", data=db_results.to_csv(index=False).encode("utf-8-sig"),
+            file_name="выборка_базы_проектов.csv", mime="text/csv"
+        )
+        history_projects = db_results[["Объект", "Проект"]].drop_duplicates()
+        history_key = st.selectbox(
+            "История остаточного ресурса проекта", options=list(history_projects.itertuples(index=False, name=None)),
+            format_func=lambda key: " / ".join(value for value in key if value)
+        )
+        with project_db['lock']:
+            history = calculation_history(project_db['connection'], history_key[1], history_key[0])
+        if len(history) > 1:
+            st.line_chart(history / 8760, x_label="Дата сохранения", y_label="Остаточный ресурс, лет")
+        st.dataframe(history.round(0))
+
+# --- Сводка остаточного ресурса по парку ---
+@st.cache_data(max_entries=4, show_spinner=False)
+def read_fleet_summary(index_path: str, modified: float) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """Таблица и сводка по индексу парка; перечитывается только при изменении файла индекса."""
+    table = fleet_table(load_fleet_index(index_path))
+    return table, summarize_fleet(table)
+
+
+st.header("18. Сводка остаточного ресурса по парку")
+st.caption(
+    "Все проекты .json каталога (рекурсивно) пересчитываются в рабочих процессах; объект — подкаталог "
+    "проекта. Индекс сводки хранится в каталоге, поэтому при обновлении пересчитываются только новые "
+    "и измененные файлы"
+)
+fleet_folder = st.text_input("Каталог с проектами", key="fleet_folder").strip()
+if fleet_folder and not os.path.isdir(fleet_folder):
+    st.warning(f"Каталог не найден: {fleet_folder}")
+elif fleet_folder:
+    fleet_key = os.path.abspath(fleet_folder)
+    fleet_job = find_job(st.session_state.jobs, "fleet", fleet_key)
+    if fleet_job is not None and is_job_active(fleet_job):
+        st.info("⏳ Сводка обновляется в фоне: ход выполнения — на боковой панели")
+    elif st.button("🔄 Обновить сводку"):
+        fleet_job = submit_job(
+            st.session_state.jobs, f"Сводка по парку: {os.path.basename(fleet_key)}", "fleet",
+            lambda job: update_fleet_index(
+                fleet_key, method=solver_method, tolerance=solver_tolerance,
+                progress=lambda done, total: report_progress(job, done, total, f"Пересчитано файлов: {done} из {total}")
+            ),
+            payload={'key': fleet_key}
+        )
+        st.info("⏳ Сводка обновляется в фоне: ход выполнения — на боковой панели")
+    elif fleet_job is not None and fleet_job['status'] == JOB_DONE:
+        st.caption(f"Пересчитано файлов при последнем обновлении: {fleet_job['result']['reprocessed']}")
+    elif fleet_job is not None and fleet_job['status'] == JOB_FAILED:
+        st.error(f"❌ Не удалось обновить сводку: {fleet_job['error']}")
+
+    fleet_index_path = os.path.join(fleet_key, FLEET_INDEX_FILE)
+    if os.path.exists(fleet_index_path):
+        fleet_modified = os.path.getmtime(fleet_index_path)
+        fleet_calculations, fleet_summary = read_fleet_summary(fleet_index_path, fleet_modified)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Проектов", fleet_calculations["Проект"].nunique())
+        col2.metric("Расчетов", int(fleet_calculations["Расчет"].notna().sum()))
+        col3.metric("Мин. ресурс, лет", f"{fleet_summary['units']['Мин. ресурс, лет'].min():.1f}")
+        col4.metric("Без результата", len(fleet_summary['failed']))
+        st.caption(f"Индекс обновлен {datetime.fromtimestamp(fleet_modified).strftime('%d.%m.%Y %H:%M')}")
+        st.subheader("Объекты")
+        st.dataframe(fleet_summary['units'].round(1), hide_index=True)
+        st.subheader("Трубы с наименьшим остаточным ресурсом")
+        st.dataframe(fleet_summary['worst'].round(1), hide_index=True)
+        if not fleet_summary['failed'].empty:
+            with st.expander(f"Расчеты без результата ({len(fleet_summary['failed'])})"):
+                st.dataframe(fleet_summary['failed'], hide_index=True)
+        st.download_button(
+            "📥 Скачать все расчеты парка (CSV)", data=fleet_calculations.to_csv(index=False).encode("utf-8-sig"),
+            file_name="сводка_парка.csv", mime="text/csv"
+        )
+    elif fleet_job is None:
+        st.info("Сводка для этого каталога еще не построена: нажмите «Обновить сводку»")
+
+# --- Сохранение данных в хранилище ---
+with st.sidebar.expander("Сохранить данные в хранилище"):
+    save_store_path = st.text_input(f"Каталог хранилища ({STORE_SUFFIX})", value=f"данные{STORE_SUFFIX}")
+    st.caption("Сохраняются данные испытаний и карта толщин, загруженная в разделе 11")
+    if st.button("🗄️ Сохранить в хранилище"):
+        store_datasets = {TESTS_DATASET: make_test_dataframe(st.session_state.test_data)}
+        if readings is not None and not readings.empty:
+            store_datasets[THICKNESS_DATASET] = readings
+        try:
+            write_store(
+                save_store_path.strip(), store_datasets, {"название_серии": series_name},
+                group_by={THICKNESS_DATASET: THICKNESS_GROUP_COLUMNS}
+            )
+            st.success(f"✅ Сохранено: {save_store_path.strip()}")
+        except OSError as e:
+            st.error(f"❌ Не удалось сохранить хранилище: {e}")
+
+
+def show_conservative_result(calc_params: Dict, approx: Dict, tau_prognoz: float, stage_cache: Dict,
+                             solver_method: str, solver_tolerance: float) -> None:
+    """Выводит остаточный ресурс по нижней границе прогнозного интервала регрессии."""
+    statistics = approx['statistics']
+    if statistics['dof'] < 1:
+        st.caption("Консервативный ресурс не рассчитан: для прогнозного интервала нужно не менее 3 точек")
+        return
+    t_value = student_t_critical(band_level, statistics['dof'])
+    tau_low, low_results = cached_stage(
+        stage_cache, "Консервативный ресурс",
+        (calc_params, approx['P_values'], approx['sigma_values'], selected_param, C,
+         selected_steel, band_level, solver_method, solver_tolerance),
+        lambda: calculate_residual_resource(
+            calc_params, approx, selected_param, C, selected_steel, calc_params['s_nom'],
+            method=solver_method, tolerance=solver_tolerance, tau_start=tau_prognoz,
+            lower_prediction=(statistics, t_value)
+        )
+    )
+    if tau_low is None:
+        st.warning(f"Консервативный ресурс не рассчитан: {low_results.get('error', 'Неизвестная ошибка')}")
+    elif not low_results.get('converged', False):
+        st.warning(f"Консервативный ресурс: нет сходимости, последнее значение {tau_low:,.0f} ч")
+    else:
+        st.info(
+            f"Консервативный остаточный ресурс (нижняя граница прогнозного интервала {band_level:.0%}): "
+            f"**{tau_low:,.0f} ч** ({tau_low/8760:.1f} лет)"
+        )
+
+
+def show_monte_carlo_results(monte_carlo: Dict) -> None:
+    """Выводит процентили и гистограмму остаточного ресурса по розыгрышу Монте-Карло."""
+    st.markdown(f"**Монте-Карло: решено {monte_carlo['n_solved']:,} из {monte_carlo['n_samples']:,} наборов**")
+    for message, count in monte_carlo['errors'].items():
+        st.caption(f"{message}: {count:,} наборов ({count / monte_carlo['n_samples']:.1%})")
+    if not monte_carlo['n_solved']:
+        return
+    if not monte_carlo['regression_sampled']:
+        st.caption("Разброс коэффициентов регрессии не учтен")
+
+    st.table(pd.DataFrame({
+        "Процентиль": [f"P{q}" for q in monte_carlo['percentiles']] + ["Среднее", "Ско"],
+        "Остаточный ресурс, ч": [
+            f"{value:,.0f}" for value in
+            list(monte_carlo['percentiles'].values()) + [monte_carlo['mean'], monte_carlo['std']]
+        ],
+        "Лет": [
+            f"{value / 8760:.1f}" for value in
+            list(monte_carlo['percentiles'].values()) + [monte_carlo['mean'], monte_carlo['std']]
+        ]
+    }))
+    counts, edges = monte_carlo['histogram']
+    st.bar_chart(
+        pd.DataFrame({"Число наборов": counts}, index=pd.Index(
+            ((edges[:-1] + edges[1:]) / 2 / 8760).round(2), name="Остаточный ресурс, лет"
+        )),
+        x_label="Остаточный ресурс, лет", y_label="Число наборов"
+    )
+
 
 # --- Основной расчет и построение графика ---
 if st.button("🚀 Построить график и выполнить расчеты"):
@@ -948,157 +1733,70 @@ if st.button("🚀 Построить график и выполнить рас
 
 if st.session_state.show_calculation_results:
     try:
+        stage_cache = st.session_state.stage_cache
+
         # --- 1. Расчет напряжений для фактического состояния (общий график) ---
         sigma_fact_graph = calculate_pipe_stress(p_MPa, d_max, s_min)
         sigma_rasch = k_zapas * sigma_fact_graph
         T_rab = T_rab_C + 273.15
-        
-        if selected_param == "Трунина":
-            P_fact = T_rab * (np.log10(tau_exp) - 2 * np.log10(T_rab) + C) * 1e-3
-        else:
-            P_fact = T_rab * (np.log10(tau_exp) + C) * 1e-3
+        P_fact = calculate_parameter_P(T_rab, tau_exp, selected_param, C)
         
         # --- 2. Расчет для точек испытаний (если есть) ---
         if len(df_tests) > 0:
             df_tests["T_K"] = df_tests["T_C"] + 273.15
-            
-            if selected_param == "Трунина":
-                df_tests["P"] = df_tests["T_K"] * (np.log10(df_tests["tau_h"]) - 2 * np.log10(df_tests["T_K"]) + C) * 1e-3
-            else:
-                df_tests["P"] = df_tests["T_K"] * (np.log10(df_tests["tau_h"]) + C) * 1e-3
-        
-        # --- 3. Построение кривой допускаемых напряжений ---
-        sigma_vals = np.linspace(20, 150, 300)
+            df_tests["P"] = cached_stage(
+                stage_cache, "P", (df_tests["T_C"].values, df_tests["tau_h"].values, selected_param, C),
+                lambda: calculate_parameter_P(df_tests["T_K"].values, df_tests["tau_h"].values, selected_param, C)
+            )
         
-        if selected_steel == "12Х1МФ":
-            P_dop = (24956 - 2400 * np.log10(sigma_vals) - 10.9 * sigma_vals) * 1e-3
-            steel_label = f"12Х1МФ (допускаемое снижение длительной прочности)"
-        elif selected_steel == "12Х18Н12Т":
-            P_dop = (30942 - 3762 * np.log10(sigma_vals) - 16.8 * sigma_vals) * 1e-3
-            steel_label = f"12Х18Н12Т (допускаемое снижение длительной прочности)"
-        elif selected_steel == "ДИ82":
-            P_dop = (40086 - 2400 * np.log10(sigma_vals) - 19.4 * sigma_vals) * 1e-3
-            steel_label = f"ДИ82 (допускаемое снижение длительной прочности)"
-        else:
-            P_dop = (24956 - 2400 * np.log10(sigma_vals) - 10.9 * sigma_vals) * 1e-3
-            steel_label = f"Допускаемое снижение длительной прочности"
+        # --- 3. Кривая допускаемых напряжений (готовые таблицы справочника марок) ---
+        allowable_curve = calculate_allowable_curve(selected_steel)
+        sigma_vals, P_dop, steel_label = allowable_curve
         
         # --- 4. Аппроксимации для выбранных групп ---
         approximations = {}  # Будем хранить параметры аппроксимаций
         
         if len(df_tests) > 0 and selected_approx_groups:
-            # Цвета для линий аппроксимации
-            line_colors = {
-                1: 'blue',
-                2: 'red',
-                3: 'green',
-                4: 'purple',
-                5: 'orange',
-                6: 'brown',
-                7: 'pink',
-                8: 'cyan',
-                9: 'magenta',
-                10: 'olive'
-            }
-            
-            for group_num in selected_approx_groups:
-                group_data = df_tests[df_tests["Группа_аппроксимации"] == group_num]
-                
-                if len(group_data) >= 2:
-                    X = group_data["P"].values
-                    sigma_values = group_data["sigma_MPa"].values
-                    try:
-                        a, b, R2 = build_regression(X, sigma_values)
-
-                        approximations[group_num] = {
-                            'a': a,
-                            'b': b,
-                            'R2': R2,
-                            'count': len(group_data),
-                            'color': line_colors.get(group_num, 'gray'),
-                            'name': st.session_state.group_names.get(str(group_num), f"Группа {group_num}"),
-                            'equation': format_approximation_equation(a, b, selected_param),
-                            'P_values': X,
-                            'sigma_values': sigma_values
-                        }
-                    except Exception as e:
-                        st.warning(f"Не удалось построить аппроксимацию для группы {group_num}: {str(e)}")
-                else:
-                    st.warning(f"Для группы {group_num} недостаточно точек для аппроксимации (нужно минимум 2)")
+            approximations, approx_warnings = build_group_approximations(
+                df_tests, selected_approx_groups, st.session_state.group_names, selected_param, stage_cache
+            )
+            for message in approx_warnings:
+                st.warning(message)
         
         # --- 5. Построение графика ---
-        fig, ax = plt.subplots(figsize=(fig_width_in, fig_height_in))
-        
-        # 1. Кривая допускаемых напряжений
-        ax.plot(P_dop, sigma_vals, 'k-', label=steel_label, linewidth=2)
-        
-        # 2. Точки испытаний (если есть)
-        if len(df_tests) > 0:
-            # Цвета для разных групп точек
-            group_colors = {
-                0: 'gray',      # Точки без аппроксимации
-                1: 'blue',      # Группа 1
-                2: 'red',       # Группа 2
-                3: 'green',     # Группа 3
-                4: 'purple',    # Группа 4
-                5: 'orange',    # Группа 5
-                6: 'brown',     # Группа 6
-                7: 'pink',      # Группа 7
-                8: 'cyan',      # Группа 8
-                9: 'magenta',   # Группа 9
-                10: 'olive'     # Группа 10
-            }
-            
-            # Отображаем точки по группам
-            for group_num in sorted(df_tests["Группа_аппроксимации"].unique()):
-                group_data = df_tests[df_tests["Группа_аппроксимации"] == group_num]
-                color = group_colors.get(group_num, 'gray')
-                
-                if group_num == 0:
-                    label = f'Точки без аппроксимации ({len(group_data)} шт.)'
-                else:
-                    group_name = st.session_state.group_names.get(str(group_num), f"Группа {group_num}")
-                    if group_num in selected_approx_groups:
-                        if group_num in approximations:
-                            label = f'{group_name} ({len(group_data)} точек, R²={approximations[group_num]["R2"]:.3f})'
-                        else:
-                            label = f'{group_name} ({len(group_data)} точек)'
-                    else:
-                        label = f'{group_name} ({len(group_data)} точек, аппроксимация не строится)'
-                
-                ax.scatter(group_data["P"], group_data["sigma_MPa"], 
-                          c=color, s=50, label=label, alpha=0.7)
-        
-        # 3. Аппроксимационные линии для выбранных групп
-        for group_num, approx_data in approximations.items():
-            if group_num in selected_approx_groups:
-                # Строим линию аппроксимации
-                P_appr = (np.log10(sigma_vals) - approx_data['b']) / approx_data['a']
-                ax.plot(P_appr, sigma_vals, color=approx_data['color'], linestyle='--', 
-                       linewidth=1.5, label=f'{approx_data["equation"]}; R²={approx_data["R2"]:.3f}')
-        
-        # Настройка графика
-        ax.set_xlim(P_dop.min() - 0.1, P_dop.max() + 0.1)
-        ax.set_ylim(20, 150)
+        df_points = df_tests[["P", "sigma_MPa", "Группа_аппроксимации"]] if len(df_tests) > 0 else \
+            pd.DataFrame(columns=["P", "sigma_MPa", "Группа_аппроксимации"])
+        figure_approximations = {
+            group_num: {key: approx_data[key] for key in ('a', 'b', 'R2', 'color', 'equation')}
+            for group_num, approx_data in approximations.items()
+        }
+        figure_group_names = dict(st.session_state.group_names)
+        figure_bytes = cached_stage(
+            stage_cache, "График",
+            (df_points, figure_approximations, selected_approx_groups, figure_group_names, selected_steel,
+             selected_param, C, series_name, fig_width_in, fig_height_in, figure_format, show_bands, band_level),
+            lambda: render_figure(
+                build_strength_figure(
+                    df_points, figure_approximations, selected_approx_groups, figure_group_names,
+                    allowable_curve, selected_param, C, selected_steel, series_name,
+                    (fig_width_in, fig_height_in),
+                    calculate_regression_bands(approximations, sigma_vals, band_level) if show_bands else None,
+                    band_level
+                ),
+                FIGURE_FORMATS[figure_format]
+            )
+        )
         
-        if selected_param == "Трунина":
-            xlabel_text = f"Параметр Трунина $\\mathit{{P}} = \\mathit{{T}} \\cdot (\\log_{{10}}(\\mathregular{{τ}}) - 2\\log_{{10}}(\\mathit{{T}}) + {C:.2f}) \\cdot 10^{{-3}}$"
+        if figure_format == "SVG":
+            st.image(figure_bytes.decode("utf-8"), width="content")
         else:
-            xlabel_text = f"Параметр Ларсона-Миллера $\\mathit{{P}} = \\mathit{{T}} \\cdot (\\log_{{10}}(\\mathregular{{τ}}) + {C:.2f}) \\cdot 10^{{-3}}$"
-        
-        ax.set_xlabel(xlabel_text, fontsize=10)
-        ax.set_ylabel("σ, МПа", fontsize=11, fontstyle='normal')
-        ax.set_title(f"Длительная прочность стали {selected_steel} - {series_name}", fontsize=12, pad=15)
-        
-        # Легенда справа от графика
-        ax.legend(fontsize=8, frameon=True, fancybox=True, 
-                 shadow=True, framealpha=0.9, 
-                 bbox_to_anchor=(1.05, 1), loc='upper left')
-        
-        ax.grid(True, alpha=0.3)
-        plt.subplots_adjust(right=0.75)
-        
-        st.pyplot(fig, use_container_width=False)
+            st.image(figure_bytes, width="content")
+        st.download_button(
+            label=f"📥 Скачать график ({figure_format})",
+            data=figure_bytes,
+            file_name=f"grafik_dlitelnoi_prochnosti.{FIGURE_FORMATS[figure_format]}",
+            mime="image/svg+xml" if figure_format == "SVG" else "image/png"
+        )
         
         # --- 6. Уравнения аппроксимации ---
         if approximations:
@@ -1112,6 +1810,26 @@ if st.session_state.show_calculation_results:
                 })
             st.table(pd.DataFrame(eq_rows))
 
+        # --- Запас точек испытаний относительно нормативной кривой ---
+        material = get_material(selected_steel)
+        if len(df_tests) > 0 and material is not None:
+            margin = check_allowable_margin(material, df_tests["P"].values, df_tests["sigma_MPa"].values)
+            below = margin['P_margin'] < 0
+            if below.any():
+                st.warning(
+                    f"⚠️ {int(below.sum())} из {len(df_tests)} точек испытаний лежат ниже кривой "
+                    f"допускаемого снижения длительной прочности стали {selected_steel}"
+                )
+            with st.expander(f"Запас точек испытаний относительно нормативной кривой ({selected_steel})"):
+                st.dataframe(pd.DataFrame({
+                    "Образец": df_tests["Образец"].values,
+                    "σ, МПа": df_tests["sigma_MPa"].values,
+                    "P": df_tests["P"].values.round(3),
+                    "σ_доп при P, МПа": margin['sigma_allow'].round(1),
+                    "Запас по напряжению, %": (margin['stress_margin'] * 100).round(1),
+                    "Запас по P": margin['P_margin'].round(3)
+                }), hide_index=True)
+
         # --- 7. Расчеты остаточного ресурса для каждого индивидуального расчета ---
         if st.session_state.resource_calculations and approximations:
             st.header("Результаты расчетов остаточного ресурса")
@@ -1125,13 +1843,43 @@ if st.session_state.show_calculation_results:
                     
                     # Выполняем расчет
                     calc_params = get_params_for_calculation(calc)
-                    tau_prognoz, calc_results = calculate_residual_resource(
-                        calc_params, approx, selected_param, C, selected_steel, calc_params['s_nom']
+                    solver_inputs = get_solver_inputs(calc_params, approx, selected_param, C)
+                    tau_start = None
+                    # Результат, сохраненный в расчете (в том числе из файла проекта), берется без пересчета
+                    fingerprint = calculation_fingerprint(
+                        calc_params, approx, selected_param, C, selected_steel, solver_method, solver_tolerance
                     )
+                    stored = stored_calculation_result(calc, fingerprint)
+                    if stored is None and calc['id'] in background_calculation_ids():
+                        st.info("⏳ Расчет выполняется в фоне: результат появится после его завершения")
+                        continue
+                    if stored is not None:
+                        tau_prognoz, calc_results = stored
+                    else:
+                        if solver_method == SOLVER_BRACKETED:
+                            tau_start = get_warm_start(calc['id'], solver_inputs)
+                        tau_prognoz, calc_results = cached_stage(
+                            stage_cache, "Остаточный ресурс",
+                            (calc_params, approx['P_values'], approx['sigma_values'], selected_param, C,
+                             selected_steel, solver_method, solver_tolerance),
+                            lambda: calculate_residual_resource(
+                                calc_params, approx, selected_param, C, selected_steel, calc_params['s_nom'],
+                                method=solver_method, tolerance=solver_tolerance, tau_start=tau_start
+                            )
+                        )
+                        store_calculation_result(calc, fingerprint, tau_prognoz, calc_results)
                     
                     if tau_prognoz is not None:
                         if calc_results.get('converged', False):
+                            st.session_state.solver_warm_start[calc['id']] = {
+                                'inputs': solver_inputs,
+                                'tau_prognoz': tau_prognoz
+                            }
                             st.success(f"✅ **Остаточный ресурс: {tau_prognoz:,.0f} ч** ({tau_prognoz/8760:.1f} лет)")
+                            st.caption(
+                                f"{SOLVER_LABELS[solver_method]}: итераций — {len(calc_results['iterations'])}"
+                                + (", старт с предыдущего результата" if tau_start is not None else "")
+                            )
                             
                             reduced_equation = format_reduced_equation(
                                 calc_results['reduced_a'], calc_results['reduced_b']
@@ -1162,10 +1910,28 @@ if st.session_state.show_calculation_results:
                             
                             forecast_df = pd.DataFrame(forecast_data)
                             st.table(forecast_df)
+
+                            if conservative_enabled:
+                                show_conservative_result(
+                                    calc_params, approx, tau_prognoz, stage_cache, solver_method, solver_tolerance
+                                )
                             
                             # Итерации (если нужно)
                             if st.checkbox(f"Показать процесс итераций для {calc['name']}", key=f"show_iters_{idx}"):
                                 st.table(pd.DataFrame(calc_results['iterations']))
+
+                            if monte_carlo_enabled:
+                                monte_carlo = cached_stage(
+                                    stage_cache, "Монте-Карло",
+                                    (calc_params, approx['P_values'], approx['sigma_values'], selected_param, C,
+                                     monte_carlo_uncertainty, monte_carlo_samples, monte_carlo_seed, solver_tolerance),
+                                    lambda: run_monte_carlo(
+                                        calc_params, approx, selected_param, C, monte_carlo_uncertainty,
+                                        monte_carlo_samples, seed=monte_carlo_seed, tolerance=solver_tolerance,
+                                        tau_start=tau_prognoz
+                                    )
+                                )
+                                show_monte_carlo_results(monte_carlo)
                         else:
                             st.warning(f"⚠️ Не удалось достичь полной сходимости. Последнее значение: {tau_prognoz:,.0f} ч")
                             st.info(f"Разница между прогнозом и временем до разрушения: {calc_results['delta']:.0f} ч")
@@ -1194,3 +1960,71 @@ if st.session_state.show_calculation_results:
         st.error(f"Ошибка: {str(e)[:200]}")
         import traceback
         st.text(traceback.format_exc())
+
+# --- Фоновые задачи ---
+st.sidebar.header("⏳ Фоновые задачи")
+if st.session_state.resource_calculations and selected_approx_groups and len(df_tests) > 0:
+    # Расчеты без сохраненного результата при текущих входных данных
+    background_approximations = build_approximations_for_C(C, selected_approx_groups)
+    pending_ids = background_calculation_ids()
+    background_tasks = []
+    for calc in st.session_state.resource_calculations:
+        calc_approx = background_approximations.get(calc['selected_group'])
+        if calc_approx is None or calc['id'] in pending_ids:
+            continue
+        calc_params = get_params_for_calculation(calc)
+        fingerprint = calculation_fingerprint(
+            calc_params, calc_approx, selected_param, C, selected_steel, solver_method, solver_tolerance
+        )
+        if stored_calculation_result(calc, fingerprint) is None:
+            background_tasks.append({
+                'calc_id': calc['id'], 'fingerprint': fingerprint, 'params': calc_params, 'approx': calc_approx,
+                'selected_param': selected_param, 'C': C, 'steel_grade': selected_steel,
+                'method': solver_method, 'tolerance': solver_tolerance,
+            })
+    if background_tasks and st.sidebar.button(f"▶️ Рассчитать в фоне ({len(background_tasks)})",
+                                              help="Расчеты без результата при текущих данных решаются "
+                                                   "в фоне; интерфейс остается доступным"):
+        submit_job(
+            st.session_state.jobs, f"Остаточный ресурс: {len(background_tasks)} расч.", "calculations",
+            solve_calculations_job, background_tasks,
+            payload={'calc_ids': [task['calc_id'] for task in background_tasks]}
+        )
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS if active_jobs(st.session_state.jobs) else None)
+def show_background_jobs() -> None:
+    """Ход фоновых задач; пока они выполняются, панель обновляется без перезапуска страницы."""
+    jobs = st.session_state.jobs
+    if not jobs:
+        st.caption("Нет фоновых задач")
+        return
+    for job in list(jobs.values()):
+        text = f"{job['name']} — {JOB_STATUS_LABELS[job['status']]}"
+        st.progress(min(job['progress'], 1.0), text=f"{text}: {job['message']}" if job['message'] else text)
+        if job['error']:
+            st.caption(f"❌ {job['error']}")
+        if is_job_active(job) and st.button("Отменить", key=f"cancel_job_{job['id']}"):
+            cancel_job(job)
+    if any(not is_job_active(job) for job in jobs.values()) and st.button("Убрать завершенные"):
+        remove_finished_jobs(jobs)
+        st.rerun()
+    # Результаты завершенных задач применяются при полном перезапуске сценария
+    if any(not is_job_active(job) and not job['handled'] for job in jobs.values()):
+        st.rerun()
+
+
+with st.sidebar:
+    show_background_jobs()
+
+# --- Счетчики кэша этапов расчета ---
+with st.sidebar.expander("⚙️ Кэш этапов расчета"):
+    stage_cache = st.session_state.stage_cache
+    st.caption(
+        f"Память кэша: {stage_cache['memory_used'] / 2**20:.1f} "
+        f"из {stage_cache['memory_budget'] / 2**20:.0f} МБ"
+    )
+    st.dataframe(stage_cache_stats(stage_cache), hide_index=True)
+    if st.button("Очистить кэш"):
+        st.session_state.stage_cache = create_stage_cache()
+        st.rerun()
@@ -0,0 +1,146 @@
+"""Фоновое выполнение тяжелых расчетов.
+
+Задача выполняется в пуле рабочих потоков процесса, а сценарий Streamlit только
+читает ее состояние: статус, долю выполнения, сообщение и промежуточные
+результаты. Функция задачи получает словарь задачи первым аргументом, сообщает о
+ходе работы через report_progress и прекращает работу, если тот вернул False
+(задача отменена). Задачу из одного неделимого шага (формирование Word, чтение
+Excel) прервать нельзя: при отмене ее результат просто отбрасывается.
+
+Рабочие потоки не обращаются к st.session_state: результаты применяет сценарий
+при очередном перезапуске. Пул общий для всех сессий, поэтому одновременно
+выполняется не более JOB_WORKERS задач, остальные ждут в очереди.
+"""
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from resource_core import calculate_residual_resource
+
+JOB_WORKERS = 2
+# Период опроса состояния задач интерфейсом, с
+JOB_POLL_SECONDS = 1.0
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_CANCELLED = "cancelled"
+JOB_FAILED = "failed"
+JOB_STATUS_LABELS = {
+    JOB_QUEUED: "В очереди",
+    JOB_RUNNING: "Выполняется",
+    JOB_DONE: "Готово",
+    JOB_CANCELLED: "Отменено",
+    JOB_FAILED: "Ошибка",
+}
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="resource-job")
+_job_ids = itertools.count(1)
+
+
+def submit_job(jobs: Dict[int, Dict], name: str, kind: str, function: Callable, *args,
+               payload: Optional[Dict] = None, **kwargs) -> Dict:
+    """Ставит задачу в очередь пула и регистрирует ее в реестре задач сессии.
+
+    ``kind`` определяет, как сценарий применяет результат; ``payload`` — данные,
+    нужные для этого (например, ключ кэша этапа).
+    """
+    job = {
+        'id': next(_job_ids),
+        'name': name,
+        'kind': kind,
+        'payload': payload or {},
+        'status': JOB_QUEUED,
+        'progress': 0.0,
+        'message': "",
+        'partial': [],
+        # Сколько промежуточных результатов и обработан ли итог — ведет сценарий
+        'partial_applied': 0,
+        'handled': False,
+        'result': None,
+        'error': None,
+        'submitted': time.time(),
+        'started': None,
+        'finished': None,
+        'cancel': threading.Event(),
+    }
+    jobs[job['id']] = job
+    job['future'] = _executor.submit(_run_job, job, function, args, kwargs)
+    return job
+
+
+def _run_job(job: Dict, function: Callable, args, kwargs) -> None:
+    if job['cancel'].is_set():
+        job['status'] = JOB_CANCELLED
+        return
+    job['status'] = JOB_RUNNING
+    job['started'] = time.time()
+    try:
+        result = function(job, *args, **kwargs)
+        if job['cancel'].is_set():
+            job['status'] = JOB_CANCELLED
+        else:
+            job['result'] = result
+            job['progress'] = 1.0
+            job['status'] = JOB_DONE
+    except Exception as e:
+        job['error'] = str(e)
+        job['status'] = JOB_FAILED
+    finally:
+        job['finished'] = time.time()
+
+
+def report_progress(job: Dict, done: int, total: int, message: str = "", partial=None) -> bool:
+    """Обновляет ход выполнения задачи; возвращает False, если задачу нужно прервать."""
+    if partial is not None:
+        job['partial'].append(partial)
+    job['progress'] = done / total if total else 1.0
+    job['message'] = message
+    return not job['cancel'].is_set()
+
+
+def cancel_job(job: Dict) -> None:
+    job['cancel'].set()
+    if job['future'].cancel():
+        job['status'] = JOB_CANCELLED
+        job['finished'] = time.time()
+
+
+def is_job_active(job: Dict) -> bool:
+    return job['status'] in (JOB_QUEUED, JOB_RUNNING)
+
+
+def active_jobs(jobs: Dict[int, Dict], kind: Optional[str] = None) -> List[Dict]:
+    return [job for job in jobs.values() if is_job_active(job) and kind in (None, job['kind'])]
+
+
+def find_job(jobs: Dict[int, Dict], kind: str, key: str) -> Optional[Dict]:
+    """Последняя задача данного вида с ключом входных данных ``payload['key']``."""
+    matching = [job for job in jobs.values() if job['kind'] == kind and job['payload'].get('key') == key]
+    return matching[-1] if matching else None
+
+
+def remove_finished_jobs(jobs: Dict[int, Dict]) -> None:
+    for job_id in [job_id for job_id, job in jobs.items() if not is_job_active(job)]:
+        del jobs[job_id]
+
+
+def solve_calculations_job(job: Dict, tasks: List[Dict]) -> int:
+    """Решает расчеты остаточного ресурса по одному, отдавая каждый результат сразу.
+
+    Задача расчета — словарь с 'calc_id', 'fingerprint', 'params', 'approx',
+    'selected_param', 'C', 'steel_grade', 'method' и 'tolerance'. Промежуточный
+    результат — (calc_id, fingerprint, τ_прогн, подробности). Возвращает число
+    решенных расчетов.
+    """
+    for index, task in enumerate(tasks):
+        tau_prognoz, details = calculate_residual_resource(
+            task['params'], task['approx'], task['selected_param'], task['C'], task['steel_grade'],
+            task['params']['s_nom'], method=task['method'], tolerance=task['tolerance']
+        )
+        partial = (task['calc_id'], task['fingerprint'], tau_prognoz, details)
+        if not report_progress(job, index + 1, len(tasks), f"Решено {index + 1:,} из {len(tasks):,}", partial):
+            return index + 1
+    return len(tasks)
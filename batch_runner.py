@@ -0,0 +1,271 @@
+"""Пакетный пересчет проектов остаточного ресурса из командной строки.
+
+Принимает каталоги или шаблоны путей с проектами (.json в формате
+«проект_ресурса.json») и таблицами испытаний Excel, пересчитывает их в
+нескольких процессах и сохраняет сводную таблицу результатов. Ошибка в одном
+файле не прерывает обработку остальных.
+
+Пример:
+    python batch_runner.py архив/станция_1 "архив/**/*.json" -o итоги.xlsx --docx-dir отчеты
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import as_completed
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from resource_core import (
+    BRACKETED_TOLERANCE,
+    DOCX_AVAILABLE,
+    SOLVER_BRACKETED,
+    SOLVER_LABELS,
+    build_group_approximations,
+    build_word_documents,
+    prepare_project_tests,
+    process_pool,
+    read_test_excel,
+    set_default_coefficients,
+    solve_project,
+)
+
+PROJECT_EXTENSIONS = (".json",)
+EXCEL_EXTENSIONS = (".xlsx", ".xls")
+# Служебные файлы каталогов проектов, которые не являются проектами
+# (индекс сводки по парку первой версии хранился как .json)
+SERVICE_FILE_NAMES = ("сводка_парка.json",)
+
+RESULT_COLUMNS = [
+    "Файл", "Серия", "Марка стали", "Параметр", "C", "Расчет", "Группа",
+    "a", "b", "R²", "Остаточный ресурс, ч", "Остаточный ресурс, лет", "Сходимость", "Ошибка"
+]
+
+
+def collect_input_files(patterns: List[str]) -> List[str]:
+    """Раскрывает каталоги (рекурсивно) и шаблоны путей в упорядоченный список файлов."""
+    extensions = PROJECT_EXTENSIONS + EXCEL_EXTENSIONS
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = glob.glob(os.path.join(pattern, "**", "*"), recursive=True)
+        else:
+            candidates = glob.glob(pattern, recursive=True)
+        files.extend(
+            path for path in candidates
+            if os.path.isfile(path) and path.lower().endswith(extensions)
+            and os.path.basename(path) not in SERVICE_FILE_NAMES
+        )
+    return sorted(dict.fromkeys(os.path.abspath(path) for path in files))
+
+
+def _approximation_columns(approx: Optional[Dict]) -> Dict:
+    if approx is None:
+        return {"a": None, "b": None, "R²": None}
+    return {"a": approx['a'], "b": approx['b'], "R²": approx['R2']}
+
+
+def process_project(path: str, options: Dict) -> Tuple[List[Dict], Optional[Tuple[bytes, bytes]]]:
+    """Пересчитывает один проект .json; возвращает строки сводной таблицы и документы Word."""
+    with open(path, encoding="utf-8") as project_file:
+        project = json.load(project_file)
+
+    selected_param = project.get("выбранный_параметр", "Трунина")
+    C = options['C'].get(selected_param)
+    solved = solve_project(project, method=options['method'], tolerance=options['tolerance'], C=C)
+
+    rows = []
+    for calc in solved['calculations']:
+        tau_prognoz = calc['tau_prognoz']
+        details = calc['details']
+        rows.append({
+            "Серия": solved['series_name'],
+            "Марка стали": solved['steel_grade'],
+            "Параметр": solved['selected_param'],
+            "C": solved['C'],
+            "Расчет": calc['name'],
+            "Группа": calc['selected_group'],
+            **_approximation_columns(solved['approximations'].get(calc['selected_group'])),
+            "Остаточный ресурс, ч": tau_prognoz,
+            "Остаточный ресурс, лет": tau_prognoz / 8760 if tau_prognoz is not None else None,
+            "Сходимость": details.get('converged'),
+            "Ошибка": details.get('error', "")
+        })
+
+    documents = None
+    if options['docx'] and not solved['df_tests'].empty:
+        documents = build_word_documents(
+            solved['series_name'], solved['df_tests'], solved['selected_param'], solved['C']
+        )
+    return rows, documents
+
+
+def process_excel(path: str, options: Dict) -> Tuple[List[Dict], Optional[Tuple[bytes, bytes]]]:
+    """Строит аппроксимации по таблице испытаний Excel (без расчета ресурса: нет параметров трубы)."""
+    with open(path, "rb") as excel_file:
+        records, missing_columns = read_test_excel(excel_file.read())
+    if missing_columns:
+        raise ValueError(f"в файле отсутствуют столбцы: {missing_columns}")
+
+    selected_param = options['param']
+    C = options['C'].get(selected_param)
+    if C is None:
+        C = set_default_coefficients(options['steel'], selected_param)
+    df_tests = prepare_project_tests(records, selected_param, C)
+    groups = sorted(group for group in df_tests["Группа_аппроксимации"].unique() if group > 0)
+    approximations, warnings = build_group_approximations(df_tests, groups, {}, selected_param)
+
+    series_name = os.path.splitext(os.path.basename(path))[0]
+    rows = [{
+        "Серия": series_name,
+        "Марка стали": options['steel'],
+        "Параметр": selected_param,
+        "C": C,
+        "Расчет": "",
+        "Группа": group,
+        **_approximation_columns(approx),
+        "Ошибка": ""
+    } for group, approx in approximations.items()]
+    rows.extend({
+        "Серия": series_name,
+        "Марка стали": options['steel'],
+        "Параметр": selected_param,
+        "C": C,
+        "Ошибка": warning
+    } for warning in warnings)
+
+    documents = None
+    if options['docx'] and not df_tests.empty:
+        documents = build_word_documents(series_name, df_tests, selected_param, C)
+    return rows, documents
+
+
+def process_file(path: str, options: Dict) -> Tuple[List[Dict], Optional[Tuple[bytes, bytes]]]:
+    """Обрабатывает один файл в рабочем процессе."""
+    if path.lower().endswith(PROJECT_EXTENSIONS):
+        rows, documents = process_project(path, options)
+    else:
+        rows, documents = process_excel(path, options)
+    for row in rows:
+        row["Файл"] = path
+    return rows, documents
+
+
+def document_stems(files: List[str]) -> Dict[str, str]:
+    """Имена документов Word для файлов: путь относительно общего каталога без расширения.
+
+    Подкаталоги входят в имя через «__» (станция_1/проект.json → станция_1__проект),
+    поэтому одноименные проекты разных каталогов не перезаписывают документы друг
+    друга. Если имена все же совпали (проект и таблица Excel с одним именем),
+    к имени добавляется расширение, а затем номер.
+    """
+    if not files:
+        return {}
+    root = os.path.commonpath([os.path.dirname(path) for path in files])
+    stems = {}
+    used = set()
+    for path in files:
+        base, extension = os.path.splitext(os.path.relpath(path, root))
+        stem = base.replace(os.sep, "__")
+        if stem in used:
+            stem = f"{stem}_{extension.lstrip('.')}"
+        candidate, number = stem, 2
+        while candidate in used:
+            candidate, number = f"{stem}_{number}", number + 1
+        used.add(candidate)
+        stems[path] = candidate
+    return stems
+
+
+def write_documents(stem: str, documents: Tuple[bytes, bytes], docx_dir: str) -> None:
+    word_table, word_report = documents
+    with open(os.path.join(docx_dir, f"{stem}_таблица.docx"), "wb") as output:
+        output.write(word_table)
+    with open(os.path.join(docx_dir, f"{stem}_отчет.docx"), "wb") as output:
+        output.write(word_report)
+
+
+def write_results(results: pd.DataFrame, output_path: str) -> None:
+    """Сохраняет сводную таблицу в .xlsx или .csv (по расширению файла)."""
+    if output_path.lower().endswith(".xlsx"):
+        results.to_excel(output_path, index=False, sheet_name="Остаточный ресурс")
+    else:
+        results.to_csv(output_path, index=False, encoding="utf-8-sig")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Пакетный пересчет остаточного ресурса по проектам .json и таблицам испытаний Excel"
+    )
+    parser.add_argument("inputs", nargs="+", help="каталоги или шаблоны путей (например, 'архив/**/*.json')")
+    parser.add_argument("-o", "--output", default="итоги_ресурса.xlsx", help="сводная таблица (.xlsx или .csv)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="число рабочих процессов")
+    parser.add_argument("--docx-dir", help="каталог для документов Word по каждому файлу")
+    parser.add_argument("--method", choices=list(SOLVER_LABELS), default=SOLVER_BRACKETED,
+                        help="метод решения уравнения остаточного ресурса")
+    parser.add_argument("--tolerance", type=float, default=BRACKETED_TOLERANCE, help="допуск сходимости, ч")
+    parser.add_argument("--c-trunin", type=float, help="новый коэффициент C параметра Трунина")
+    parser.add_argument("--c-larson", type=float, help="новый коэффициент C параметра Ларсона-Миллера")
+    parser.add_argument("--param", choices=["Трунина", "Ларсона-Миллера"], default="Трунина",
+                        help="параметр долговечности для таблиц Excel")
+    parser.add_argument("--steel", default="12Х1МФ", help="марка стали для таблиц Excel")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    files = collect_input_files(args.inputs)
+    if not files:
+        print("Файлы проектов не найдены", file=sys.stderr)
+        return 1
+    if args.docx_dir:
+        if not DOCX_AVAILABLE:
+            print("Документы Word не будут созданы: не установлен пакет python-docx", file=sys.stderr)
+        else:
+            os.makedirs(args.docx_dir, exist_ok=True)
+
+    options = {
+        'method': args.method,
+        'tolerance': args.tolerance,
+        'C': {
+            name: value for name, value in
+            (("Трунина", args.c_trunin), ("Ларсона-Миллера", args.c_larson)) if value is not None
+        },
+        'param': args.param,
+        'steel': args.steel,
+        'docx': bool(args.docx_dir) and DOCX_AVAILABLE,
+    }
+
+    stems = document_stems(files)
+    rows = []
+    failures = 0
+    with process_pool(max(1, args.workers or 1)) as executor:
+        futures = {executor.submit(process_file, path, options): path for path in files}
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                file_rows, documents = future.result()
+            except Exception as e:
+                failures += 1
+                rows.append({"Файл": path, "Ошибка": f"Файл не обработан: {e}"})
+                print(f"[{done}/{len(files)}] ❌ {path}: {e}", file=sys.stderr)
+                continue
+            rows.extend(file_rows)
+            if documents is not None:
+                write_documents(stems[path], documents, args.docx_dir)
+            print(f"[{done}/{len(files)}] ✅ {path}: строк {len(file_rows)}", file=sys.stderr)
+
+    results = pd.DataFrame(rows, columns=RESULT_COLUMNS).sort_values("Файл", kind="stable")
+    results["Группа"] = results["Группа"].astype("Int64")
+    write_results(results, args.output)
+    print(
+        f"Обработано файлов: {len(files) - failures} из {len(files)}; результаты: {args.output}",
+        file=sys.stderr
+    )
+    return 0 if failures == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""Столбцовое хранилище больших наборов данных с отображением файлов в память.
+
+Хранилище — каталог с небольшим manifest.json и файлами .npy по одному на
+столбец. Числовые столбцы открываются через np.load(mmap_mode='r') и читаются
+с диска по мере обращения, поэтому открытие хранилища читает только манифест и
+не зависит от объема данных. Строковые столбцы хранятся кодами int32 и
+справочником значений. Набор можно упорядочить по ключу (например, змеевик и
+труба) с таблицей границ групп; тогда групповые свертки идут порциями прямо по
+отображенным массивам.
+
+Пример преобразования карты толщин:
+    python columnar_store.py карта.csv архив.rstore --tests испытания.xlsx
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+STORE_FORMAT = "resource-store"
+STORE_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+STORE_SUFFIX = ".rstore"
+
+THICKNESS_DATASET = "thickness"
+TESTS_DATASET = "tests"
+THICKNESS_GROUP_COLUMNS = ["Змеевик", "Труба"]
+
+# Число замеров, обрабатываемых за одну порцию групповой свертки
+REDUCE_CHUNK_ROWS = 1_000_000
+
+
+def _write_array(path: str, filename: str, values: np.ndarray) -> str:
+    np.save(os.path.join(path, filename), np.ascontiguousarray(values), allow_pickle=False)
+    return filename
+
+
+def write_store(path: str, datasets: Dict[str, pd.DataFrame], metadata: Optional[Dict] = None,
+                group_by: Optional[Dict[str, List[str]]] = None) -> Dict:
+    """Записывает таблицы в хранилище и возвращает его манифест.
+
+    ``group_by`` задает для набора столбцы ключа: строки упорядочиваются по ключу
+    (порядок групп — порядок первого появления), а границы групп сохраняются.
+    Существующее хранилище заменяется целиком только после успешной записи.
+    """
+    group_by = group_by or {}
+    temp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    os.makedirs(temp_path)
+    try:
+        manifest = {
+            "format": STORE_FORMAT,
+            "version": STORE_VERSION,
+            "id": uuid.uuid4().hex,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "metadata": metadata or {},
+            "datasets": {},
+        }
+        for dataset_index, (name, frame) in enumerate(datasets.items()):
+            prefix = f"d{dataset_index}"
+            codes = {}
+            columns = {}
+            for column_index, column in enumerate(frame.columns):
+                values = frame[column]
+                stem = f"{prefix}.c{column_index}"
+                if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+                    columns[column] = {"kind": "numeric", "array": values.to_numpy()}
+                else:
+                    column_codes, categories = pd.factorize(values.astype(str), sort=False)
+                    codes[column] = column_codes.astype(np.int32)
+                    columns[column] = {
+                        "kind": "category",
+                        "array": codes[column],
+                        "categories": _write_array(temp_path, f"{stem}.categories.npy",
+                                                   np.asarray(categories, dtype=str)),
+                    }
+
+            entry = {"rows": len(frame), "columns": {}}
+            order = None
+            keys = group_by.get(name)
+            if keys:
+                # Номера групп — по первому появлению сочетания значений ключа, как
+                # в groupby(sort=False); устойчивая сортировка сохраняет порядок строк в группе
+                groups = pd.DataFrame({key: codes[key] for key in keys}).groupby(keys, sort=False).ngroup()
+                order = np.argsort(groups.to_numpy(), kind="stable")
+                starts = np.flatnonzero(np.diff(groups.to_numpy()[order])) + 1
+                offsets = np.concatenate([[0], starts, [len(frame)]]).astype(np.int64)
+                entry["group_by"] = list(keys)
+                entry["offsets"] = _write_array(temp_path, f"{prefix}.offsets.npy", offsets)
+
+            for column_index, (column, spec) in enumerate(columns.items()):
+                array = spec.pop("array")
+                spec["file"] = _write_array(
+                    temp_path, f"{prefix}.c{column_index}.npy", array if order is None else array[order]
+                )
+                entry["columns"][column] = spec
+            manifest["datasets"][name] = entry
+
+        with open(os.path.join(temp_path, MANIFEST_FILE), "w", encoding="utf-8") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2, ensure_ascii=False)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(temp_path, path)
+    except Exception:
+        shutil.rmtree(temp_path, ignore_errors=True)
+        raise
+    return manifest
+
+
+def open_store(path: str) -> Dict:
+    """Открывает хранилище: читает только манифест, массивы не загружаются."""
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.isfile(manifest_path):
+        raise FileNotFoundError(f"Не найден манифест хранилища: {manifest_path}")
+    with open(manifest_path, encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get("format") != STORE_FORMAT or manifest.get("version", 0) > STORE_VERSION:
+        raise ValueError(f"Неподдерживаемый формат хранилища: {path}")
+    return {"path": os.path.abspath(path), "manifest": manifest}
+
+
+def _load(store: Dict, filename: str) -> np.ndarray:
+    return np.load(os.path.join(store["path"], filename), mmap_mode="r", allow_pickle=False)
+
+
+def dataset_columns(store: Dict, name: str) -> Dict[str, np.ndarray]:
+    """Отображенные в память массивы столбцов набора (без копирования).
+
+    Для строковых столбцов возвращаются коды; значения — в dataset_categories.
+    """
+    entry = store["manifest"]["datasets"][name]
+    return {column: _load(store, spec["file"]) for column, spec in entry["columns"].items()}
+
+
+def dataset_categories(store: Dict, name: str, column: str) -> np.ndarray:
+    return _load(store, store["manifest"]["datasets"][name]["columns"][column]["categories"])
+
+
+def dataset_frame(store: Dict, name: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Загружает набор (или его часть) в таблицу — для небольших наборов."""
+    entry = store["manifest"]["datasets"][name]
+    arrays = dataset_columns(store, name)
+    frame = {}
+    for column in columns or list(entry["columns"]):
+        if entry["columns"][column]["kind"] == "category":
+            frame[column] = dataset_categories(store, name, column)[arrays[column]]
+        else:
+            frame[column] = np.asarray(arrays[column])
+    return pd.DataFrame(frame)
+
+
+def reduce_store_tubes(store: Dict, name: str = THICKNESS_DATASET,
+                       chunk_rows: int = REDUCE_CHUNK_ROWS) -> pd.DataFrame:
+    """Сводит замеры толщины по трубам так же, как reduce_tube_thickness.
+
+    Замеры в хранилище упорядочены по трубам, поэтому минимум, максимум и
+    позиция минимума каждой трубы считаются через reduceat по отрезкам
+    отображенных массивов; в памяти одновременно находится не более одной порции.
+    """
+    entry = store["manifest"]["datasets"][name]
+    if entry.get("group_by") != THICKNESS_GROUP_COLUMNS:
+        raise ValueError("Набор замеров не упорядочен по змеевикам и трубам")
+    columns = dataset_columns(store, name)
+    offsets = _load(store, entry["offsets"])
+    thickness = columns["Толщина"]
+    n_tubes = offsets.size - 1
+
+    parts = []
+    first = 0
+    while first < n_tubes:
+        # Порция — целое число труб, не меньше одной
+        last = max(first + 1, int(np.searchsorted(offsets, offsets[first] + chunk_rows, side="right")) - 1)
+        last = min(last, n_tubes)
+        start, stop = int(offsets[first]), int(offsets[last])
+        local = np.asarray(offsets[first:last]) - start
+        counts = np.diff(offsets[first:last + 1])
+        values = np.asarray(thickness[start:stop])
+
+        s_min = np.minimum.reduceat(values, local)
+        index = np.arange(stop - start)
+        argmin = np.minimum.reduceat(np.where(values == np.repeat(s_min, counts), index, stop - start), local)
+        part = {
+            "Змеевик": np.asarray(columns["Змеевик"][start + local]),
+            "Труба": np.asarray(columns["Труба"][start + local]),
+            "Замеров": counts,
+            "s_min": s_min,
+            "s_max": np.maximum.reduceat(values, local),
+        }
+        if "Диаметр" in columns:
+            part["d_max"] = np.fmax.reduceat(np.asarray(columns["Диаметр"][start:stop]), local)
+        part["Позиция s_мин"] = np.asarray(columns["Позиция"][start:stop])[argmin]
+        parts.append(part)
+        first = last
+
+    tubes = pd.DataFrame({key: np.concatenate([part[key] for part in parts]) for key in parts[0]})
+    for column in THICKNESS_GROUP_COLUMNS:
+        tubes[column] = dataset_categories(store, name, column)[tubes[column].values]
+    return tubes
+
+
+def describe_store(store: Dict) -> pd.DataFrame:
+    """Наборы хранилища и их размеры на диске."""
+    rows = []
+    for name, entry in store["manifest"]["datasets"].items():
+        files = [spec["file"] for spec in entry["columns"].values()]
+        files += [spec["categories"] for spec in entry["columns"].values() if "categories" in spec]
+        size = sum(os.path.getsize(os.path.join(store["path"], filename)) for filename in files)
+        rows.append({"Набор": name, "Строк": entry["rows"], "Столбцов": len(entry["columns"]),
+                     "На диске, МБ": round(size / 2**20, 1)})
+    return pd.DataFrame(rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from resource_core import make_test_dataframe, read_test_excel
+    from thickness_maps import read_thickness_map
+
+    parser = argparse.ArgumentParser(description="Преобразование карты толщин и испытаний в хранилище")
+    parser.add_argument("thickness_map", help="карта толщин (.csv, .xlsx)")
+    parser.add_argument("output", help=f"каталог хранилища (обычно с расширением {STORE_SUFFIX})")
+    parser.add_argument("--tests", help="таблица испытаний Excel")
+    args = parser.parse_args(argv)
+
+    with open(args.thickness_map, "rb") as map_file:
+        readings, missing = read_thickness_map(map_file.read(), args.thickness_map)
+    if missing:
+        print(f"В карте толщин отсутствуют столбцы: {missing}", file=sys.stderr)
+        return 1
+    datasets = {THICKNESS_DATASET: readings}
+    if args.tests:
+        with open(args.tests, "rb") as tests_file:
+            records, missing = read_test_excel(tests_file.read())
+        if missing:
+            print(f"В таблице испытаний отсутствуют столбцы: {missing}", file=sys.stderr)
+            return 1
+        datasets[TESTS_DATASET] = make_test_dataframe(records)
+
+    write_store(args.output, datasets, {"источник": os.path.basename(args.thickness_map)},
+                group_by={THICKNESS_DATASET: THICKNESS_GROUP_COLUMNS})
+    print(f"Записано замеров: {len(readings):,}; хранилище: {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Сводка остаточного ресурса по парку: все проекты каталога в одной таблице.
+
+Проекты .json каталога (рекурсивно) пересчитываются в рабочих процессах
+функцией batch_runner.process_project. Строки результатов каждого файла
+сохраняются в индексе сводки (файл .fleetindex, который не принимается за
+проект ни одной программой) вместе с хэшем содержимого файла, поэтому при
+повторном открытии пересчитываются только новые и измененные файлы, а
+удаленные исключаются. Объект (станция, котел) — относительный каталог файла,
+проект — имя файла.
+
+Пример:
+    python fleet_rollup.py архив -o сводка_парка.xlsx
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import as_completed
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from batch_runner import PROJECT_EXTENSIONS, collect_input_files, process_project
+from resource_core import BRACKETED_TOLERANCE, SOLVER_BRACKETED, hash_stage_inputs, process_pool
+
+FLEET_INDEX_FILE = "сводка_парка.fleetindex"
+FLEET_INDEX_VERSION = 1
+# Число труб (расчетов) с наименьшим ресурсом в сводке
+FLEET_WORST_COUNT = 20
+
+FLEET_COLUMNS = [
+    "Объект", "Проект", "Серия", "Марка стали", "Параметр", "Расчет", "Группа",
+    "Остаточный ресурс, ч", "Остаточный ресурс, лет", "Сходимость", "Ошибка"
+]
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as source:
+        return hashlib.md5(source.read()).hexdigest()
+
+
+def load_fleet_index(path: str) -> Dict:
+    """Индекс сводки из файла; при отсутствии или несовместимости — пустой индекс."""
+    try:
+        with open(path, encoding="utf-8") as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        return {'version': FLEET_INDEX_VERSION, 'options': None, 'files': {}}
+    if index.get('version') != FLEET_INDEX_VERSION:
+        return {'version': FLEET_INDEX_VERSION, 'options': None, 'files': {}}
+    return index
+
+
+def save_fleet_index(index: Dict, path: str) -> None:
+    """Записывает индекс через временный файл, чтобы прерванная запись не портила прежний."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as index_file:
+        json.dump(index, index_file, ensure_ascii=False, default=lambda value: value.item())
+    os.replace(temp_path, path)
+
+
+def _solve_fleet_file(path: str, options: Dict) -> List[Dict]:
+    """Строки сводки одного проекта (выполняется в рабочем процессе)."""
+    return process_project(path, options)[0]
+
+
+def update_fleet_index(folder: str, index_path: Optional[str] = None, method: str = SOLVER_BRACKETED,
+                       tolerance: float = BRACKETED_TOLERANCE, workers: Optional[int] = None,
+                       progress: Optional[Callable[[int, int], bool]] = None) -> Dict:
+    """Обновляет индекс сводки каталога и возвращает его.
+
+    Пересчитываются файлы, хэш содержимого которых отличается от записанного в
+    индексе; при смене метода или допуска — все файлы. ``progress(done, total)``
+    вызывается после каждого пересчитанного файла; если он вернул False,
+    оставшиеся файлы не пересчитываются, а индекс сохраняется с уже готовыми.
+    В индекс добавляется 'reprocessed' — число пересчитанных файлов.
+    """
+    index_path = index_path or os.path.join(folder, FLEET_INDEX_FILE)
+    index = load_fleet_index(index_path)
+    options = {'method': method, 'tolerance': tolerance, 'C': {}, 'docx': False}
+    options_key = hash_stage_inputs((method, float(tolerance)))
+    previous = index['files'] if index.get('options') == options_key else {}
+
+    files = {}
+    stale = []
+    for path in collect_input_files([folder]):
+        if not path.lower().endswith(PROJECT_EXTENSIONS):
+            continue
+        relative = os.path.relpath(path, folder)
+        content_hash = file_hash(path)
+        if previous.get(relative, {}).get('hash') == content_hash:
+            files[relative] = previous[relative]
+        else:
+            stale.append((relative, path, content_hash))
+
+    cancelled = False
+    if stale:
+        executor = process_pool(max(1, min(workers or os.cpu_count() or 1, len(stale))))
+        try:
+            futures = {executor.submit(_solve_fleet_file, path, options): (relative, content_hash)
+                       for relative, path, content_hash in stale}
+            for done, future in enumerate(as_completed(futures), start=1):
+                relative, content_hash = futures[future]
+                try:
+                    files[relative] = {'hash': content_hash, 'rows': future.result(), 'error': ""}
+                except Exception as e:
+                    files[relative] = {'hash': content_hash, 'rows': [], 'error': f"Файл не обработан: {e}"}
+                if progress is not None and not progress(done, len(stale)):
+                    cancelled = True
+                    break
+        finally:
+            executor.shutdown(wait=True, cancel_futures=cancelled)
+
+    index = {'version': FLEET_INDEX_VERSION, 'options': options_key, 'files': dict(sorted(files.items()))}
+    save_fleet_index(index, index_path)
+    index['reprocessed'] = len(stale) if not cancelled else sum(relative in files for relative, _, _ in stale)
+    return index
+
+
+def fleet_table(index: Dict) -> pd.DataFrame:
+    """Все расчеты индекса в одной таблице (строка на расчет или на необработанный файл)."""
+    rows = []
+    for relative, entry in index['files'].items():
+        unit = os.path.dirname(relative) or "."
+        project = os.path.splitext(os.path.basename(relative))[0]
+        if entry['error']:
+            rows.append({"Объект": unit, "Проект": project, "Ошибка": entry['error']})
+        rows.extend({**row, "Объект": unit, "Проект": project} for row in entry['rows'])
+    table = pd.DataFrame(rows, columns=FLEET_COLUMNS)
+    table["Группа"] = table["Группа"].astype("Int64")
+    table["Ошибка"] = table["Ошибка"].fillna("")
+    return table
+
+
+def summarize_fleet(table: pd.DataFrame, worst_count: int = FLEET_WORST_COUNT) -> Dict[str, pd.DataFrame]:
+    """Сводка по объектам, трубы с наименьшим ресурсом и расчеты без результата.
+
+    Расчет без результата — не сошедшийся, с ошибкой или из необработанного файла.
+    """
+    tau = pd.to_numeric(table["Остаточный ресурс, ч"], errors='coerce')
+    failed = (table["Сходимость"] != True) | (table["Ошибка"] != "") | tau.isna()
+    solved = table[~failed].assign(**{"Остаточный ресурс, ч": tau[~failed]})
+
+    units = table.groupby("Объект", sort=True).agg(
+        **{"Проектов": ("Проект", "nunique"), "Расчетов": ("Расчет", "count")}
+    )
+    units["Без результата"] = failed.groupby(table["Объект"]).sum()
+    resource = solved.groupby("Объект")["Остаточный ресурс, ч"]
+    units["Мин. ресурс, ч"] = resource.min()
+    units["Медиана ресурса, ч"] = resource.median()
+    worst_rows = solved.loc[resource.idxmin()].set_index("Объект")
+    units["Худший расчет"] = (worst_rows["Проект"] + " / " + worst_rows["Расчет"]).reindex(units.index)
+    units["Мин. ресурс, лет"] = units["Мин. ресурс, ч"] / 8760
+
+    return {
+        'units': units.reset_index(),
+        'worst': solved.nsmallest(worst_count, "Остаточный ресурс, ч")[
+            ["Объект", "Проект", "Расчет", "Марка стали", "Остаточный ресурс, ч", "Остаточный ресурс, лет"]
+        ],
+        'failed': table[failed][["Объект", "Проект", "Расчет", "Сходимость", "Ошибка"]],
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Сводка остаточного ресурса по всем проектам каталога")
+    parser.add_argument("folder", help="каталог с проектами .json (просматривается рекурсивно)")
+    parser.add_argument("-o", "--output", default="сводка_парка.xlsx", help="файл сводки (.xlsx)")
+    parser.add_argument("--index", help=f"файл индекса (по умолчанию {FLEET_INDEX_FILE} в каталоге)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="число рабочих процессов")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if not os.path.isdir(args.folder):
+        print(f"Каталог не найден: {args.folder}", file=sys.stderr)
+        return 1
+    index = update_fleet_index(args.folder, args.index, workers=args.workers)
+    table = fleet_table(index)
+    summary = summarize_fleet(table)
+    with pd.ExcelWriter(args.output) as writer:
+        summary['units'].to_excel(writer, index=False, sheet_name="Объекты")
+        summary['worst'].to_excel(writer, index=False, sheet_name="Худшие трубы")
+        summary['failed'].to_excel(writer, index=False, sheet_name="Без результата")
+        table.to_excel(writer, index=False, sheet_name="Все расчеты")
+    print(
+        f"Проектов: {len(index['files'])}, пересчитано: {index['reprocessed']}; сводка: {args.output}",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
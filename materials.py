@@ -0,0 +1,111 @@
+"""Справочник марок стали для расчета остаточного ресурса.
+
+Марки описываются в файле materials.json: коэффициенты C параметров Трунина и
+Ларсона-Миллера и коэффициенты кривой допускаемого снижения длительной прочности
+P_доп = (A − B·lg σ − D·σ)·10⁻³. Новая марка добавляется записью в файл, без
+изменения кода. Таблицы P(σ) строятся один раз на процесс, общие для всех сессий,
+и пересобираются только при изменении файла.
+"""
+import json
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+MATERIALS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "materials.json")
+DEFAULT_MATERIAL = "12Х1МФ"
+DEFAULT_C = 20.0
+
+# Сетка кривой для графика и плотная таблица для обратного поиска σ(P)
+CURVE_PLOT_POINTS = 300
+CURVE_TABLE_POINTS = 4096
+
+
+def allowable_parameter(sigma, curve: Dict):
+    """P_доп по кривой допускаемого снижения длительной прочности (числа или массивы)."""
+    sigma = np.asarray(sigma, dtype=float)
+    return (curve['A'] - curve['B'] * np.log10(sigma) - curve['D'] * sigma) * 1e-3
+
+
+def _read_only(values: np.ndarray) -> np.ndarray:
+    values.setflags(write=False)
+    return values
+
+
+def build_material_tables(name: str, spec: Dict) -> Dict:
+    """Проверяет описание марки и строит ее таблицы P_доп(σ)."""
+    try:
+        curve = {key: float(spec['allowable_curve'][key]) for key in ("A", "B", "D")}
+        sigma_min, sigma_max = (float(value) for value in spec.get('sigma_range', (20, 150)))
+        C_values = {param: float(value) for param, value in spec.get('C', {}).items()}
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Некорректное описание марки {name}: {e}") from e
+    if not 0 < sigma_min < sigma_max:
+        raise ValueError(f"Некорректный диапазон напряжений марки {name}: {sigma_min}–{sigma_max}")
+
+    sigma_table = np.linspace(sigma_min, sigma_max, CURVE_TABLE_POINTS)
+    P_table = allowable_parameter(sigma_table, curve)
+    if not np.all(np.diff(P_table) < 0):
+        raise ValueError(f"Кривая P_доп марки {name} должна убывать с ростом напряжения")
+    sigma_plot = np.linspace(sigma_min, sigma_max, CURVE_PLOT_POINTS)
+
+    return {
+        'name': name,
+        'label': spec.get('label', f"{name} (допускаемое снижение длительной прочности)"),
+        'C': C_values,
+        'curve': curve,
+        'sigma_range': (sigma_min, sigma_max),
+        'plot_sigma': _read_only(sigma_plot),
+        'plot_P': _read_only(allowable_parameter(sigma_plot, curve)),
+        # Для np.interp таблица хранится по возрастанию P
+        'table_P': _read_only(P_table[::-1].copy()),
+        'table_sigma': _read_only(sigma_table[::-1].copy()),
+    }
+
+
+@lru_cache(maxsize=4)
+def _load_registry(path: str, modified: float) -> Dict[str, Dict]:
+    with open(path, encoding="utf-8") as registry_file:
+        specs = json.load(registry_file)
+    if not specs:
+        raise ValueError(f"В справочнике марок {path} нет ни одной марки")
+    return {name: build_material_tables(name, spec) for name, spec in specs.items()}
+
+
+def load_material_registry(path: str = MATERIALS_FILE) -> Dict[str, Dict]:
+    """Справочник марок с таблицами; повторные вызовы берут его из кэша процесса."""
+    return _load_registry(os.path.abspath(path), os.path.getmtime(path))
+
+
+def material_names(path: str = MATERIALS_FILE) -> List[str]:
+    return list(load_material_registry(path))
+
+
+def get_material(steel_grade: str, path: str = MATERIALS_FILE) -> Optional[Dict]:
+    return load_material_registry(path).get(steel_grade)
+
+
+def allowable_stress(material: Dict, P_values) -> np.ndarray:
+    """Обратный поиск σ_доп(P) по плотной таблице; вне диапазона кривой — NaN."""
+    return np.interp(
+        np.asarray(P_values, dtype=float), material['table_P'], material['table_sigma'],
+        left=np.nan, right=np.nan
+    )
+
+
+def check_allowable_margin(material: Dict, P_values, sigma_values) -> Dict[str, np.ndarray]:
+    """Запас точек испытаний относительно нормативной кривой.
+
+    Для каждой точки возвращает σ_доп при ее P, относительный запас по напряжению
+    σ/σ_доп − 1 и запас по параметру P − P_доп(σ). Отрицательный запас означает,
+    что точка лежит ниже кривой допускаемого снижения длительной прочности.
+    """
+    P_values = np.asarray(P_values, dtype=float)
+    sigma_values = np.asarray(sigma_values, dtype=float)
+    sigma_allow = allowable_stress(material, P_values)
+    return {
+        'sigma_allow': sigma_allow,
+        'stress_margin': sigma_values / sigma_allow - 1,
+        'P_margin': P_values - allowable_parameter(sigma_values, material['curve']),
+    }
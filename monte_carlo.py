@@ -0,0 +1,147 @@
+"""Оценка неопределенности остаточного ресурса методом Монте-Карло.
+
+Коэффициенты регрессии разыгрываются по их ковариации, толщины стенки — с
+погрешностью измерения, давление и температура — равномерно в пределах допуска.
+Каждая порция наборов решается пакетным решателем calculate_residual_resource_batch;
+в памяти остаются только полученные значения ресурса. При большом числе наборов
+порции распределяются по процессам.
+"""
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from resource_core import (
+    BRACKETED_TOLERANCE,
+    RESIDUAL_ERROR_MESSAGES,
+    RESIDUAL_OK,
+    SOLVER_BRACKETED,
+    build_regression_statistics,
+    calculate_residual_resource_batch,
+    process_pool,
+)
+
+MONTE_CARLO_SAMPLE_SIZES = (10_000, 100_000, 1_000_000)
+# Размер порции ограничивает память решателя (~20 массивов float64 на порцию)
+MONTE_CARLO_CHUNK_SIZE = 100_000
+# Начиная с этого числа наборов порции решаются в нескольких процессах
+MONTE_CARLO_PARALLEL_THRESHOLD = 500_000
+MONTE_CARLO_PERCENTILES = (1, 5, 10, 50, 90, 95, 99)
+MONTE_CARLO_HISTOGRAM_BINS = 50
+
+DEFAULT_UNCERTAINTY = {
+    'thickness_sd': 0.1,
+    'pressure_tol': 0.0,
+    'temperature_tol': 5.0,
+    'regression': True,
+}
+
+
+def sample_monte_carlo_inputs(rng: np.random.Generator, size: int, params: Dict,
+                              regression_stats: Dict, uncertainty: Dict) -> Dict[str, np.ndarray]:
+    """Разыгрывает входные данные решателя для size наборов."""
+    thickness_sd = float(uncertainty.get('thickness_sd', 0.0))
+    pressure_tol = float(uncertainty.get('pressure_tol', 0.0))
+    temperature_tol = float(uncertainty.get('temperature_tol', 0.0))
+
+    if uncertainty.get('regression', True) and regression_stats['dof'] > 0:
+        coefficients = rng.multivariate_normal(
+            [regression_stats['a'], regression_stats['b']], regression_stats['cov'], size=size
+        )
+        a, b = coefficients[:, 0], coefficients[:, 1]
+    else:
+        a, b = regression_stats['a'], regression_stats['b']
+
+    return {
+        's_min': params['s_min'] + thickness_sd * rng.standard_normal(size),
+        's_max': params['s_max'] + thickness_sd * rng.standard_normal(size),
+        'p_MPa': params['p_MPa'] + pressure_tol * rng.uniform(-1, 1, size),
+        'T_rab_C': params['T_rab_C'] + temperature_tol * rng.uniform(-1, 1, size),
+        'a': a,
+        'b': b,
+    }
+
+
+def _solve_monte_carlo_chunk(task: Tuple) -> Tuple[np.ndarray, np.ndarray]:
+    """Разыгрывает и решает одну порцию; возвращает ресурс и коды ошибок."""
+    (seed, size, params, regression_stats, uncertainty,
+     selected_param, C, method, tolerance, tau_start) = task
+    rng = np.random.default_rng(seed)
+    sample = sample_monte_carlo_inputs(rng, size, params, regression_stats, uncertainty)
+    batch = calculate_residual_resource_batch(
+        sample['s_min'], sample['s_max'], params['d_max'], sample['p_MPa'], sample['T_rab_C'],
+        params['tau_exp'], params['k_zapas'], None, selected_param, C, params['s_nom'],
+        method=method, tolerance=tolerance, tau_start=tau_start,
+        regression=(sample['a'], sample['b'])
+    )
+    tau_prognoz = np.where(batch['converged'], batch['tau_prognoz'], np.nan)
+    return tau_prognoz, batch['error_code'].astype(np.int8)
+
+
+def run_monte_carlo(params: Dict, approx: Dict, selected_param: str, C: float, uncertainty: Dict,
+                    n_samples: int, seed: int = 0, method: str = SOLVER_BRACKETED,
+                    tolerance: float = BRACKETED_TOLERANCE, tau_start: Optional[float] = None,
+                    workers: Optional[int] = None) -> Dict:
+    """Распределение остаточного ресурса по n_samples разыгранным наборам.
+
+    Порции получают независимые потоки случайных чисел из одного seed, поэтому
+    результат не зависит от числа процессов. ``tau_start`` (обычно точечная оценка)
+    ускоряет сходимость метода Ньютона.
+    """
+    regression_stats = build_regression_statistics(approx['P_values'], approx['sigma_values'])
+    n_samples = int(n_samples)
+    chunk_sizes = [MONTE_CARLO_CHUNK_SIZE] * (n_samples // MONTE_CARLO_CHUNK_SIZE)
+    if n_samples % MONTE_CARLO_CHUNK_SIZE:
+        chunk_sizes.append(n_samples % MONTE_CARLO_CHUNK_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [
+        (chunk_seed, size, params, regression_stats, uncertainty,
+         selected_param, C, method, tolerance, tau_start)
+        for chunk_seed, size in zip(seeds, chunk_sizes)
+    ]
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if n_samples >= MONTE_CARLO_PARALLEL_THRESHOLD and workers > 1:
+        with process_pool(workers) as executor:
+            chunks = list(executor.map(_solve_monte_carlo_chunk, tasks))
+    else:
+        chunks = [_solve_monte_carlo_chunk(task) for task in tasks]
+
+    tau_prognoz = np.concatenate([chunk[0] for chunk in chunks])
+    error_code = np.concatenate([chunk[1] for chunk in chunks])
+    regression_sampled = bool(uncertainty.get('regression', True)) and regression_stats['dof'] > 0
+    return summarize_monte_carlo(tau_prognoz, error_code, regression_sampled)
+
+
+def summarize_monte_carlo(tau_prognoz: np.ndarray, error_code: np.ndarray, regression_sampled: bool) -> Dict:
+    """Процентили, гистограмма и доли неудачных наборов по результатам розыгрыша."""
+    solved = tau_prognoz[np.isfinite(tau_prognoz)]
+    errors = {
+        RESIDUAL_ERROR_MESSAGES[code]: int(count)
+        for code, count in zip(*np.unique(error_code, return_counts=True)) if code != RESIDUAL_OK
+    }
+    unconverged = int(np.count_nonzero((error_code == RESIDUAL_OK) & ~np.isfinite(tau_prognoz)))
+    if unconverged:
+        errors["Нет сходимости"] = unconverged
+
+    summary = {
+        'n_samples': int(tau_prognoz.size),
+        'n_solved': int(solved.size),
+        'errors': errors,
+        'regression_sampled': regression_sampled,
+        'percentiles': {},
+        'mean': np.nan,
+        'std': np.nan,
+        'histogram': (np.zeros(0, dtype=int), np.zeros(0)),
+    }
+    if solved.size:
+        values = np.percentile(solved, MONTE_CARLO_PERCENTILES)
+        summary['percentiles'] = dict(zip(MONTE_CARLO_PERCENTILES, values.tolist()))
+        summary['mean'] = float(solved.mean())
+        summary['std'] = float(solved.std())
+        # Крайние 0.1 % не растягивают шкалу гистограммы
+        low, high = np.percentile(solved, [0.1, 99.9])
+        summary['histogram'] = np.histogram(
+            solved, bins=MONTE_CARLO_HISTOGRAM_BINS, range=(low, high) if high > low else None
+        )
+    return summary
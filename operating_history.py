@@ -0,0 +1,336 @@
+"""Накопление повреждаемости по записанной истории эксплуатации (правило Робинсона).
+
+История — выгрузка АСУ ТП (CSV) с температурой пара и давлением по времени.
+Файл читается порциями: для каждого интервала по кривой длительной прочности
+группы и текущей (утоняющейся) толщине стенки вычисляется время до разрушения
+τ_р, а израсходованная доля ресурса Δt/τ_р суммируется. В памяти находится
+только одна порция и итоги по годам эксплуатации.
+
+Тем же правилом оценивается ресурс при плановых графиках эксплуатации (например,
+«2 года при 545 °C, затем 530 °C»): повреждаемость интегрируется вперед от
+текущего состояния сразу для всех сравниваемых графиков.
+"""
+import io
+import re
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from resource_core import (
+    build_regression,
+    calculate_log_tau_r,
+    calculate_pipe_stress,
+    corrosion_rate,
+    parse_numbers,
+    reference_thickness,
+)
+
+# Допустимые названия столбцов выгрузки
+HISTORY_COLUMNS = {
+    "time": ["Время", "Дата", "timestamp", "time"],
+    "T_C": ["T_C", "Температура", "Температура, °C", "T"],
+    "p_MPa": ["p_MPa", "Давление", "Давление, МПа", "p"],
+}
+HISTORY_CHUNK_ROWS = 100_000
+# Разрыв в записях длиннее этого считается остановом: время не засчитывается
+HISTORY_MAX_GAP_HOURS = 6.0
+HOURS_PER_YEAR = 8760
+
+
+def _csv_options(head: bytes) -> Dict:
+    first_line = head.decode("utf-8-sig", errors="ignore").splitlines()[0] if head else ""
+    if ";" in first_line:
+        return {"sep": ";", "decimal": ","}
+    return {"sep": ","}
+
+
+def _timestamp_format(value) -> Optional[str]:
+    """Формат меток времени выгрузки по первому значению: ISO (год впереди) или день впереди.
+
+    Формат определяется один раз на файл: если угадывать его по каждой порции,
+    ISO-даты с днем ≤ 12 разбираются как «год-день-месяц».
+    """
+    text = str(value).strip()
+    if re.match(r"\d{4}-\d{1,2}-\d{1,2}", text):
+        return "ISO8601"
+    return pd.tseries.api.guess_datetime_format(text, dayfirst=True)
+
+
+def _find_column(columns, aliases) -> Optional[str]:
+    stripped = {str(column).strip(): column for column in columns}
+    return next((stripped[alias] for alias in aliases if alias in stripped), None)
+
+
+def _damage_model(pipe_params: Dict, approx: Dict) -> Tuple[float, float, float, float]:
+    """Коэффициенты регрессии с учетом k_зап, скорость коррозии и начальная толщина стенки.
+
+    Скорость коррозии и толщина в начале эксплуатации — те же, что в расчете ресурса.
+    """
+    a, b, _ = build_regression(approx['P_values'], approx['sigma_values'])
+    s_nom, s_min, s_max = pipe_params['s_nom'], pipe_params['s_min'], pipe_params['s_max']
+    v_corr = float(corrosion_rate(s_nom, s_max, s_min, pipe_params['tau_exp']))
+    return a, b - np.log10(pipe_params['k_zapas']), v_corr, float(reference_thickness(s_nom, s_max))
+
+
+def damage_rate(T_C, p_MPa, thickness, d_max, a: float, reduced_b: float, selected_param: str, C: float):
+    """Скорость накопления повреждаемости 1/τ_р, 1/ч (массивы любой формы).
+
+    При исчерпанной толщине стенки или неопределенном τ_р скорость бесконечна.
+    """
+    with np.errstate(all='ignore'):
+        sigma = calculate_pipe_stress(p_MPa, d_max, np.where(thickness > 0, thickness, np.nan))
+        P_values = (np.log10(sigma) - reduced_b) / a
+        tau_r = 10 ** calculate_log_tau_r(P_values, np.asarray(T_C) + 273.15, selected_param, C)
+        return np.where(np.isfinite(tau_r) & (tau_r > 0), 1 / tau_r, np.inf)
+
+
+def iterate_history_chunks(source: Union[str, bytes, io.IOBase], chunk_rows: int = HISTORY_CHUNK_ROWS):
+    """Читает выгрузку порциями и отдает таблицы с часами от начала записи, T_C и p_MPa.
+
+    Если в файле нет столбца времени, каждая строка считается одним часом.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    if isinstance(source, str):
+        with open(source, "rb") as history_file:
+            options = _csv_options(history_file.read(4096))
+    else:
+        options = _csv_options(source.read(4096))
+        source.seek(0)
+
+    start_time = None
+    time_format = None
+    row_offset = 0
+    for chunk in pd.read_csv(source, chunksize=chunk_rows, encoding="utf-8-sig", **options):
+        time_column = _find_column(chunk.columns, HISTORY_COLUMNS["time"])
+        T_column = _find_column(chunk.columns, HISTORY_COLUMNS["T_C"])
+        p_column = _find_column(chunk.columns, HISTORY_COLUMNS["p_MPa"])
+        if T_column is None or p_column is None:
+            raise ValueError("В истории эксплуатации нужны столбцы температуры (T_C) и давления (p_MPa)")
+
+        if time_column is None:
+            hours = np.arange(row_offset, row_offset + len(chunk), dtype=float)
+        else:
+            if time_format is None and chunk[time_column].notna().any():
+                time_format = _timestamp_format(chunk[time_column].dropna().iloc[0])
+            if time_format is None:
+                timestamps = pd.to_datetime(chunk[time_column], dayfirst=True, errors="coerce")
+            else:
+                timestamps = pd.to_datetime(chunk[time_column], format=time_format, errors="coerce")
+            if start_time is None:
+                start_time = timestamps.dropna().iloc[0] if timestamps.notna().any() else None
+            if start_time is None:
+                hours = np.full(len(chunk), np.nan)
+            else:
+                hours = ((timestamps - start_time) / pd.Timedelta(hours=1)).to_numpy(dtype=float, na_value=np.nan)
+        row_offset += len(chunk)
+        yield pd.DataFrame({
+            "hours": hours,
+            "T_C": parse_numbers(chunk[T_column]).to_numpy(dtype=float),
+            "p_MPa": parse_numbers(chunk[p_column]).to_numpy(dtype=float),
+        })
+
+
+def accumulate_history_damage(source, pipe_params: Dict, approx: Dict, selected_param: str, C: float,
+                              start_hour: float = 0.0, chunk_rows: int = HISTORY_CHUNK_ROWS,
+                              progress: Optional[Callable[[int], None]] = None) -> Dict:
+    """Израсходованная доля ресурса по истории эксплуатации.
+
+    Каждая запись задает режим интервала от предыдущей записи до нее. Толщина
+    стенки убывает от опорной толщины расчета (s_макс при s_макс > s_н, иначе s_н)
+    со скоростью коррозии расчета: s(t) = s_опорн − v_корр·t, где
+    t — наработка с начала эксплуатации (``start_hour`` — наработка к началу
+    записи). Напряжение умножается на k_зап, как в расчете остаточного ресурса.
+    Интервалы остановов (разрыв записей, p ≤ 0) и строки с пропусками в расчет не
+    входят. Возвращает суммарную повреждаемость, остаток, итоги по годам
+    эксплуатации и оценку остаточного ресурса при режиме последнего года.
+    """
+    a, reduced_b, v_corr, s_reference = _damage_model(pipe_params, approx)
+
+    damage = 0.0
+    operating_hours = 0.0
+    rows = skipped = 0
+    thickness_exhausted = False
+    yearly_damage = np.zeros(0)
+    yearly_hours = np.zeros(0)
+    T_weighted = 0.0
+    T_max = -np.inf
+    previous_hour = None
+
+    for chunk in iterate_history_chunks(source, chunk_rows):
+        hours = chunk["hours"].to_numpy()
+        T_C = chunk["T_C"].to_numpy()
+        p_MPa = chunk["p_MPa"].to_numpy()
+        # Длительность интервала — от последней записи с разобранным временем (с учетом
+        # конца прошлой порции): строка с нечитаемой меткой выпадает только сама
+        known = np.concatenate([[np.nan if previous_hour is None else previous_hour], hours])
+        dt = hours - pd.Series(known).ffill().to_numpy()[:-1]
+        finite_hours = hours[np.isfinite(hours)]
+        if finite_hours.size:
+            previous_hour = finite_hours[-1]
+
+        working = (np.isfinite(dt) & (dt > 0) & (dt <= HISTORY_MAX_GAP_HOURS)
+                   & np.isfinite(T_C) & np.isfinite(p_MPa) & (p_MPa > 0))
+        rows += len(chunk)
+        skipped += int(np.count_nonzero(~working))
+        dt, T_C, p_MPa = dt[working], T_C[working], p_MPa[working]
+
+        # Наработка к концу каждого интервала и толщина стенки в этот момент
+        operating = start_hour + operating_hours + np.cumsum(dt)
+        operating_hours += float(dt.sum())
+        s_current = s_reference - v_corr * operating
+        thickness_exhausted |= bool(np.any(s_current <= 0))
+        interval_damage = dt * damage_rate(T_C, p_MPa, s_current, pipe_params['d_max'], a, reduced_b,
+                                           selected_param, C)
+        damage += float(interval_damage.sum())
+
+        # Итоги по годам эксплуатации (от начала записи)
+        year = ((operating - start_hour - dt) // HOURS_PER_YEAR).astype(int)
+        if year.size:
+            size = max(int(year.max()) + 1, yearly_damage.size)
+            yearly_damage = np.pad(yearly_damage, (0, size - yearly_damage.size))
+            yearly_hours = np.pad(yearly_hours, (0, size - yearly_hours.size))
+            yearly_damage += np.bincount(year, weights=interval_damage, minlength=size)
+            yearly_hours += np.bincount(year, weights=dt, minlength=size)
+            T_weighted += float(np.dot(T_C, dt))
+            T_max = max(T_max, float(T_C.max()))
+        if progress is not None:
+            progress(rows)
+
+    remaining = 1.0 - damage
+    last_rate = None
+    if yearly_hours.size and yearly_hours[-1] > 0:
+        last_rate = yearly_damage[-1] / yearly_hours[-1]
+    return {
+        'rows': rows,
+        'skipped_rows': skipped,
+        'operating_hours': operating_hours,
+        'damage': damage,
+        'remaining': remaining,
+        'thickness_exhausted': thickness_exhausted,
+        'final_thickness': s_reference - v_corr * (start_hour + operating_hours),
+        'T_mean': T_weighted / operating_hours if operating_hours else np.nan,
+        'T_max': T_max if np.isfinite(T_max) else np.nan,
+        # Остаток ресурса при сохранении режима последнего года (без дальнейшего утонения стенки)
+        'remaining_hours': float(remaining / last_rate) if last_rate and remaining > 0 else None,
+        'yearly': pd.DataFrame({
+            "Год эксплуатации": np.arange(1, yearly_damage.size + 1),
+            "Наработка, ч": yearly_hours.round(0),
+            "Повреждаемость за год": yearly_damage,
+            "Накопленная повреждаемость": np.cumsum(yearly_damage),
+        }),
+    }
+
+
+# --- Плановый график эксплуатации ---
+# График — последовательность режимов {hours, T_C, p_MPa}; последний режим
+# продолжается без ограничения. Повреждаемость интегрируется от текущего
+# состояния (толщина s_мин) по сетке времени сразу для всех графиков
+SCHEDULE_COLUMNS = ["Сценарий", "Длительность, ч", "T_C", "p_MPa"]
+SCHEDULE_STEP_HOURS = 100.0
+SCHEDULE_BLOCK_STEPS = 4096
+SCHEDULE_MAX_HOURS = 2_000_000.0
+SCHEDULE_CURVE_STRIDE = 64
+SCHEDULE_LIMIT_DAMAGE = "повреждаемость"
+SCHEDULE_LIMIT_THICKNESS = "толщина стенки"
+
+
+def parse_schedule_table(table: pd.DataFrame) -> Dict[str, List[Dict]]:
+    """Собирает графики из таблицы режимов: строки одного сценария идут по порядку.
+
+    Пустая длительность допустима только у последнего режима сценария.
+    """
+    schedules = {}
+    for row in table.to_dict("records"):
+        name = str(row.get("Сценарий") or "").strip()
+        if not name:
+            continue
+        segment = {key: pd.to_numeric(row.get(column), errors="coerce")
+                   for key, column in (("hours", "Длительность, ч"), ("T_C", "T_C"), ("p_MPa", "p_MPa"))}
+        if not (np.isfinite(segment['T_C']) and np.isfinite(segment['p_MPa']) and segment['p_MPa'] > 0):
+            raise ValueError(f"Сценарий «{name}»: у режима должны быть заданы T_C и p_MPa > 0")
+        schedules.setdefault(name, []).append(segment)
+    for name, segments in schedules.items():
+        if any(not (np.isfinite(segment['hours']) and segment['hours'] > 0) for segment in segments[:-1]):
+            raise ValueError(f"Сценарий «{name}»: длительность всех режимов, кроме последнего, должна быть > 0")
+    return schedules
+
+
+def _schedule_arrays(schedules: List[List[Dict]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Границы режимов (K×S, последняя — ∞), температуры и давления графиков."""
+    n_segments = max(len(segments) for segments in schedules)
+    ends = np.full((len(schedules), n_segments), np.inf)
+    T_C = np.full((len(schedules), n_segments), np.nan)
+    p_MPa = np.full((len(schedules), n_segments), np.nan)
+    for k, segments in enumerate(schedules):
+        hours = [segment['hours'] for segment in segments[:-1]]
+        ends[k, :len(hours)] = np.cumsum(hours)
+        T_C[k, :len(segments)] = [segment['T_C'] for segment in segments]
+        p_MPa[k, :len(segments)] = [segment['p_MPa'] for segment in segments]
+    return ends, T_C, p_MPa
+
+
+def calculate_schedule_life(schedules: Dict[str, List[Dict]], pipe_params: Dict, approx: Dict,
+                            selected_param: str, C: float, initial_damage: float = 0.0,
+                            step_hours: float = SCHEDULE_STEP_HOURS,
+                            max_hours: float = SCHEDULE_MAX_HOURS) -> Dict:
+    """Время, за которое повреждаемость при плановом графике достигает 1.
+
+    Все графики считаются одним расчетом на общей сетке времени (по правилу
+    средних прямоугольников): толщина s(t) = s_мин − v_корр·t, режим берется по
+    середине шага. Сетка обрабатывается блоками, пока не решены все графики или не
+    достигнут горизонт ``max_hours``; момент исчерпания уточняется линейной
+    интерполяцией внутри шага. ``initial_damage`` — уже накопленная повреждаемость
+    (например, по истории эксплуатации).
+    """
+    names = list(schedules)
+    a, reduced_b, v_corr, _ = _damage_model(pipe_params, approx)
+    ends, T_segments, p_segments = _schedule_arrays([schedules[name] for name in names])
+    n = len(names)
+
+    damage = np.full(n, float(initial_damage))
+    life = np.where(damage >= 1, 0.0, np.nan)
+    limit = np.where(damage >= 1, SCHEDULE_LIMIT_DAMAGE, "").astype(object)
+    curve_hours = [np.zeros(1)]
+    curve_damage = [damage[:, None].copy()]
+
+    start = 0.0
+    while start < max_hours and np.isnan(life).any():
+        t_start = start + step_hours * np.arange(SCHEDULE_BLOCK_STEPS)
+        t_mid = t_start + step_hours / 2
+        segment = np.sum(t_mid[None, :, None] >= ends[:, None, :], axis=2)
+        T_C = np.take_along_axis(T_segments, segment, axis=1)
+        p_MPa = np.take_along_axis(p_segments, segment, axis=1)
+        thickness = pipe_params['s_min'] - v_corr * t_mid
+        rate = damage_rate(T_C, p_MPa, thickness[None, :], pipe_params['d_max'], a, reduced_b, selected_param, C)
+        with np.errstate(invalid='ignore'):
+            cumulative = damage[:, None] + np.cumsum(rate * step_hours, axis=1)
+
+        crossed = cumulative >= 1
+        solved = np.isnan(life) & crossed.any(axis=1)
+        for k in np.flatnonzero(solved):
+            step = int(np.argmax(crossed[k]))
+            before = cumulative[k, step - 1] if step else damage[k]
+            # Внутри шага повреждаемость растет линейно; при исчерпании стенки — на начало шага
+            fraction = (1 - before) / (cumulative[k, step] - before) if np.isfinite(cumulative[k, step]) else 0.0
+            life[k] = t_start[step] + step_hours * fraction
+            limit[k] = SCHEDULE_LIMIT_THICKNESS if thickness[step] <= 0 else SCHEDULE_LIMIT_DAMAGE
+
+        damage = np.minimum(cumulative[:, -1], 1.0)
+        curve_hours.append(t_start[SCHEDULE_CURVE_STRIDE - 1::SCHEDULE_CURVE_STRIDE] + step_hours)
+        curve_damage.append(np.minimum(cumulative[:, SCHEDULE_CURVE_STRIDE - 1::SCHEDULE_CURVE_STRIDE], 1.0))
+        start += step_hours * SCHEDULE_BLOCK_STEPS
+
+    curve_hours = np.concatenate(curve_hours)
+    curve = pd.DataFrame(np.concatenate(curve_damage, axis=1).T, columns=names)
+    curve.insert(0, "Время, лет", curve_hours / HOURS_PER_YEAR)
+    return {
+        'names': names,
+        'life': life,
+        'limit': limit,
+        'horizon': start,
+        # Кривая до исчерпания самого долгого из решенных графиков
+        'curve': curve[curve_hours <= (np.nanmax(life) + step_hours * SCHEDULE_CURVE_STRIDE
+                                       if np.isfinite(life).any() else start)],
+    }
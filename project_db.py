@@ -0,0 +1,302 @@
+"""Локальная база проектов остаточного ресурса (SQLite).
+
+Каждое сохранение проекта — новая ревизия: строка в projects с полным текстом
+проекта, точки испытаний в tests и результаты расчетов в calculations.
+Последняя ревизия проекта определяется по наибольшему id среди ревизий с тем же
+названием и объектом; прежние ревизии образуют историю остаточного ресурса.
+Индексы по марке стали, серии, параметру, дате и ресурсу позволяют отвечать на
+вопросы по всему парку («все змеевики из 12Х1МФ с ресурсом менее 50 000 ч»)
+без открытия файлов проектов.
+
+Пример загрузки архива проектов в базу:
+    python project_db.py проекты.sqlite архив/станция_1 "архив/**/*.json" --unit "ТЭЦ-1"
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from resource_core import BRACKETED_TOLERANCE, SOLVER_BRACKETED, solve_project
+
+DB_SUFFIX = ".sqlite"
+DB_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    unit TEXT NOT NULL DEFAULT '',
+    series TEXT NOT NULL,
+    steel_grade TEXT NOT NULL,
+    parameter TEXT NOT NULL,
+    C REAL NOT NULL,
+    saved_at TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    project_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS projects_steel ON projects (steel_grade);
+CREATE INDEX IF NOT EXISTS projects_series ON projects (series);
+CREATE INDEX IF NOT EXISTS projects_parameter ON projects (parameter);
+CREATE INDEX IF NOT EXISTS projects_saved_at ON projects (saved_at);
+CREATE INDEX IF NOT EXISTS projects_revision ON projects (name, unit, id);
+
+CREATE TABLE IF NOT EXISTS tests (
+    project_id INTEGER NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+    sample TEXT,
+    sigma_MPa REAL,
+    T_C REAL,
+    tau_h REAL,
+    group_number INTEGER
+);
+CREATE INDEX IF NOT EXISTS tests_project ON tests (project_id);
+
+CREATE TABLE IF NOT EXISTS calculations (
+    project_id INTEGER NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+    calc_id INTEGER,
+    name TEXT NOT NULL,
+    group_number INTEGER,
+    s_nom REAL, s_max REAL, s_min REAL, d_max REAL,
+    p_MPa REAL, T_rab_C REAL, tau_exp REAL, k_zapas REAL,
+    tau_prognoz REAL,
+    converged INTEGER,
+    error TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS calculations_project ON calculations (project_id);
+CREATE INDEX IF NOT EXISTS calculations_tau ON calculations (tau_prognoz);
+"""
+
+_PIPE_COLUMNS = ['s_nom', 's_max', 's_min', 'd_max', 'p_MPa', 'T_rab_C', 'tau_exp', 'k_zapas']
+_LATEST_REVISIONS = "SELECT MAX(id) FROM projects GROUP BY name, unit"
+
+CALCULATION_COLUMNS = {
+    'project_id': "Ревизия",
+    'name': "Проект",
+    'unit': "Объект",
+    'series': "Серия",
+    'steel_grade': "Марка стали",
+    'parameter': "Параметр",
+    'saved_at': "Сохранен",
+    'calculation': "Расчет",
+    'group_number': "Группа",
+    'T_rab_C': "T_раб, °C",
+    'p_MPa': "p, МПа",
+    's_min': "s_мин, мм",
+    'tau_prognoz': "Остаточный ресурс, ч",
+    'converged': "Сходимость",
+    'error': "Ошибка",
+}
+
+
+def open_database(path: str) -> sqlite3.Connection:
+    """Открывает (при необходимости создает) базу проектов и ее таблицы."""
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.execute("PRAGMA journal_mode = WAL")
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version > DB_SCHEMA_VERSION:
+        connection.close()
+        raise ValueError(f"база создана более новой версией программы (схема {version})")
+    with connection:
+        connection.executescript(_SCHEMA)
+        connection.execute(f"PRAGMA user_version = {DB_SCHEMA_VERSION}")
+    return connection
+
+
+def open_shared_database(path: str) -> Dict:
+    """База, общая для нескольких потоков: соединение и блокировка для каждого обращения к нему.
+
+    Сессии Streamlit работают в разных потоках; без блокировки транзакции разных
+    сессий на одном соединении перемежаются.
+    """
+    return {'connection': open_database(path), 'lock': threading.Lock()}
+
+
+def _optional_float(value) -> Optional[float]:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value == value else None
+
+
+def save_project(connection: sqlite3.Connection, project: Dict, name: str, unit: str = "",
+                 method: str = SOLVER_BRACKETED, tolerance: float = BRACKETED_TOLERANCE,
+                 saved_at: Optional[str] = None) -> int:
+    """Сохраняет ревизию проекта с точками испытаний и результатами; возвращает id ревизии.
+
+    Результаты берутся из solve_project: сохраненные в проекте результаты с
+    совпадающим отпечатком не пересчитываются. Все строки ревизии записываются
+    одной транзакцией.
+    """
+    solved = solve_project(project, method=method, tolerance=tolerance)
+    project_json = json.dumps(project, ensure_ascii=False)
+    saved_at = saved_at or datetime.now().isoformat(timespec='seconds')
+    tests = solved['df_tests']
+    with connection:
+        project_id = connection.execute(
+            "INSERT INTO projects (name, unit, series, steel_grade, parameter, C, saved_at, content_hash, project_json)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (name, unit, solved['series_name'], solved['steel_grade'], solved['selected_param'], float(solved['C']),
+             saved_at, hashlib.md5(project_json.encode("utf-8")).hexdigest(), project_json)
+        ).lastrowid
+        connection.executemany(
+            "INSERT INTO tests (project_id, sample, sigma_MPa, T_C, tau_h, group_number) VALUES (?, ?, ?, ?, ?, ?)",
+            zip([project_id] * len(tests), tests["Образец"].astype(str), tests["sigma_MPa"].astype(float),
+                tests["T_C"].astype(float), tests["tau_h"].astype(float),
+                tests["Группа_аппроксимации"].astype(int).tolist())
+        )
+        connection.executemany(
+            f"INSERT INTO calculations (project_id, calc_id, name, group_number, {', '.join(_PIPE_COLUMNS)},"
+            " tau_prognoz, converged, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (project_id, calc['id'], calc['name'], calc['selected_group'],
+                 *(_optional_float(calc['params'].get(column)) for column in _PIPE_COLUMNS),
+                 _optional_float(calc['tau_prognoz']),
+                 None if 'converged' not in calc['details'] else int(bool(calc['details']['converged'])),
+                 calc['details'].get('error', ""))
+                for calc in solved['calculations']
+            ]
+        )
+    return project_id
+
+
+def load_project(connection: sqlite3.Connection, project_id: int) -> Dict:
+    """Текст проекта ревизии в формате «проект_ресурса.json»."""
+    row = connection.execute("SELECT project_json FROM projects WHERE id = ?", (int(project_id),)).fetchone()
+    if row is None:
+        raise KeyError(f"в базе нет ревизии {project_id}")
+    return json.loads(row[0])
+
+
+def list_projects(connection: sqlite3.Connection, latest_only: bool = True) -> pd.DataFrame:
+    """Ревизии проектов (по умолчанию только последние), от новых к старым."""
+    where = f"WHERE p.id IN ({_LATEST_REVISIONS})" if latest_only else ""
+    return pd.read_sql_query(
+        "SELECT p.id AS 'Ревизия', p.name AS 'Проект', p.unit AS 'Объект', p.series AS 'Серия',"
+        " p.steel_grade AS 'Марка стали', p.parameter AS 'Параметр', p.saved_at AS 'Сохранен',"
+        " (SELECT COUNT(*) FROM tests t WHERE t.project_id = p.id) AS 'Испытаний',"
+        " (SELECT COUNT(*) FROM calculations c WHERE c.project_id = p.id) AS 'Расчетов'"
+        f" FROM projects p {where} ORDER BY p.id DESC",
+        connection
+    )
+
+
+def distinct_values(connection: sqlite3.Connection, column: str) -> List[str]:
+    """Различные значения столбца projects (для фильтров страницы запросов)."""
+    if column not in ('steel_grade', 'series', 'parameter', 'unit'):
+        raise ValueError(f"недопустимый столбец: {column}")
+    return [row[0] for row in connection.execute(f"SELECT DISTINCT {column} FROM projects ORDER BY {column}")]
+
+
+def query_calculations(connection: sqlite3.Connection, steel_grades: Optional[List[str]] = None,
+                       parameters: Optional[List[str]] = None, series: Optional[List[str]] = None,
+                       max_tau: Optional[float] = None, date_from: Optional[str] = None,
+                       date_to: Optional[str] = None, latest_only: bool = True) -> pd.DataFrame:
+    """Результаты расчетов по фильтрам, от меньшего ресурса к большему.
+
+    Пустой фильтр не ограничивает выборку. Даты сравниваются как строки ISO
+    (``date_to`` включает весь указанный день). При ``latest_only`` берутся только
+    последние ревизии проектов.
+    """
+    conditions, arguments = [], []
+    for column, values in (('p.steel_grade', steel_grades), ('p.parameter', parameters), ('p.series', series)):
+        if values:
+            conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+            arguments.extend(values)
+    if max_tau is not None:
+        conditions.append("c.tau_prognoz < ?")
+        arguments.append(float(max_tau))
+    if date_from:
+        conditions.append("p.saved_at >= ?")
+        arguments.append(date_from)
+    if date_to:
+        conditions.append("p.saved_at < ?")
+        arguments.append((date.fromisoformat(date_to) + timedelta(days=1)).isoformat())
+    if latest_only:
+        conditions.append(f"p.id IN ({_LATEST_REVISIONS})")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    result = pd.read_sql_query(
+        "SELECT p.id AS project_id, p.name, p.unit, p.series, p.steel_grade, p.parameter, p.saved_at,"
+        " c.name AS calculation, c.group_number, c.T_rab_C, c.p_MPa, c.s_min, c.tau_prognoz, c.converged, c.error"
+        f" FROM calculations c JOIN projects p ON p.id = c.project_id {where}"
+        " ORDER BY c.tau_prognoz IS NULL, c.tau_prognoz, p.id",
+        connection, params=arguments
+    )
+    return result.rename(columns=CALCULATION_COLUMNS)
+
+
+def calculation_history(connection: sqlite3.Connection, name: str, unit: str = "") -> pd.DataFrame:
+    """Остаточный ресурс расчетов проекта по всем его ревизиям (строки — даты, столбцы — расчеты)."""
+    history = pd.read_sql_query(
+        "SELECT p.saved_at, c.name, c.tau_prognoz FROM calculations c JOIN projects p ON p.id = c.project_id"
+        " WHERE p.name = ? AND p.unit = ? ORDER BY p.id",
+        connection, params=(name, unit)
+    )
+    return history.pivot_table(index="saved_at", columns="name", values="tau_prognoz", aggfunc="last")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Загрузка проектов остаточного ресурса в базу SQLite")
+    parser.add_argument("database", help=f"файл базы ({DB_SUFFIX})")
+    parser.add_argument("inputs", nargs="+", help="каталоги или шаблоны путей с проектами .json")
+    parser.add_argument("--unit", help="объект (станция, котел) для всех загружаемых проектов; "
+                                       "по умолчанию — подкаталог проекта")
+    return parser
+
+
+def project_keys(files: List[str], unit: Optional[str] = None) -> Dict[str, Tuple[str, str]]:
+    """Название и объект каждого проекта по его пути относительно общего каталога.
+
+    Как в сводке по парку, объект — подкаталог проекта, а название — имя файла
+    без расширения. Если объект задан для всех проектов, название — весь
+    относительный путь, чтобы одноименные проекты разных каталогов не сливались
+    в ревизии одного проекта.
+    """
+    if not files:
+        return {}
+    root = os.path.commonpath([os.path.dirname(path) for path in files])
+    keys = {}
+    for path in files:
+        relative = os.path.splitext(os.path.relpath(path, root))[0].replace(os.sep, "/")
+        if unit is None:
+            keys[path] = (os.path.basename(relative), os.path.dirname(relative))
+        else:
+            keys[path] = (relative, unit)
+    return keys
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from batch_runner import PROJECT_EXTENSIONS, collect_input_files
+
+    args = build_parser().parse_args(argv)
+    files = [path for path in collect_input_files(args.inputs) if path.lower().endswith(PROJECT_EXTENSIONS)]
+    if not files:
+        print("Файлы проектов не найдены", file=sys.stderr)
+        return 1
+    connection = open_database(args.database)
+    keys = project_keys(files, args.unit)
+    failures = 0
+    for path in files:
+        try:
+            with open(path, encoding="utf-8") as project_file:
+                project = json.load(project_file)
+            name, unit = keys[path]
+            saved_at = datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec='seconds')
+            save_project(connection, project, name, unit, saved_at=saved_at)
+        except Exception as e:
+            failures += 1
+            print(f"❌ {path}: {e}", file=sys.stderr)
+    connection.close()
+    print(f"Загружено проектов: {len(files) - failures} из {len(files)}; база: {args.database}", file=sys.stderr)
+    return 0 if failures == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
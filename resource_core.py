@@ -0,0 +1,1482 @@
+"""Расчетное ядро определения остаточного ресурса змеевиков.
+
+Модуль не зависит от Streamlit: формулы параметров долговечности, регрессия,
+кривые допускаемых напряжений, решатель остаточного ресурса, построение графика
+и отчетов Word. Интерфейс в app.py — тонкий слой над этими функциями, а сами
+функции можно вызывать из скриптов, рабочих процессов и тестов.
+"""
+import copy
+import hashlib
+import io
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from materials import DEFAULT_C, DEFAULT_MATERIAL, get_material
+
+try:
+    from docx import Document
+    from docx.enum.table import WD_TABLE_ALIGNMENT
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls, qn
+    from docx.shared import Pt
+    DOCX_AVAILABLE = True
+except ModuleNotFoundError:
+    DOCX_AVAILABLE = False
+
+
+def clamp_number(value, min_value, max_value):
+    return max(min_value, min(float(value), float(max_value)))
+
+
+def calculate_pipe_stress(p_MPa, d_max, s_min):
+    """Напряжение в стенке трубы; принимает как числа, так и массивы NumPy."""
+    if np.ndim(p_MPa) or np.ndim(d_max) or np.ndim(s_min):
+        return (np.asarray(p_MPa, dtype=float) / 2) * (
+            np.asarray(d_max, dtype=float) / np.asarray(s_min, dtype=float) + 1
+        )
+    return (float(p_MPa) / 2) * (float(d_max) / float(s_min) + 1)
+
+
+def reference_thickness(s_nom, s_max):
+    """Толщина стенки в начале эксплуатации: s_макс при s_макс > s_н, иначе s_н."""
+    return np.where(np.asarray(s_max, dtype=float) > np.asarray(s_nom, dtype=float), s_max, s_nom)
+
+
+def corrosion_rate(s_nom, s_max, s_min, tau_exp):
+    """Скорость коррозии v_корр = (s_опорн − s_мин)/τ_э, мм/ч (числа или массивы)."""
+    return (reference_thickness(s_nom, s_max) - np.asarray(s_min, dtype=float)) / np.asarray(tau_exp, dtype=float)
+
+
+def calculate_parameter_P(T_K, tau_h, selected_param: str, C: float):
+    """Параметр долговечности Трунина или Ларсона-Миллера (числа или массивы)."""
+    if selected_param == "Трунина":
+        return T_K * (np.log10(tau_h) - 2 * np.log10(T_K) + C) * 1e-3
+    return T_K * (np.log10(tau_h) + C) * 1e-3
+
+
+# --- Пул рабочих процессов ---
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    """Пул процессов, запускаемых методом spawn.
+
+    Процесс приложения Streamlit многопоточный: fork копирует его вместе с
+    блокировками, захваченными другими потоками, и рабочий процесс может зависнуть.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+# --- Кэш этапов расчета ---
+# Каждый этап конвейера (P, регрессии, кривая, остаточный ресурс, график) хранит
+# результаты по хэшу своих фактических входных данных и пересчитывается только
+# при их изменении
+STAGE_CACHE_MAX_ENTRIES = 64
+# Бюджет памяти кэша на одну сессию: при превышении вытесняются давно не
+# использованные записи всех этапов (графики, документы, результаты)
+STAGE_CACHE_MEMORY_BUDGET = 64 * 1024 * 1024
+
+
+def hash_stage_inputs(inputs) -> str:
+    """Строит устойчивый хэш входных данных этапа: числа, строки, массивы, таблицы, словари."""
+    digest = hashlib.sha1()
+
+    def feed(value):
+        if isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            labels = list(value.columns) if isinstance(value, pd.DataFrame) else value.name
+            digest.update(b"pd" + repr(labels).encode())
+            digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        elif isinstance(value, np.ndarray):
+            digest.update(f"nd{value.dtype.str}{value.shape}".encode())
+            digest.update(np.ascontiguousarray(value).tobytes())
+        elif isinstance(value, dict):
+            digest.update(b"{")
+            for key in sorted(value, key=str):
+                feed(str(key))
+                feed(value[key])
+            digest.update(b"}")
+        elif isinstance(value, (list, tuple)):
+            digest.update(b"[")
+            for item in value:
+                feed(item)
+            digest.update(b"]")
+        else:
+            digest.update(f"{type(value).__name__}:{value!r};".encode())
+
+    feed(inputs)
+    return digest.hexdigest()
+
+
+def estimate_memory_size(value) -> int:
+    """Приблизительный объем памяти, занимаемый значением в кэше, байт."""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_memory_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_memory_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def create_stage_cache(memory_budget: int = STAGE_CACHE_MEMORY_BUDGET) -> Dict:
+    return {
+        'entries': {}, 'hits': {}, 'misses': {}, 'evictions': {},
+        'lru': {}, 'memory_used': 0, 'memory_budget': memory_budget
+    }
+
+
+def _evict_stage_entry(cache: Dict, stage: str, key: str) -> None:
+    cache['entries'][stage].pop(key, None)
+    cache['memory_used'] -= cache['lru'].pop((stage, key), 0)
+    cache['evictions'][stage] = cache['evictions'].get(stage, 0) + 1
+
+
+def cached_stage(cache: Dict, stage: str, inputs, compute):
+    """Возвращает результат этапа из кэша или вычисляет его и сохраняет по хэшу входов."""
+    key = hash_stage_inputs(inputs)
+    stage_entries = cache['entries'].setdefault(stage, {})
+    if key in stage_entries:
+        cache['hits'][stage] = cache['hits'].get(stage, 0) + 1
+        # Перемещаем запись в конец: вытесняются давно не использованные
+        cache['lru'][(stage, key)] = cache['lru'].pop((stage, key))
+        return stage_entries[key]
+
+    cache['misses'][stage] = cache['misses'].get(stage, 0) + 1
+    value = compute()
+    size = estimate_memory_size(value)
+    stage_entries[key] = value
+    cache['lru'][(stage, key)] = size
+    cache['memory_used'] += size
+
+    while len(stage_entries) > STAGE_CACHE_MAX_ENTRIES:
+        oldest = next(lru_key for lru_key in cache['lru'] if lru_key[0] == stage)
+        _evict_stage_entry(cache, *oldest)
+    while cache['memory_used'] > cache['memory_budget'] and len(cache['lru']) > 1:
+        _evict_stage_entry(cache, *next(iter(cache['lru'])))
+    return value
+
+
+def stage_is_cached(cache: Dict, stage: str, inputs) -> bool:
+    """Проверяет, есть ли результат этапа в кэше, не вычисляя его."""
+    return hash_stage_inputs(inputs) in cache['entries'].get(stage, {})
+
+
+def peek_stage(cache: Dict, stage: str, inputs):
+    """Результат этапа из кэша или None; счетчики и порядок вытеснения не меняются."""
+    return cache['entries'].get(stage, {}).get(hash_stage_inputs(inputs))
+
+
+def stage_cache_stats(cache: Dict) -> pd.DataFrame:
+    """Счетчики попаданий и промахов по этапам."""
+    stages = sorted(set(cache['hits']) | set(cache['misses']) | set(cache['entries']))
+    return pd.DataFrame([{
+        "Этап": stage,
+        "Попадания": cache['hits'].get(stage, 0),
+        "Промахи": cache['misses'].get(stage, 0),
+        "Записей": len(cache['entries'].get(stage, {})),
+        "Вытеснено": cache['evictions'].get(stage, 0),
+        "Память, КБ": round(sum(
+            size for (entry_stage, _), size in cache['lru'].items() if entry_stage == stage
+        ) / 1024, 1)
+    } for stage in stages], columns=["Этап", "Попадания", "Промахи", "Записей", "Вытеснено", "Память, КБ"])
+
+
+# --- Табличное хранилище данных испытаний ---
+TEST_DATA_COLUMNS = ["Образец", "sigma_MPa", "T_C", "tau_h", "Группа_аппроксимации"]
+
+# Допустимые диапазоны числовых столбцов (min, max)
+TEST_DATA_LIMITS = {
+    "sigma_MPa": (0.1, 500.0),
+    "T_C": (100.0, 1000.0),
+    "tau_h": (1.0, 1e7),
+    "Группа_аппроксимации": (0, 10),
+}
+
+# Детальный список измененных ячеек хранится в журнале только для небольших правок
+CHANGELOG_MAX_CELLS = 200
+
+
+def default_test_records(start: int, count: int) -> List[Dict]:
+    """Возвращает строки испытаний со значениями по умолчанию."""
+    return [{
+        "Образец": f"Обр.{i+1}",
+        "sigma_MPa": 120.0,
+        "T_C": 600.0,
+        "tau_h": 500.0,
+        "Группа_аппроксимации": 0
+    } for i in range(start, start + count)]
+
+
+def make_test_dataframe(records) -> pd.DataFrame:
+    """Приводит записи испытаний (список словарей или DataFrame) к столбцовому виду."""
+    test_data = pd.DataFrame(records, columns=TEST_DATA_COLUMNS)
+    test_data["Образец"] = test_data["Образец"].fillna("").astype(str)
+    for column in ["sigma_MPa", "T_C", "tau_h", "Группа_аппроксимации"]:
+        test_data[column] = pd.to_numeric(test_data[column], errors='coerce').astype(float)
+    return test_data.reset_index(drop=True)
+
+
+def validate_test_data(test_data: pd.DataFrame) -> pd.DataFrame:
+    """Проверяет данные испытаний целыми столбцами; возвращает маску корректных ячеек."""
+    checks = pd.DataFrame(index=test_data.index)
+    for column, (min_value, max_value) in TEST_DATA_LIMITS.items():
+        values = pd.to_numeric(test_data[column], errors='coerce')
+        checks[column] = values.between(min_value, max_value)
+    checks["Группа_аппроксимации"] &= pd.to_numeric(test_data["Группа_аппроксимации"], errors='coerce') % 1 == 0
+    return checks
+
+
+def prepare_tests_for_calculation(test_data: pd.DataFrame) -> pd.DataFrame:
+    """Возвращает корректные строки испытаний с типами, нужными для расчета."""
+    df_tests = test_data.reset_index(drop=True).copy()
+    df_tests["Образец"] = df_tests["Образец"].fillna("").astype(str)
+    for column in ["sigma_MPa", "T_C", "tau_h"]:
+        df_tests[column] = df_tests[column].astype(float)
+    df_tests["Группа_аппроксимации"] = df_tests["Группа_аппроксимации"].astype(int)
+    return df_tests
+
+
+def test_data_records(test_data: pd.DataFrame) -> List[Dict]:
+    """Переводит таблицу испытаний в список словарей для JSON (пропуски → None)."""
+    return test_data.astype(object).where(test_data.notna(), None).to_dict('records')
+
+
+def diff_test_data(previous: pd.DataFrame, current: pd.DataFrame) -> Dict:
+    """Сравнивает две версии таблицы испытаний по меткам строк."""
+    added = current.index.difference(previous.index)
+    removed = previous.index.difference(current.index)
+    common = previous.index.intersection(current.index)
+    before = previous.loc[common, TEST_DATA_COLUMNS]
+    after = current.loc[common, TEST_DATA_COLUMNS]
+    changed = ~((before == after) | (before.isna() & after.isna()))
+    rows, cols = np.nonzero(changed.to_numpy())
+    diff = {
+        "добавлено_строк": len(added),
+        "удалено_строк": len(removed),
+        "изменено_ячеек": len(rows)
+    }
+    if len(rows) <= CHANGELOG_MAX_CELLS:
+        diff["ячейки"] = [{
+            "строка": int(common[r]),
+            "столбец": TEST_DATA_COLUMNS[c],
+            "было": before.iat[r, c],
+            "стало": after.iat[r, c]
+        } for r, c in zip(rows, cols)]
+    return diff
+
+
+# Столбцы файла Excel с данными испытаний
+EXCEL_REQUIRED_COLUMNS = ['Образец', 'sigma_MPa', 'T_C', 'tau_h']
+EXCEL_GROUP_COLUMNS = ['Группа_аппроксимации', 'group_approx', 'Группа']
+
+# Сигнатуры форматов: .xlsx — ZIP-архив, .xls — составной документ OLE2
+EXCEL_SIGNATURES = {
+    b"PK\x03\x04": "openpyxl",
+    b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1": "xlrd",
+}
+
+
+def detect_excel_engine(excel_bytes: bytes) -> Optional[str]:
+    """Определяет движок чтения Excel по сигнатуре файла (None — оставить выбор pandas)."""
+    for signature, engine in EXCEL_SIGNATURES.items():
+        if excel_bytes.startswith(signature):
+            return engine
+    return None
+
+
+def parse_numbers(values: pd.Series) -> pd.Series:
+    """Числа из столбца таблицы; нечисловые ячейки — NaN.
+
+    Столбец CSV с десятичной запятой pandas разбирает как числа, только если в нем
+    нет ни одной нечисловой ячейки, иначе весь столбец остается текстом.
+    """
+    if not pd.api.types.is_numeric_dtype(values):
+        values = values.astype(str).str.replace(",", ".", regex=False)
+    return pd.to_numeric(values, errors='coerce')
+
+
+def read_test_excel(excel_bytes: bytes) -> Tuple[List[Dict], List[str]]:
+    """Читает испытания из Excel и возвращает (записи, отсутствующие столбцы)."""
+    wanted_columns = set(EXCEL_REQUIRED_COLUMNS) | set(EXCEL_GROUP_COLUMNS)
+    excel_data = pd.read_excel(
+        io.BytesIO(excel_bytes),
+        engine=detect_excel_engine(excel_bytes),
+        usecols=lambda column: column in wanted_columns
+    )
+
+    missing_columns = [col for col in EXCEL_REQUIRED_COLUMNS if col not in excel_data.columns]
+    if missing_columns:
+        return [], missing_columns
+
+    # Находим столбец группы аппроксимации; нечисловые значения считаем группой 0
+    group_col = next((col for col in EXCEL_GROUP_COLUMNS if col in excel_data.columns), None)
+    if group_col:
+        groups = pd.to_numeric(excel_data[group_col], errors='coerce')
+        groups = groups.where(np.isfinite(groups), 0).astype(int)
+    else:
+        groups = 0
+
+    test_data = pd.DataFrame({
+        "Образец": excel_data['Образец'].astype(str),
+        "sigma_MPa": excel_data['sigma_MPa'].astype(float),
+        "T_C": excel_data['T_C'].astype(float),
+        "tau_h": excel_data['tau_h'].astype(float),
+        "Группа_аппроксимации": groups
+    })
+    return test_data.to_dict('records'), []
+
+
+# --- Коэффициенты, регрессия и отчеты ---
+def set_default_coefficients(steel_grade: str, parameter: str) -> float:
+    """Коэффициент C по умолчанию для марки стали и параметра из справочника марок."""
+    material = get_material(steel_grade)
+    if material is None:
+        return DEFAULT_C
+    return material['C'].get(parameter, DEFAULT_C)
+
+
+def format_approximation_equation(a: float, b: float, selected_param: str) -> str:
+    """Возвращает уравнение аппроксимации в понятном виде."""
+    sign = "+" if b >= 0 else "-"
+    return f"lg(σ) = {a:.4f} · P {sign} {abs(b):.4f}"
+
+
+def build_regression(P_values: np.ndarray, sigma_values: np.ndarray) -> Tuple[float, float, float]:
+    """Строит линейную регрессию lg(σ) = a·P + b и возвращает a, b, R²."""
+    X = np.asarray(P_values, dtype=float)
+    sigma = np.asarray(sigma_values, dtype=float)
+    y = np.log10(sigma)
+    A = np.vstack([X, np.ones(len(X))]).T
+    a, b = np.linalg.lstsq(A, y, rcond=None)[0]
+    y_pred = a * X + b
+    ss_tot = np.sum((y - np.mean(y)) ** 2)
+    ss_res = np.sum((y - y_pred) ** 2)
+    R2 = 1 - ss_res / ss_tot if ss_tot != 0 else 1.0
+    return float(a), float(b), float(R2)
+
+
+def build_regression_statistics(P_values: np.ndarray, sigma_values: np.ndarray) -> Dict:
+    """Регрессия lg(σ) = a·P + b вместе с ковариацией коэффициентов.
+
+    Ковариация (a, b) равна s²·(AᵀA)⁻¹, где s² — остаточная дисперсия lg(σ) с
+    n − 2 степенями свободы. При двух точках разброс оценить нельзя, и ковариация
+    нулевая.
+    """
+    X = np.asarray(P_values, dtype=float)
+    y = np.log10(np.asarray(sigma_values, dtype=float))
+    a, b, R2 = build_regression(X, np.asarray(sigma_values, dtype=float))
+    n = X.size
+    dof = n - 2
+    P_mean = float(X.mean())
+    Sxx = float(np.sum((X - P_mean) ** 2))
+    residual_variance = float(np.sum((y - (a * X + b)) ** 2) / dof) if dof > 0 else 0.0
+    A = np.vstack([X, np.ones(n)]).T
+    return {
+        'a': a,
+        'b': b,
+        'R2': R2,
+        'n': n,
+        'dof': dof,
+        'residual_variance': residual_variance,
+        'P_mean': P_mean,
+        'Sxx': Sxx,
+        'cov': residual_variance * np.linalg.inv(A.T @ A),
+    }
+
+
+def build_group_approximations(df_tests: pd.DataFrame, selected_groups: List[int], group_names: Dict,
+                               selected_param: str, cache: Optional[Dict] = None) -> Tuple[Dict, List[str]]:
+    """Строит аппроксимации lg(σ) = a·P + b для выбранных групп точек.
+
+    Таблица испытаний должна содержать столбец P. Возвращает словарь аппроксимаций
+    по номеру группы и список предупреждений для групп, которые построить не удалось.
+    Если передан кэш этапов, регрессии берутся из него.
+    """
+    approximations = {}
+    warnings = []
+    for group_num in selected_groups:
+        group_data = df_tests[df_tests["Группа_аппроксимации"] == group_num]
+        
+        if len(group_data) < 2:
+            warnings.append(f"Для группы {group_num} недостаточно точек для аппроксимации (нужно минимум 2)")
+            continue
+
+        X = group_data["P"].values
+        sigma_values = group_data["sigma_MPa"].values
+        try:
+            if cache is None:
+                statistics = build_regression_statistics(X, sigma_values)
+            else:
+                statistics = cached_stage(
+                    cache, "Регрессия", (X, sigma_values),
+                    lambda: build_regression_statistics(X, sigma_values)
+                )
+            a, b, R2 = statistics['a'], statistics['b'], statistics['R2']
+        except Exception as e:
+            warnings.append(f"Не удалось построить аппроксимацию для группы {group_num}: {str(e)}")
+            continue
+
+        approximations[group_num] = {
+            'a': a,
+            'b': b,
+            'R2': R2,
+            'count': len(group_data),
+            'color': GROUP_COLORS.get(group_num, 'gray'),
+            'name': group_names.get(str(group_num), f"Группа {group_num}"),
+            'equation': format_approximation_equation(a, b, selected_param),
+            'P_values': X,
+            'sigma_values': sigma_values,
+            'statistics': statistics
+        }
+    return approximations, warnings
+
+
+# Доверительные вероятности интервалов регрессии
+BAND_LEVELS = (0.90, 0.95, 0.99)
+
+
+def student_t_critical(level: float, dof: int) -> float:
+    """Двусторонний квантиль распределения Стьюдента: P(|t| < t_кр) = level.
+
+    Функция распределения для целого числа степеней свободы вычисляется в
+    замкнутом виде (Абрамовиц и Стиган, 26.7.3–26.7.4), корень — делением пополам
+    по θ = arctg(t/√ν).
+    """
+    if dof < 1:
+        return np.nan
+
+    def probability(theta: float) -> float:
+        cos2 = np.cos(theta) ** 2
+        if dof % 2:
+            term, total = 1.0, 1.0
+            for k in range(1, (dof - 1) // 2):
+                term *= cos2 * 2 * k / (2 * k + 1)
+                total += term
+            tail = np.sin(theta) * np.cos(theta) * total if dof > 1 else 0.0
+            return 2 / np.pi * (theta + tail)
+        term, total = 1.0, 1.0
+        for k in range(1, dof // 2):
+            term *= cos2 * (2 * k - 1) / (2 * k)
+            total += term
+        return np.sin(theta) * total
+
+    lo, hi = 0.0, np.pi / 2
+    for _ in range(60):
+        mid = 0.5 * (lo + hi)
+        if probability(mid) < level:
+            lo = mid
+        else:
+            hi = mid
+    return float(np.sqrt(dof) * np.tan(0.5 * (lo + hi)))
+
+
+def calculate_regression_bands(approximations: Dict, sigma_vals: np.ndarray, level: float) -> Dict:
+    """Доверительный и прогнозный интервалы lg(σ) = a·P + b для всех групп на сетке σ.
+
+    Для каждой группы берется уже вычисленная ковариация регрессии, а интервалы
+    считаются одной операцией над массивом «группы × сетка». Возвращает по номеру
+    группы P на линии регрессии и границы σ обоих интервалов. Группы из двух точек
+    пропускаются: разброс по ним не оценить.
+    """
+    groups = [group for group, approx in approximations.items() if approx['statistics']['dof'] > 0]
+    if not groups:
+        return {}
+    stats = [approximations[group]['statistics'] for group in groups]
+
+    def column(key: str) -> np.ndarray:
+        return np.array([item[key] for item in stats], dtype=float)[:, None]
+
+    t_value = np.array([student_t_critical(level, item['dof']) for item in stats])[:, None]
+    log_sigma = np.log10(np.asarray(sigma_vals, dtype=float))[None, :]
+    P_grid = (log_sigma - column('b')) / column('a')
+    leverage = 1 / column('n') + (P_grid - column('P_mean')) ** 2 / column('Sxx')
+    scale = t_value * np.sqrt(column('residual_variance'))
+    confidence = scale * np.sqrt(leverage)
+    prediction = scale * np.sqrt(1 + leverage)
+
+    return {
+        group: {
+            'P': P_grid[row],
+            'confidence': (10 ** (log_sigma[0] - confidence[row]), 10 ** (log_sigma[0] + confidence[row])),
+            'prediction': (10 ** (log_sigma[0] - prediction[row]), 10 ** (log_sigma[0] + prediction[row])),
+        }
+        for row, group in enumerate(groups)
+    }
+
+
+def calculate_lower_prediction_parameter(log_sigma, a, b, statistics: Dict, t_value: float):
+    """P на нижней границе прогнозного интервала: a·P + b − t·s·√(1 + 1/n + (P − P̄)²/Sxx) = lg σ.
+
+    Уравнение сводится к квадратному относительно u = P − P̄; нужный корень тот, где
+    линия регрессии выше lg σ. Возвращает P и наклон границы d lg σ / dP в этой
+    точке. Если интервал шире, чем наклон регрессии (a² ≤ t²s²/Sxx), граница не
+    монотонна и результат — NaN.
+    """
+    k = t_value ** 2 * statistics['residual_variance']
+    c0 = a * statistics['P_mean'] + b - log_sigma
+    qa = a ** 2 - k / statistics['Sxx']
+    qb = 2 * a * c0
+    qc = c0 ** 2 - k * (1 + 1 / statistics['n'])
+    with np.errstate(all='ignore'):
+        root = np.sqrt(qb ** 2 - 4 * qa * qc)
+        u1 = (-qb - root) / (2 * qa)
+        u2 = (-qb + root) / (2 * qa)
+        u = np.where(a * u1 + c0 >= 0, u1, u2)
+        u = np.where(qa > 0, u, np.nan)
+        slope = a - k * u / (statistics['Sxx'] * (a * u + c0))
+    return statistics['P_mean'] + u, slope
+
+
+# Подбор коэффициента C: грубый перебор по всему диапазону поля ввода, затем
+# несколько уточнений на более мелких сетках вокруг лучшего значения
+C_FIT_RANGE = (0.0, 50.0)
+C_FIT_GRID_POINTS = 501
+C_FIT_REFINE_POINTS = 21
+C_FIT_REFINE_ROUNDS = 4
+
+
+def evaluate_C_candidates(df_tests: pd.DataFrame, groups: List[int], selected_param: str,
+                          C_values: np.ndarray) -> Dict[str, np.ndarray]:
+    """R² регрессий всех групп для каждого значения C одной пакетной оценкой МНК.
+
+    P линейно зависит от C: P = P(C=0) + T·C·10⁻³, поэтому центрированные по группам
+    значения P для всех кандидатов получаются одной матрицей «кандидаты × точки», а
+    суммы по группам — умножением на матрицу принадлежности точек группам.
+    Возвращает R² групп (кандидаты × группы), сводный R² и остаточную сумму квадратов.
+    """
+    C_values = np.atleast_1d(np.asarray(C_values, dtype=float))
+    data = df_tests[df_tests["Группа_аппроксимации"].isin(groups)]
+    T_K = data["T_C"].values.astype(float) + 273.15
+    P0 = calculate_parameter_P(T_K, data["tau_h"].values.astype(float), selected_param, 0.0)
+    y = np.log10(data["sigma_MPa"].values.astype(float))
+    membership = (data["Группа_аппроксимации"].values[:, None] == np.asarray(groups)[None, :]).astype(float)
+    counts = membership.sum(axis=0)
+
+    def centered(values: np.ndarray) -> np.ndarray:
+        return values - membership @ (values @ membership / counts)
+
+    P_centered = centered(P0)[None, :] + np.outer(C_values, centered(T_K) * 1e-3)
+    y_centered = centered(y)
+    cxx = (P_centered ** 2) @ membership
+    cxy = (P_centered * y_centered) @ membership
+    cyy = (y_centered ** 2) @ membership
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ssr = np.where(cxx > 0, cyy - cxy ** 2 / cxx, cyy)
+        R2 = np.where(cyy > 0, 1 - ssr / cyy, 1.0)
+        pooled_R2 = 1 - ssr.sum(axis=1) / cyy.sum() if cyy.sum() > 0 else np.ones(C_values.size)
+    return {'C': C_values, 'R2': R2, 'pooled_R2': pooled_R2, 'ssr': ssr.sum(axis=1)}
+
+
+def fit_parameter_C(df_tests: pd.DataFrame, groups: List[int], group_names: Dict,
+                    selected_param: str) -> Dict:
+    """Подбирает C, при котором суммарный разброс точек вокруг регрессий групп минимален.
+
+    Возвращает лучшее C, R² групп и сводный R² при нем, кривую R²(C) грубого
+    перебора и признак того, что разброс от C не зависит (например, все
+    испытания группы проведены при одной температуре).
+    """
+    groups = [
+        group for group in groups
+        if (df_tests["Группа_аппроксимации"] == group).sum() >= 2
+    ]
+    if not groups:
+        raise ValueError("Нет групп аппроксимации с двумя и более точками")
+
+    scan = evaluate_C_candidates(
+        df_tests, groups, selected_param, np.linspace(*C_FIT_RANGE, C_FIT_GRID_POINTS)
+    )
+    best = int(np.argmin(scan['ssr']))
+    best_C = scan['C'][best]
+    step = (C_FIT_RANGE[1] - C_FIT_RANGE[0]) / (C_FIT_GRID_POINTS - 1)
+    for _ in range(C_FIT_REFINE_ROUNDS):
+        candidates = np.linspace(
+            max(best_C - step, C_FIT_RANGE[0]), min(best_C + step, C_FIT_RANGE[1]), C_FIT_REFINE_POINTS
+        )
+        refined = evaluate_C_candidates(df_tests, groups, selected_param, candidates)
+        best_C = float(candidates[np.argmin(refined['ssr'])])
+        step = 2 * step / (C_FIT_REFINE_POINTS - 1)
+
+    at_best = evaluate_C_candidates(df_tests, groups, selected_param, [best_C])
+    curve = pd.DataFrame({"C": scan['C'], "Сводный R²": scan['pooled_R2']})
+    for column, group in enumerate(groups):
+        curve[group_names.get(str(group), f"Группа {group}")] = scan['R2'][:, column]
+
+    return {
+        'C': best_C,
+        'groups': groups,
+        'R2': {group: float(at_best['R2'][0, column]) for column, group in enumerate(groups)},
+        'pooled_R2': float(at_best['pooled_R2'][0]),
+        'curve': curve,
+        'flat': bool(np.ptp(scan['pooled_R2']) <= 1e-9),
+    }
+
+
+def format_reduced_equation(a: float, b: float) -> str:
+    """Возвращает уравнение регрессии для напряжений, сниженных на коэффициент запаса."""
+    sign = "+" if b >= 0 else "-"
+    return f"lg(σ) = {a:.4f} · P {sign} {abs(b):.4f}"
+
+
+def format_word_table_number(value: float) -> str:
+    """Форматирует число для таблицы Word без лишних нулей."""
+    numeric_value = float(value)
+    if numeric_value.is_integer():
+        return str(int(numeric_value))
+    return f"{numeric_value:.2f}".rstrip("0").rstrip(".").replace('.', ',')
+
+
+def build_test_results_table(df_tests: pd.DataFrame) -> pd.DataFrame:
+    """Формирует таблицу режимов и результатов испытаний из введенных данных."""
+    if df_tests.empty:
+        return pd.DataFrame(columns=[
+            "Образец",
+            "Напряжение, σ, МПа",
+            "Температура, °C",
+            "Длительность испытания, ч"
+        ])
+
+    table_df = df_tests.copy()
+    table_df = table_df.rename(columns={
+        "sigma_MPa": "Напряжение, σ, МПа",
+        "T_C": "Температура, °C",
+        "tau_h": "Длительность испытания, ч"
+    })
+
+    desired_columns = [
+        "Образец",
+        "Напряжение, σ, МПа",
+        "Температура, °C",
+        "Длительность испытания, ч"
+    ]
+    table_df = table_df[desired_columns]
+
+    numeric_columns = [
+        "Напряжение, σ, МПа",
+        "Температура, °C",
+        "Длительность испытания, ч"
+    ]
+    for column in numeric_columns:
+        table_df[column] = table_df[column].round().astype(int)
+
+    return table_df
+
+
+def add_word_table_rows(table, rows: List[List[str]]) -> None:
+    """Добавляет строки в таблицу Word пакетно.
+
+    Оформление (выравнивание, шрифт) задается один раз в строке-шаблоне, после чего
+    ее XML копируется для каждой строки данных и в нем заменяется только текст.
+    """
+    if not rows:
+        return
+    for cell in table.add_row().cells:
+        p = cell.paragraphs[0]
+        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        run = p.add_run("-")
+        run.font.name = "Times New Roman"
+        run.font.size = Pt(14)
+    template = table.rows[-1]._tr
+    tbl = table._tbl
+    tbl.remove(template)
+    for values in rows:
+        tr = copy.deepcopy(template)
+        for text_element, value in zip(tr.iter(qn('w:t')), values):
+            text_element.text = value
+            if value != value.strip():
+                text_element.set(qn('xml:space'), 'preserve')
+        tbl.append(tr)
+
+
+def create_word_test_table(series_name: str, df_tests: pd.DataFrame) -> io.BytesIO:
+    """Создает Word-файл с таблицей режимов и результатов испытаний."""
+    if not DOCX_AVAILABLE:
+        raise ModuleNotFoundError("python-docx не установлен")
+
+    table_df = build_test_results_table(df_tests)
+    doc = Document()
+    style = doc.styles["Normal"]
+    style.font.name = "Times New Roman"
+    style.font.size = Pt(14)
+
+    title = doc.add_paragraph()
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    title_run = title.add_run("Таблица 1 — Режимы и результаты испытания образцов на длительную прочность")
+    title_run.font.name = "Times New Roman"
+    title_run.font.size = Pt(14)
+
+    if series_name.strip():
+        series_paragraph = doc.add_paragraph()
+        series_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        series_run = series_paragraph.add_run(f"Серия образцов: {series_name}")
+        series_run.font.name = "Times New Roman"
+        series_run.font.size = Pt(14)
+
+    doc.add_paragraph("")
+    table = doc.add_table(rows=1, cols=len(table_df.columns))
+    table.style = "Table Grid"
+    table.alignment = WD_TABLE_ALIGNMENT.CENTER
+
+    for i, header in enumerate(table_df.columns):
+        cell = table.rows[0].cells[i]
+        p = cell.paragraphs[0]
+        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        run = p.add_run(header)
+        run.bold = True
+        run.font.name = "Times New Roman"
+        run.font.size = Pt(14)
+
+    add_word_table_rows(table, [
+        [
+            str(sample),
+            format_word_table_number(sigma),
+            format_word_table_number(T_C),
+            format_word_table_number(tau_h),
+        ]
+        for sample, sigma, T_C, tau_h in zip(
+            table_df["Образец"],
+            table_df["Напряжение, σ, МПа"],
+            table_df["Температура, °C"],
+            table_df["Длительность испытания, ч"]
+        )
+    ])
+
+    output = io.BytesIO()
+    doc.save(output)
+    output.seek(0)
+    return output
+
+
+def create_word_report(series_name: str, df_tests: pd.DataFrame, selected_param: str, c_value: float) -> io.BytesIO:
+    """Создает Word-отчет по испытаниям."""
+    if not DOCX_AVAILABLE:
+        raise ModuleNotFoundError("python-docx не установлен")
+
+    doc = Document()
+    style = doc.styles["Normal"]
+    style.font.name = "Times New Roman"
+    style.font.size = Pt(14)
+
+    title = doc.add_paragraph()
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    r = title.add_run(f"Отчет по испытаниям — {series_name}")
+    r.bold = True
+    r.font.name = "Times New Roman"
+    r.font.size = Pt(14)
+
+    subtitle = doc.add_paragraph()
+    subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    r2 = subtitle.add_run(f"Параметр долговечности: {selected_param}")
+    r2.font.name = "Times New Roman"
+    r2.font.size = Pt(14)
+
+    doc.add_paragraph("")
+    table = doc.add_table(rows=1, cols=5)
+    table.style = "Table Grid"
+    table.alignment = WD_TABLE_ALIGNMENT.CENTER
+
+    headers = [
+        "Образец",
+        "Напряжение, МПа",
+        "Температура, °C",
+        "Время, ч",
+        "РТр",
+    ]
+
+    for i, header in enumerate(headers):
+        cell = table.rows[0].cells[i]
+        cell._tc.get_or_add_tcPr().append(
+            parse_xml(r'<w:shd {} w:fill="F2F2F2"/>'.format(nsdecls('w')))
+        )
+        p = cell.paragraphs[0]
+        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        rr = p.add_run(header)
+        rr.bold = True
+        rr.font.name = "Times New Roman"
+        rr.font.size = Pt(14)
+
+    T_C = df_tests["T_C"].to_numpy(dtype=float)
+    tau_h = df_tests["tau_h"].to_numpy(dtype=float)
+    p_values = calculate_parameter_P(T_C + 273.15, tau_h, selected_param, c_value)
+
+    add_word_table_rows(table, [
+        [
+            str(sample),
+            f"{round(float(sigma))}".replace('.', ','),
+            f"{round(float(T))}".replace('.', ','),
+            f"{round(float(tau))}".replace('.', ','),
+            f"{p_value:.2f}".replace('.', ','),
+        ]
+        for sample, sigma, T, tau, p_value in zip(
+            df_tests["Образец"], df_tests["sigma_MPa"], T_C, tau_h, p_values
+        )
+    ])
+
+    output = io.BytesIO()
+    doc.save(output)
+    output.seek(0)
+    return output
+
+
+def build_word_documents(series_name: str, df_tests: pd.DataFrame, selected_param: str,
+                         c_value: float) -> Tuple[bytes, bytes]:
+    """Формирует таблицу испытаний и отчет Word; возвращает их содержимое в байтах."""
+    word_table = create_word_test_table(series_name, df_tests)
+    word_report = create_word_report(series_name, df_tests, selected_param, c_value)
+    return word_table.getvalue(), word_report.getvalue()
+
+
+# Цвета точек и линий аппроксимации по номеру группы
+GROUP_COLORS = {
+    0: 'gray',      # Точки без аппроксимации
+    1: 'blue',      # Группа 1
+    2: 'red',       # Группа 2
+    3: 'green',     # Группа 3
+    4: 'purple',    # Группа 4
+    5: 'orange',    # Группа 5
+    6: 'brown',     # Группа 6
+    7: 'pink',      # Группа 7
+    8: 'cyan',      # Группа 8
+    9: 'magenta',   # Группа 9
+    10: 'olive'     # Группа 10
+}
+
+
+def calculate_allowable_curve(steel_grade: str) -> Tuple[np.ndarray, np.ndarray, str]:
+    """Возвращает (σ, P_доп, подпись) для кривой допускаемого снижения длительной прочности.
+
+    Массивы берутся из заранее построенных таблиц справочника марок и доступны
+    только для чтения. Для марки вне справочника используется кривая марки по умолчанию.
+    """
+    material = get_material(steel_grade)
+    if material is None:
+        material = get_material(DEFAULT_MATERIAL)
+        return material['plot_sigma'], material['plot_P'], "Допускаемое снижение длительной прочности"
+    return material['plot_sigma'], material['plot_P'], material['label']
+
+
+def build_strength_figure(df_points: pd.DataFrame, approximations: Dict, selected_approx_groups: List[int],
+                          group_names: Dict, curve: Tuple[np.ndarray, np.ndarray, str],
+                          selected_param: str, C: float, selected_steel: str, series_name: str,
+                          figsize: Tuple[float, float], bands: Optional[Dict] = None, band_level: float = 0.95):
+    """Строит график длительной прочности: кривая допускаемых напряжений, точки и аппроксимации.
+
+    ``bands`` — интервалы регрессии из calculate_regression_bands, они выводятся
+    закрашенными областями цвета своей группы.
+    """
+    sigma_vals, P_dop, steel_label = curve
+    # Figure создается без pyplot и не попадает в глобальный реестр фигур
+    fig = Figure(figsize=figsize)
+    ax = fig.add_subplot()
+    
+    # 1. Кривая допускаемых напряжений
+    ax.plot(P_dop, sigma_vals, 'k-', label=steel_label, linewidth=2)
+    
+    # 2. Точки испытаний (если есть), по группам
+    for group_num in sorted(df_points["Группа_аппроксимации"].unique()):
+        group_data = df_points[df_points["Группа_аппроксимации"] == group_num]
+        color = GROUP_COLORS.get(group_num, 'gray')
+        
+        if group_num == 0:
+            label = f'Точки без аппроксимации ({len(group_data)} шт.)'
+        else:
+            group_name = group_names.get(str(group_num), f"Группа {group_num}")
+            if group_num in selected_approx_groups:
+                if group_num in approximations:
+                    label = f'{group_name} ({len(group_data)} точек, R²={approximations[group_num]["R2"]:.3f})'
+                else:
+                    label = f'{group_name} ({len(group_data)} точек)'
+            else:
+                label = f'{group_name} ({len(group_data)} точек, аппроксимация не строится)'
+        
+        ax.scatter(group_data["P"], group_data["sigma_MPa"], 
+                  c=color, s=50, label=label, alpha=0.7)
+    
+    # 3. Аппроксимационные линии для выбранных групп
+    for group_num, approx_data in approximations.items():
+        if group_num in selected_approx_groups:
+            P_appr = (np.log10(sigma_vals) - approx_data['b']) / approx_data['a']
+            ax.plot(P_appr, sigma_vals, color=approx_data['color'], linestyle='--', 
+                   linewidth=1.5, label=f'{approx_data["equation"]}; R²={approx_data["R2"]:.3f}')
+
+    # 4. Доверительный и прогнозный интервалы аппроксимаций
+    for group_num, band in (bands or {}).items():
+        if group_num in selected_approx_groups and group_num in approximations:
+            color = approximations[group_num]['color']
+            group_name = group_names.get(str(group_num), f"Группа {group_num}")
+            ax.fill_between(band['P'], *band['prediction'], color=color, alpha=0.1,
+                            linewidth=0, label=f'{group_name}: прогнозный интервал {band_level:.0%}')
+            ax.fill_between(band['P'], *band['confidence'], color=color, alpha=0.25,
+                            linewidth=0, label=f'{group_name}: доверительный интервал {band_level:.0%}')
+    
+    # Настройка графика
+    ax.set_xlim(P_dop.min() - 0.1, P_dop.max() + 0.1)
+    ax.set_ylim(20, 150)
+    
+    if selected_param == "Трунина":
+        xlabel_text = f"Параметр Трунина $\\mathit{{P}} = \\mathit{{T}} \\cdot (\\log_{{10}}(\\mathregular{{τ}}) - 2\\log_{{10}}(\\mathit{{T}}) + {C:.2f}) \\cdot 10^{{-3}}$"
+    else:
+        xlabel_text = f"Параметр Ларсона-Миллера $\\mathit{{P}} = \\mathit{{T}} \\cdot (\\log_{{10}}(\\mathregular{{τ}}) + {C:.2f}) \\cdot 10^{{-3}}$"
+    
+    ax.set_xlabel(xlabel_text, fontsize=10)
+    ax.set_ylabel("σ, МПа", fontsize=11, fontstyle='normal')
+    ax.set_title(f"Длительная прочность стали {selected_steel} - {series_name}", fontsize=12, pad=15)
+    
+    # Легенда справа от графика
+    ax.legend(fontsize=8, frameon=True, fancybox=True, 
+             shadow=True, framealpha=0.9, 
+             bbox_to_anchor=(1.05, 1), loc='upper left')
+    
+    ax.grid(True, alpha=0.3)
+    fig.subplots_adjust(right=0.75)
+    return fig
+
+
+# Параметры растеризации графика (как у st.pyplot)
+FIGURE_DPI = 200
+FIGURE_FORMATS = {"PNG": "png", "SVG": "svg"}
+
+
+def render_figure(fig: Figure, image_format: str = "png") -> bytes:
+    """Сохраняет фигуру в PNG/SVG и сразу освобождает ее объекты."""
+    try:
+        output = io.BytesIO()
+        fig.savefig(output, format=image_format, dpi=FIGURE_DPI, bbox_inches="tight")
+        return output.getvalue()
+    finally:
+        fig.clear()
+
+
+# --- Расчет остаточного ресурса ---
+# Коды ошибок пакетного расчета остаточного ресурса
+RESIDUAL_OK = 0
+RESIDUAL_ERROR_THICKNESS = 1
+RESIDUAL_ERROR_TAU_R = 2
+RESIDUAL_ERROR_INPUT = 3
+
+RESIDUAL_ERROR_MESSAGES = {
+    RESIDUAL_ERROR_THICKNESS: "Толщина стенки станет ≤ 0",
+    RESIDUAL_ERROR_TAU_R: "Некорректное время до разрушения",
+    RESIDUAL_ERROR_INPUT: "Некорректные исходные данные расчета",
+}
+
+# Методы решения уравнения τ_прогн = τ_р(τ_прогн)
+SOLVER_BRACKETED = "bracketed"
+SOLVER_FIXED_POINT = "fixed_point"
+SOLVER_LABELS = {
+    SOLVER_BRACKETED: "Метод Ньютона с границами (быстрый)",
+    SOLVER_FIXED_POINT: "Простая итерация (исходный метод)",
+}
+
+# Параметры итерационного расчета (метод простой итерации с демпфированием)
+FIXED_POINT_START = 50000.0
+FIXED_POINT_MAX_ITER = 100
+FIXED_POINT_TOLERANCE = 200.0
+FIXED_POINT_MAX_STEP = 10000.0
+
+# Параметры метода Ньютона с границами
+BRACKETED_MAX_ITER = 60
+BRACKETED_TOLERANCE = 1.0
+
+TRACE_FIELDS = ("tau_prognoz", "tau_r", "s_min2", "sigma_fact2")
+
+
+def calculate_log_tau_r(P_values, T_K, selected_param: str, C: float):
+    """Возвращает lg(τ_р) по значению параметра долговечности и температуре."""
+    if selected_param == "Трунина":
+        return P_values / T_K * 1000 + 2 * np.log10(T_K) - C
+    return P_values / T_K * 1000 - C
+
+
+def calculate_residual_resource_batch(s_min, s_max, d_max, p_MPa, T_rab_C, tau_exp, k_zapas,
+                                      approx: Dict, selected_param: str, C: float, s_nom,
+                                      return_iterations: bool = False,
+                                      method: str = SOLVER_FIXED_POINT,
+                                      tolerance: float = BRACKETED_TOLERANCE,
+                                      tau_start=None, regression=None,
+                                      lower_prediction: Optional[Tuple[Dict, float]] = None) -> Dict[str, np.ndarray]:
+    """Рассчитывает остаточный ресурс сразу для массива наборов параметров труб.
+
+    Все параметры труб принимаются как числа или массивы одной длины. Возвращает
+    словарь массивов: остаточный ресурс (NaN при ошибке), признак сходимости и код
+    ошибки для каждого набора. Протокол итераций собирается только по запросу.
+
+    Метод ``SOLVER_FIXED_POINT`` повторяет исходную демпфированную простую итерацию
+    с допуском 200 ч. Метод ``SOLVER_BRACKETED`` ищет корень τ_прогн − τ_р(τ_прогн)
+    методом Ньютона, не выходя из интервала, где меняется знак, до допуска
+    ``tolerance`` часов; ``tau_start`` задает начальное приближение (например,
+    результат предыдущего расчета). ``regression`` — пара (a, b) чисел или массивов,
+    заменяющая регрессию по точкам ``approx`` (например, выборка коэффициентов);
+    вместе с ней можно передать и массив ``C`` — по значению на набор.
+    ``lower_prediction`` — пара (статистика регрессии, t_кр): время до разрушения
+    берется по нижней границе прогнозного интервала (консервативная оценка).
+    """
+    if method not in SOLVER_LABELS:
+        raise ValueError(f"Неизвестный метод расчета: {method}")
+
+    if regression is None:
+        a, b, R2 = build_regression(approx['P_values'], approx['sigma_values'])
+    else:
+        (a, b), R2 = regression, np.nan
+
+    arrays = np.broadcast_arrays(*[
+        np.atleast_1d(np.asarray(value, dtype=float))
+        for value in (s_min, s_max, d_max, p_MPa, T_rab_C, tau_exp, k_zapas, s_nom, a, b, C)
+    ])
+    s_min, s_max, d_max, p_MPa, T_rab_C, tau_exp, k_zapas, s_nom, a, b, C = [x.ravel() for x in arrays]
+    n = s_min.size
+    T_rab = T_rab_C + 273.15
+
+    # Деление напряжений на k_зап сдвигает только свободный член регрессии:
+    # lg(σ/k) = a·P + (b − lg k), поэтому одна регрессия годится для всех k_зап
+    valid = np.all(np.isfinite(arrays), axis=0).ravel()
+    valid &= (s_min > 0) & (tau_exp > 0) & (k_zapas > 0) & (T_rab > 0) & (a != 0)
+    with np.errstate(all='ignore'):
+        reduced_b = b - np.log10(k_zapas)
+        # Скорость коррозии
+        v_corr = corrosion_rate(s_nom, s_max, s_min, tau_exp)
+
+    state = {
+        "tau_prognoz": np.full(n, FIXED_POINT_START),
+        "final_tau_r": np.full(n, np.nan),
+        "final_s_min2": np.full(n, np.nan),
+        "final_sigma_fact2": np.full(n, np.nan),
+        "delta": np.full(n, np.nan),
+        "converged": np.zeros(n, dtype=bool),
+        "error_code": np.where(valid, RESIDUAL_OK, RESIDUAL_ERROR_INPUT),
+        "iteration_count": np.zeros(n, dtype=int),
+        "slope": a.copy(),
+    }
+    trace = []
+
+    def evaluate(idx: np.ndarray, tau: np.ndarray):
+        """Время до разрушения при прогнозе tau для наборов idx; пишет протокол."""
+        s_min2 = s_min[idx] - v_corr[idx] * tau
+        sigma_fact2 = calculate_pipe_stress(p_MPa[idx], d_max[idx], s_min2)
+        if lower_prediction is None:
+            P_rab = (np.log10(sigma_fact2) - reduced_b[idx]) / a[idx]
+        else:
+            P_rab, state["slope"][idx] = calculate_lower_prediction_parameter(
+                np.log10(sigma_fact2), a[idx], reduced_b[idx], *lower_prediction
+            )
+        tau_r = 10 ** calculate_log_tau_r(P_rab, T_rab[idx], selected_param, C[idx])
+
+        state["iteration_count"][idx] += 1
+        state["final_tau_r"][idx] = tau_r
+        state["final_s_min2"][idx] = s_min2
+        state["final_sigma_fact2"][idx] = sigma_fact2
+        state["delta"][idx] = tau - tau_r
+        if return_iterations:
+            step = {name: np.full(n, np.nan) for name in TRACE_FIELDS}
+            step["tau_prognoz"][idx] = tau
+            step["tau_r"][idx] = tau_r
+            step["s_min2"][idx] = s_min2
+            step["sigma_fact2"][idx] = sigma_fact2
+            trace.append(step)
+        return s_min2, sigma_fact2, tau_r
+
+    with np.errstate(all='ignore'):
+        if method == SOLVER_FIXED_POINT:
+            _solve_fixed_point(state, valid, s_min, v_corr, evaluate)
+        else:
+            _solve_bracketed(state, valid, s_min, d_max, v_corr, T_rab,
+                             float(tolerance), tau_start, evaluate)
+
+    error_code = state["error_code"]
+    failed = error_code != RESIDUAL_OK
+    tau_prognoz = state["tau_prognoz"]
+    tau_prognoz[failed] = np.nan
+    result = {
+        "tau_prognoz": tau_prognoz,
+        "converged": state["converged"] & ~failed,
+        "error_code": error_code,
+        "iteration_count": state["iteration_count"],
+        "final_tau_r": state["final_tau_r"],
+        "final_s_min2": state["final_s_min2"],
+        "final_sigma_fact2": state["final_sigma_fact2"],
+        "v_corr": v_corr,
+        "delta": state["delta"],
+        "reduced_a": a,
+        "reduced_b": reduced_b,
+        "reduced_R2": np.full(n, R2),
+    }
+    if return_iterations:
+        result["iterations"] = {
+            name: np.vstack([step[name] for step in trace]) if trace else np.empty((0, n))
+            for name in TRACE_FIELDS
+        }
+    return result
+
+
+def _solve_fixed_point(state: Dict, valid: np.ndarray, s_min: np.ndarray,
+                       v_corr: np.ndarray, evaluate) -> None:
+    """Исходная демпфированная простая итерация, векторизованная по наборам."""
+    tau_prognoz = state["tau_prognoz"]
+    error_code = state["error_code"]
+    active = valid.copy()
+    for _ in range(FIXED_POINT_MAX_ITER):
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+
+        # Будущая минимальная толщина
+        tau = tau_prognoz[idx]
+        too_thin = s_min[idx] - v_corr[idx] * tau <= 0
+        error_code[idx[too_thin]] = RESIDUAL_ERROR_THICKNESS
+        idx, tau = idx[~too_thin], tau[~too_thin]
+
+        _, _, tau_r = evaluate(idx, tau)
+        invalid_tau = ~np.isfinite(tau_r) | (tau_r <= 0)
+        error_code[idx[invalid_tau]] = RESIDUAL_ERROR_TAU_R
+
+        step_delta = tau - tau_r
+        done = ~invalid_tau & (np.abs(step_delta) <= FIXED_POINT_TOLERANCE)
+        state["converged"][idx[done]] = True
+
+        # Коррекция прогноза для еще не сошедшихся наборов
+        keep = ~invalid_tau & ~done
+        correction = np.clip(step_delta[keep] * 0.5, -FIXED_POINT_MAX_STEP, FIXED_POINT_MAX_STEP)
+        new_tau = tau[keep] - correction
+        tau_prognoz[idx[keep]] = np.where(new_tau <= 0, 1000.0, new_tau)
+
+        active[:] = False
+        active[idx[keep]] = True
+
+
+def _solve_bracketed(state: Dict, valid: np.ndarray, s_min: np.ndarray, d_max: np.ndarray,
+                     v_corr: np.ndarray, T_rab: np.ndarray,
+                     tolerance: float, tau_start, evaluate) -> None:
+    """Метод Ньютона по g(τ) = lg τ − lg τ_р(τ) с сохранением интервала смены знака.
+
+    Шаг Ньютона делается по ln τ, поэтому τ остается положительным. Если шаг выходит
+    за текущий интервал [lo, hi], он заменяется делением интервала пополам (или
+    удвоением τ, пока правая граница не найдена).
+    """
+    n = s_min.size
+    tau_prognoz = state["tau_prognoz"]
+    error_code = state["error_code"]
+
+    # Правая граница: момент, когда толщина стенки обращается в ноль
+    with np.errstate(divide='ignore'):
+        tau_limit = np.where(v_corr > 0, s_min / v_corr, np.inf)
+    lo = np.zeros(n)
+    hi = tau_limit.copy()
+    hi_found = np.zeros(n, dtype=bool)
+
+    if tau_start is not None:
+        start = np.broadcast_to(np.asarray(tau_start, dtype=float), (n,))
+        use_start = np.isfinite(start) & (start > 0) & (start < tau_limit)
+        tau_prognoz[use_start] = start[use_start]
+    outside = tau_prognoz >= tau_limit
+    tau_prognoz[outside] = 0.5 * tau_limit[outside]
+
+    active = valid.copy()
+    for _ in range(BRACKETED_MAX_ITER):
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+
+        tau = tau_prognoz[idx]
+        s_min2, _, tau_r = evaluate(idx, tau)
+        invalid_tau = np.isnan(tau_r) | (tau_r < 0)
+        error_code[idx[invalid_tau]] = RESIDUAL_ERROR_TAU_R
+
+        done = ~invalid_tau & (np.abs(tau - tau_r) <= tolerance)
+        state["converged"][idx[done]] = True
+
+        keep = ~invalid_tau & ~done
+        idx, tau, s_min2, tau_r = idx[keep], tau[keep], s_min2[keep], tau_r[keep]
+        g = np.log10(tau) - np.log10(tau_r)
+
+        # Сужение интервала по знаку невязки
+        above = g > 0
+        hi[idx[above]] = tau[above]
+        hi_found[idx[above]] = True
+        lo[idx[~above]] = tau[~above]
+
+        # Шаг Ньютона по ln τ: d g / d ln τ = 1/ln10 − τ·(1000/(T·a))·v·d / (ln10·s·(d + s)),
+        # где a — наклон кривой lg σ(P) в текущей точке
+        v = v_corr[idx]
+        d = d_max[idx]
+        dg_dln_tau = (1 - tau * 1000 / (T_rab[idx] * state["slope"][idx]) * v * d / (s_min2 * (d + s_min2))) / np.log(10)
+        new_tau = tau * np.exp(-np.clip(g / dg_dln_tau, -50, 50))
+
+        idx_lo, idx_hi = lo[idx], hi[idx]
+        outside = ~np.isfinite(new_tau) | (new_tau <= idx_lo) | (new_tau >= idx_hi)
+        fallback = np.where(np.isfinite(idx_hi), 0.5 * (idx_lo + idx_hi), 2 * tau)
+        new_tau = np.where(outside, fallback, new_tau)
+
+        # Интервал сжат до машинной точности: корень найден, если знак менялся
+        collapsed = np.isfinite(idx_hi) & (idx_hi - idx_lo <= 1e-12 * idx_hi)
+        pinned = collapsed & hi_found[idx]
+        state["converged"][idx[pinned]] = True
+        tau_prognoz[idx[pinned]] = tau[pinned]
+        error_code[idx[collapsed & ~hi_found[idx]]] = RESIDUAL_ERROR_THICKNESS
+
+        go = ~collapsed
+        tau_prognoz[idx[go]] = new_tau[go]
+        active[:] = False
+        active[idx[go]] = True
+
+    # Не сошедшиеся наборы остаются на последнем вычисленном приближении
+    unfinished = np.flatnonzero(active)
+    last = state["final_tau_r"][unfinished] + state["delta"][unfinished]
+    tau_prognoz[unfinished] = np.where(np.isfinite(last), last, tau_prognoz[unfinished])
+
+
+def calculate_residual_resource(params: Dict, approx: Dict, selected_param: str, C: float, 
+                                steel_grade: str, s_nom: float,
+                                method: str = SOLVER_FIXED_POINT,
+                                tolerance: float = BRACKETED_TOLERANCE,
+                                tau_start: Optional[float] = None,
+                                lower_prediction: Optional[Tuple[Dict, float]] = None) -> Tuple[Optional[float], Dict]:
+    """Рассчитывает остаточный ресурс по заданным параметрам."""
+    
+    try:
+        batch = calculate_residual_resource_batch(
+            params['s_min'], params['s_max'], params['d_max'], params['p_MPa'],
+            params['T_rab_C'], params['tau_exp'], params['k_zapas'],
+            approx, selected_param, C, s_nom, return_iterations=True,
+            method=method, tolerance=tolerance, tau_start=tau_start,
+            lower_prediction=lower_prediction
+        )
+        error_code = int(batch['error_code'][0])
+        if error_code != RESIDUAL_OK:
+            return None, {"error": RESIDUAL_ERROR_MESSAGES[error_code]}
+
+        trace = batch['iterations']
+        iteration_data = []
+        for row in range(int(batch['iteration_count'][0])):
+            tau_prognoz = float(trace['tau_prognoz'][row, 0])
+            tau_r = float(trace['tau_r'][row, 0])
+            iteration_data.append({
+                "Итерация": row + 1,
+                "τ_прогн, ч": round(tau_prognoz, 0),
+                "τ_р, ч": round(tau_r, 0),
+                "Разница, ч": round(tau_prognoz - tau_r, 0),
+                "s_min2, мм": round(float(trace['s_min2'][row, 0]), 3),
+                "σ_факт2, МПа": round(float(trace['sigma_fact2'][row, 0]), 1)
+            })
+
+        return float(batch['tau_prognoz'][0]), {
+            "iterations": iteration_data,
+            "final_tau_r": float(batch['final_tau_r'][0]),
+            "final_s_min2": float(batch['final_s_min2'][0]),
+            "final_sigma_fact2": float(batch['final_sigma_fact2'][0]),
+            "v_corr": float(batch['v_corr'][0]),
+            "delta": float(batch['delta'][0]),
+            "reduced_a": float(batch['reduced_a'][0]),
+            "reduced_b": float(batch['reduced_b'][0]),
+            "reduced_R2": float(batch['reduced_R2'][0]),
+            "converged": bool(batch['converged'][0]),
+            "method": method
+        }
+        
+    except Exception as e:
+        return None, {"error": str(e)}
+
+
+# --- Отбраковочная толщина ---
+# Обратная задача: минимальная толщина s_мин, при которой остаточный ресурс не
+# меньше заданного горизонта H. Разность τ_р(τ) − τ убывает с утонением стенки,
+# поэтому ресурс ≥ H тогда и только тогда, когда τ_р(H) ≥ H, и толщина находится
+# в явном виде без итераций
+REJECTION_HORIZONS_DEFAULT = (8760.0, 26280.0, 43800.0, 87600.0)
+
+
+def calculate_rejection_stress(approx: Dict, T_rab_C, horizons, k_zapas, selected_param: str, C: float) -> np.ndarray:
+    """Напряжение в стенке к концу горизонта, при котором τ_р равно горизонту.
+
+    Таблица для одной группы и режима: массив формы (T, горизонты) для массива
+    температур; при неубывающей регрессии (a ≥ 0) — NaN.
+    """
+    a, b, _ = build_regression(approx['P_values'], approx['sigma_values'])
+    T_K = np.asarray(T_rab_C, dtype=float)[..., None] + 273.15
+    horizons = np.asarray(horizons, dtype=float)
+    with np.errstate(all='ignore'):
+        P_required = calculate_parameter_P(T_K, horizons, selected_param, C)
+        sigma = 10 ** (a * P_required + b - np.log10(np.asarray(k_zapas, dtype=float)[..., None]))
+    return np.where(a < 0, sigma, np.nan)
+
+
+def calculate_rejection_thickness(sigma_allow, d_max, p_MPa, s_nom, s_max, tau_exp, horizons) -> np.ndarray:
+    """Отбраковочная толщина s_мин для каждой трубы (строки) и горизонта (столбцы).
+
+    ``sigma_allow`` — напряжение из calculate_rejection_stress (по горизонтам или
+    по трубам и горизонтам), остальные параметры — числа или массивы по трубам.
+    Скорость коррозии, как в прямом расчете, зависит от самой s_мин:
+    v_корр = (s_опорн − s_мин)/τ_э, где s_опорн = s_макс при s_макс > s_н, иначе s_н.
+    NaN — горизонт недостижим при любой толщине.
+    """
+    d_max, p_MPa, s_nom, s_max, tau_exp = (
+        np.asarray(value, dtype=float).reshape(-1, 1) for value in (d_max, p_MPa, s_nom, s_max, tau_exp)
+    )
+    horizons = np.asarray(horizons, dtype=float)
+    with np.errstate(all='ignore'):
+        ratio = 2 * np.asarray(sigma_allow, dtype=float) / p_MPa - 1
+        s_required = np.where(ratio > 0, d_max / ratio, np.nan)
+        reference = reference_thickness(s_nom, s_max)
+        share = horizons / tau_exp
+        return (s_required + reference * share) / (1 + share)
+
+
+# --- Сохраненные результаты расчетов ---
+# Результат решателя хранится в слоте 'results' расчета вместе с отпечатком его
+# входных данных и сохраняется в файле проекта; пересчитываются только расчеты,
+# у которых отпечаток изменился
+
+
+def calculation_fingerprint(calc_params: Dict, approx: Dict, selected_param: str, C: float,
+                            steel_grade: str, method: str, tolerance: float) -> str:
+    """Отпечаток входных данных расчета: параметры трубы, точки группы, параметр, C, марка, метод."""
+    return hash_stage_inputs((
+        {key: float(value) for key, value in calc_params.items()},
+        np.asarray(approx['P_values'], dtype=float), np.asarray(approx['sigma_values'], dtype=float),
+        selected_param, float(C), steel_grade, method, float(tolerance)
+    ))
+
+
+def stored_calculation_result(calc: Dict, fingerprint: str) -> Optional[Tuple[Optional[float], Dict]]:
+    """Сохраненный результат расчета, если он получен при тех же входных данных."""
+    stored = calc.get('results')
+    if isinstance(stored, dict) and stored.get('fingerprint') == fingerprint:
+        return stored.get('tau_prognoz'), stored.get('details', {})
+    return None
+
+
+def store_calculation_result(calc: Dict, fingerprint: str, tau_prognoz: Optional[float], details: Dict) -> None:
+    calc['results'] = {'fingerprint': fingerprint, 'tau_prognoz': tau_prognoz, 'details': details}
+
+
+def get_solver_inputs(calc_params: Dict, approx: Dict, selected_param: str, C: float) -> Dict:
+    """Собирает все входные данные решателя в плоский словарь для сравнения расчетов."""
+    inputs = {key: float(value) for key, value in calc_params.items()}
+    inputs.update({
+        'approx_a': float(approx['a']),
+        'approx_b': float(approx['b']),
+        'selected_param': selected_param,
+        'C': float(C)
+    })
+    return inputs
+
+
+# --- Пересчет сохраненных проектов ---
+# Значения C, которые интерфейс записывает в проект для невыбранного параметра
+PROJECT_DEFAULT_C = {"Трунина": 24.88, "Ларсона-Миллера": 20.0}
+
+
+def is_main_calculation(calc: Dict) -> bool:
+    return calc.get('id') == 1 or calc.get('name') == 'Основной расчет'
+
+
+def next_calculation_id(calculations: List[Dict], last_id: int = 0) -> int:
+    """Новый идентификатор расчета: больше идентификаторов всех расчетов и ``last_id``.
+
+    По идентификатору находятся результаты фоновых задач и начальные приближения
+    решателя, поэтому номер удаленного расчета нельзя выдавать повторно:
+    ``last_id`` — наибольший номер среди удаленных расчетов.
+    """
+    return max([int(last_id)] + [int(calc.get('id') or 0) for calc in calculations]) + 1
+
+
+def assign_unique_calculation_ids(calculations: List[Dict]) -> List[Dict]:
+    """Перенумеровывает расчеты с повторяющимся или пустым идентификатором (проекты старых версий)."""
+    seen = set()
+    for calc in calculations:
+        if not calc.get('id') or calc['id'] in seen:
+            calc['id'] = next_calculation_id(calculations)
+        seen.add(calc['id'])
+    return calculations
+
+
+def get_project_C(project: Dict, selected_param: str) -> float:
+    """Коэффициент C выбранного параметра долговечности из сохраненного проекта."""
+    key = "коэффициент_C_trunin" if selected_param == "Трунина" else "коэффициент_C_larson"
+    return float(project.get(key, PROJECT_DEFAULT_C.get(selected_param, 20.0)))
+
+
+def prepare_project_tests(records, selected_param: str, C: float) -> pd.DataFrame:
+    """Корректные испытания проекта со значениями параметра долговечности P."""
+    test_data = make_test_dataframe(records)
+    df_tests = prepare_tests_for_calculation(test_data[validate_test_data(test_data).all(axis=1)])
+    df_tests["T_K"] = df_tests["T_C"] + 273.15
+    df_tests["P"] = calculate_parameter_P(df_tests["T_K"].values, df_tests["tau_h"].values, selected_param, C)
+    return df_tests
+
+
+def solve_project(project: Dict, method: str = SOLVER_FIXED_POINT, tolerance: float = BRACKETED_TOLERANCE,
+                  C: Optional[float] = None) -> Dict:
+    """Пересчитывает все расчеты остаточного ресурса сохраненного проекта.
+
+    Проект задается словарем в формате файла «проект_ресурса.json». Для основного
+    расчета, как и в интерфейсе, используются «параметры_трубы». Если C не задан,
+    берется коэффициент, сохраненный в проекте. Сохраненные в проекте результаты
+    с совпадающим отпечатком входных данных не пересчитываются.
+    """
+    selected_param = project.get("выбранный_параметр", "Трунина")
+    steel_grade = project.get("марка_стали", "12Х1МФ")
+    if C is None:
+        C = get_project_C(project, selected_param)
+    df_tests = prepare_project_tests(project.get("испытания", []), selected_param, C)
+
+    pipe_params = project.get("параметры_трубы", {})
+    calculations = project.get("resource_calculations", [])
+    groups = sorted(
+        {int(group) for group in project.get("выбранные_группы_аппроксимации", [])}
+        | {int(calc.get('selected_group', 0)) for calc in calculations}
+    )
+    approximations, warnings = build_group_approximations(
+        df_tests, [group for group in groups if group > 0], project.get("group_names", {}), selected_param
+    )
+
+    results = []
+    for calc in calculations:
+        params = dict(pipe_params) if is_main_calculation(calc) and pipe_params else dict(calc.get('params', {}))
+        group = int(calc.get('selected_group', 0))
+        reused = False
+        if group in approximations:
+            fingerprint = calculation_fingerprint(
+                params, approximations[group], selected_param, C, steel_grade, method, tolerance
+            )
+            stored = stored_calculation_result(calc, fingerprint)
+            reused = stored is not None
+            if reused:
+                tau_prognoz, details = stored
+            else:
+                tau_prognoz, details = calculate_residual_resource(
+                    params, approximations[group], selected_param, C, steel_grade,
+                    params.get('s_nom', np.nan), method=method, tolerance=tolerance
+                )
+        elif group == 0:
+            tau_prognoz, details = None, {"error": "Не выбрана группа аппроксимации"}
+        else:
+            tau_prognoz, details = None, {"error": f"Группа {group} не имеет аппроксимации"}
+        results.append({
+            'id': calc.get('id'),
+            'name': calc.get('name', ''),
+            'selected_group': group,
+            'params': params,
+            'tau_prognoz': tau_prognoz,
+            'details': details,
+            'reused': reused
+        })
+
+    return {
+        'series_name': project.get("название_серии", "Образцы"),
+        'steel_grade': steel_grade,
+        'selected_param': selected_param,
+        'C': C,
+        'df_tests': df_tests,
+        'approximations': approximations,
+        'warnings': warnings,
+        'calculations': results
+    }
@@ -0,0 +1,120 @@
+"""Карта остаточного ресурса по сетке рабочих температур и давлений.
+
+Все узлы сетки T × p (и, при необходимости, k_зап) решаются одним вызовом
+пакетного решателя. Узлы, уже рассчитанные для предыдущей сетки при тех же
+остальных входных данных, берутся из нее, поэтому при изменении одной оси
+решаются только новые значения этой оси.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from resource_core import (
+    BRACKETED_TOLERANCE,
+    SOLVER_BRACKETED,
+    calculate_residual_resource_batch,
+    hash_stage_inputs,
+)
+
+SWEEP_DEFAULT_POINTS = 41
+SWEEP_MAX_POINTS = 200
+SWEEP_CONTOUR_LEVELS = 12
+
+
+def sweep_axis(start: float, stop: float, count: int) -> np.ndarray:
+    """Равномерная ось сетки; значения округляются, чтобы узлы разных сеток совпадали."""
+    return np.round(np.linspace(float(start), float(stop), int(count)), 6)
+
+
+def _match_axis(values: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """Индексы значений оси в предыдущей оси (−1 — нового значения там нет)."""
+    order = np.argsort(previous)
+    position = np.clip(np.searchsorted(previous, values, sorter=order), 0, len(previous) - 1)
+    index = order[position]
+    return np.where(previous[index] == values, index, -1)
+
+
+def calculate_resource_sweep(pipe_params: Dict, approx: Dict, selected_param: str, C: float,
+                             T_values, p_values, k_values=None, method: str = SOLVER_BRACKETED,
+                             tolerance: float = BRACKETED_TOLERANCE,
+                             previous: Optional[Dict] = None) -> Dict:
+    """Остаточный ресурс во всех узлах сетки k_зап × T × p.
+
+    Остальные параметры трубы берутся из ``pipe_params``; если ``k_values`` не
+    задан, используется k_зап трубы. Результат — оси сетки и массив ресурса, ч
+    (NaN в узлах с ошибкой или без сходимости) формы (k, T, p). Узлы, совпадающие
+    с узлами ``previous`` (результат прошлого вызова при тех же прочих данных),
+    не пересчитываются.
+    """
+    T_values = np.asarray(T_values, dtype=float)
+    p_values = np.asarray(p_values, dtype=float)
+    k_values = np.asarray([pipe_params['k_zapas']] if k_values is None else k_values, dtype=float)
+    fixed = {key: value for key, value in pipe_params.items() if key not in ('T_rab_C', 'p_MPa', 'k_zapas')}
+    key = hash_stage_inputs((fixed, approx['P_values'], approx['sigma_values'], selected_param, C,
+                             method, tolerance))
+
+    tau = np.full((k_values.size, T_values.size, p_values.size), np.nan)
+    known = np.zeros(tau.shape, dtype=bool)
+    if previous is not None and previous['key'] == key:
+        indices = [_match_axis(values, previous[axis])
+                   for values, axis in ((k_values, 'k'), (T_values, 'T'), (p_values, 'p'))]
+        known = np.logical_and.outer(np.logical_and.outer(indices[0] >= 0, indices[1] >= 0), indices[2] >= 0)
+        grid = np.ix_(*[np.where(index >= 0, index, 0) for index in indices])
+        tau = np.where(known, previous['tau'][grid], np.nan)
+
+    k_grid, T_grid, p_grid = np.meshgrid(k_values, T_values, p_values, indexing='ij')
+    missing = ~known
+    if missing.any():
+        batch = calculate_residual_resource_batch(
+            fixed['s_min'], fixed['s_max'], fixed['d_max'], p_grid[missing], T_grid[missing],
+            fixed['tau_exp'], k_grid[missing], approx, selected_param, C, fixed['s_nom'],
+            method=method, tolerance=tolerance
+        )
+        tau[missing] = np.where(batch['converged'], batch['tau_prognoz'], np.nan)
+
+    return {
+        'key': key,
+        'k': k_values,
+        'T': T_values,
+        'p': p_values,
+        'tau': tau,
+        'solved_points': int(missing.sum()),
+    }
+
+
+def sweep_table(sweep: Dict) -> pd.DataFrame:
+    """Сетка ресурса в длинном формате (одна строка на узел) для выгрузки."""
+    k_grid, T_grid, p_grid = np.meshgrid(sweep['k'], sweep['T'], sweep['p'], indexing='ij')
+    return pd.DataFrame({
+        "k_зап": k_grid.ravel(),
+        "T_раб, °C": T_grid.ravel(),
+        "p, МПа": p_grid.ravel(),
+        "Остаточный ресурс, ч": sweep['tau'].ravel(),
+        "Остаточный ресурс, лет": sweep['tau'].ravel() / 8760,
+    })
+
+
+def build_sweep_figure(sweep: Dict, k_index: int, title: str, figsize: Tuple[float, float],
+                       levels: Optional[List[float]] = None,
+                       operating_point: Optional[Tuple[float, float]] = None) -> Figure:
+    """Карта остаточного ресурса (лет) в осях p — T с подписанными изолиниями."""
+    years = np.ma.masked_invalid(sweep['tau'][k_index] / 8760)
+    fig = Figure(figsize=figsize)
+    ax = fig.add_subplot()
+    if years.count() == 0:
+        ax.text(0.5, 0.5, "Нет рассчитанных узлов", ha='center', va='center', transform=ax.transAxes)
+    else:
+        filled = ax.contourf(sweep['p'], sweep['T'], years, levels=SWEEP_CONTOUR_LEVELS, cmap='RdYlGn')
+        fig.colorbar(filled, ax=ax, label="Остаточный ресурс, лет")
+        lines = ax.contour(sweep['p'], sweep['T'], years, levels=levels or filled.levels[1:-1],
+                           colors='black', linewidths=0.8)
+        ax.clabel(lines, fmt=lambda value: f"{value:g} лет", fontsize=8)
+    if operating_point is not None:
+        ax.plot(*operating_point, marker='o', linestyle='none', color='blue', markersize=7, label="Текущий режим")
+        ax.legend(loc='upper right', fontsize=8)
+    ax.set_xlabel("Давление p, МПа")
+    ax.set_ylabel("Рабочая температура T_раб, °C")
+    ax.set_title(f"{title}, k_зап = {sweep['k'][k_index]:g}", fontsize=11)
+    return fig
@@ -0,0 +1,126 @@
+"""Чувствительность остаточного ресурса к входным параметрам (диаграммы «торнадо»).
+
+Каждый параметр каждого расчета отклоняется вниз и вверх на одну и ту же
+относительную величину; все варианты всех расчетов решаются одним вызовом
+пакетного решателя. Температура отклоняется в кельвинах. Отклонение C меняет и
+значения P точек испытаний, поэтому для него используются регрессии групп,
+построенные при C·(1 ± δ).
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from resource_core import BRACKETED_TOLERANCE, SOLVER_BRACKETED, calculate_residual_resource_batch
+
+# Параметры анализа и их обозначения в отчете
+SENSITIVITY_PARAMETERS = {
+    's_min': "s_мин",
+    's_max': "s_макс",
+    'd_max': "d_макс",
+    'p_MPa': "p",
+    'T_rab_C': "T_раб",
+    'tau_exp': "τ_э",
+    'k_zapas': "k_зап",
+    'C': "C",
+}
+SENSITIVITY_STEP = 0.02
+SENSITIVITY_STEP_RANGE = (0.005, 0.2)
+_PIPE_PARAMETERS = ['s_min', 's_max', 'd_max', 'p_MPa', 'T_rab_C', 'tau_exp', 'k_zapas', 's_nom']
+
+
+def sensitivity_C_values(C: float, step: float = SENSITIVITY_STEP) -> Tuple[float, float]:
+    """Значения C, при которых нужны регрессии групп для анализа чувствительности."""
+    return C * (1 - step), C * (1 + step)
+
+
+def _perturb(name: str, values: np.ndarray, factor: float) -> np.ndarray:
+    if name == 'T_rab_C':
+        return (values + 273.15) * factor - 273.15
+    return values * factor
+
+
+def calculate_sensitivity(calculations: List[Dict], approximations_by_C: Dict[float, Dict[int, Dict]],
+                          selected_param: str, C: float, step: float = SENSITIVITY_STEP,
+                          method: str = SOLVER_BRACKETED,
+                          tolerance: float = BRACKETED_TOLERANCE) -> pd.DataFrame:
+    """Ресурс при отклонении каждого параметра на ±step и эластичности.
+
+    ``calculations`` — список {'name', 'params', 'group'}; ``approximations_by_C`` —
+    аппроксимации групп при C и при значениях sensitivity_C_values(C, step).
+    Расчеты, группа которых не аппроксимирована, пропускаются. Эластичность —
+    d ln τ / d ln x по центральной разности (для температуры x — T в кельвинах).
+    """
+    C_low, C_high = sensitivity_C_values(C, step)
+    calculations = [calc for calc in calculations
+                    if all(calc['group'] in approximations_by_C[C_value] for C_value in (C, C_low, C_high))]
+    columns = ["Расчет", "Параметр", "Значение", "Ресурс, ч", "Ресурс при −δ, ч", "Ресурс при +δ, ч",
+               "Размах, ч", "Эластичность"]
+    if not calculations:
+        return pd.DataFrame(columns=columns)
+
+    n_calc, n_param = len(calculations), len(SENSITIVITY_PARAMETERS)
+    # Варианты одного расчета: базовый, затем по параметрам (−δ, +δ)
+    n_variants = 1 + 2 * n_param
+    base = {name: np.array([float(calc['params'][name]) for calc in calculations]) for name in _PIPE_PARAMETERS}
+    inputs = {name: np.repeat(values[:, None], n_variants, axis=1) for name, values in base.items()}
+    C_values = np.full((n_calc, n_variants), float(C))
+    a = np.empty((n_calc, n_variants))
+    b = np.empty((n_calc, n_variants))
+    for row, calc in enumerate(calculations):
+        a[row], b[row] = (approximations_by_C[C][calc['group']][key] for key in ('a', 'b'))
+
+    for index, name in enumerate(SENSITIVITY_PARAMETERS):
+        for offset, factor in ((1, 1 - step), (2, 1 + step)):
+            column = 2 * index + offset
+            if name == 'C':
+                C_value = C * factor
+                C_values[:, column] = C_value
+                for row, calc in enumerate(calculations):
+                    approx = approximations_by_C[C_value][calc['group']]
+                    a[row, column], b[row, column] = approx['a'], approx['b']
+            else:
+                inputs[name][:, column] = _perturb(name, base[name], factor)
+
+    batch = calculate_residual_resource_batch(
+        *(inputs[name].ravel() for name in _PIPE_PARAMETERS[:7]), None, selected_param, C_values.ravel(),
+        inputs['s_nom'].ravel(), method=method, tolerance=tolerance, regression=(a.ravel(), b.ravel())
+    )
+    tau = np.where(batch['converged'], batch['tau_prognoz'], np.nan).reshape(n_calc, n_variants)
+    tau_low, tau_high = tau[:, 1::2], tau[:, 2::2]
+    with np.errstate(all='ignore'):
+        elasticity = (np.log(tau_high) - np.log(tau_low)) / (np.log(1 + step) - np.log(1 - step))
+
+    values = np.column_stack([base[name] if name in base else np.full(n_calc, C) for name in SENSITIVITY_PARAMETERS])
+    return pd.DataFrame({
+        "Расчет": np.repeat([calc['name'] for calc in calculations], n_param),
+        "Параметр": np.tile(list(SENSITIVITY_PARAMETERS.values()), n_calc),
+        "Значение": values.ravel(),
+        "Ресурс, ч": np.repeat(tau[:, 0], n_param),
+        "Ресурс при −δ, ч": tau_low.ravel(),
+        "Ресурс при +δ, ч": tau_high.ravel(),
+        "Размах, ч": np.abs(tau_high - tau_low).ravel(),
+        "Эластичность": elasticity.ravel(),
+    }, columns=columns)
+
+
+def build_tornado_figure(sensitivity: pd.DataFrame, title: str, figsize: Tuple[float, float],
+                         step: float = SENSITIVITY_STEP) -> Figure:
+    """Диаграмма «торнадо» одного расчета: параметры упорядочены по размаху ресурса."""
+    rows = sensitivity.sort_values("Размах, ч", na_position='first')
+    base_years = rows["Ресурс, ч"].iloc[0] / 8760
+    fig = Figure(figsize=figsize)
+    ax = fig.add_subplot()
+    positions = np.arange(len(rows))
+    for column, color, label in (("Ресурс при −δ, ч", 'tab:blue', f"−{step:.1%}"),
+                                 ("Ресурс при +δ, ч", 'tab:red', f"+{step:.1%}")):
+        years = rows[column].values / 8760
+        ax.barh(positions, years - base_years, left=base_years, color=color, alpha=0.8, label=label)
+    ax.axvline(base_years, color='black', linewidth=1)
+    ax.set_yticks(positions)
+    ax.set_yticklabels(rows["Параметр"])
+    ax.set_xlabel("Остаточный ресурс, лет")
+    ax.set_title(title, fontsize=11)
+    ax.legend(loc='lower right', fontsize=8)
+    return fig
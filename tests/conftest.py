@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resource_core import build_group_approximations, prepare_project_tests  # noqa: E402
+
+# Серия испытаний одной группы аппроксимации: (σ, МПа; T, °C; τ, ч)
+TEST_POINTS = [(150, 560, 800), (120, 580, 1500), (95, 600, 3000), (70, 620, 6000), (60, 630, 9000), (110, 600, 1200)]
+PIPE_PARAMS = {
+    "s_nom": 6.0, "s_min": 5.2, "s_max": 6.3, "tau_exp": 200000.0,
+    "d_max": 32.5, "T_rab_C": 545.0, "p_MPa": 14.0, "k_zapas": 1.5,
+}
+C_TRUNIN = 24.88
+
+
+@pytest.fixture
+def test_records():
+    return [
+        {"Образец": f"Обр.{i + 1}", "sigma_MPa": sigma, "T_C": T_C, "tau_h": tau_h, "Группа_аппроксимации": 1}
+        for i, (sigma, T_C, tau_h) in enumerate(TEST_POINTS)
+    ]
+
+
+@pytest.fixture
+def pipe_params():
+    return dict(PIPE_PARAMS)
+
+
+@pytest.fixture
+def approx(test_records):
+    df_tests = prepare_project_tests(test_records, "Трунина", C_TRUNIN)
+    return build_group_approximations(df_tests, [1], {}, "Трунина")[0][1]
+
+
+@pytest.fixture
+def project(test_records):
+    """Проект в формате «проект_ресурса.json» с основным и дополнительным расчетом."""
+    return {
+        "название_серии": "Серия 1",
+        "марка_стали": "12Х1МФ",
+        "выбранный_параметр": "Трунина",
+        "испытания": test_records,
+        "параметры_трубы": dict(PIPE_PARAMS),
+        "выбранные_группы_аппроксимации": [1],
+        "group_names": {},
+        "коэффициент_C_trunin": C_TRUNIN,
+        "коэффициент_C_larson": 20.0,
+        "resource_calculations": [
+            {"id": 1, "name": "Основной расчет", "selected_group": 1, "params": dict(PIPE_PARAMS)},
+            {"id": 2, "name": "Расчет 2", "selected_group": 1, "params": dict(PIPE_PARAMS, s_min=4.6, T_rab_C=560.0)},
+        ],
+    }
@@ -0,0 +1,58 @@
+import json
+import os
+
+import pytest
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+PROJECT_UPLOADER = "Загрузите проект (.json)"
+
+
+def upload_project(at, project):
+    uploader = next(widget for widget in at.file_uploader if widget.label == PROJECT_UPLOADER)
+    content = json.dumps(project, ensure_ascii=False).encode("utf-8")
+    uploader.set_value(("проект_ресурса.json", content, "application/json"))
+    at.run()
+    assert not at.exception, at.exception
+
+
+def test_project_import_applied_once(project):
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    upload_project(at, project)
+    prefix = at.session_state['widget_prefix']
+    assert prefix.startswith("loaded_")
+    assert len(at.session_state['test_data']) == len(project["испытания"])
+    assert [calc['name'] for calc in at.session_state['resource_calculations']] == ["Основной расчет", "Расчет 2"]
+
+    # Правки после загрузки сохраняются, пока в загрузчике тот же файл
+    at.text_input(key=f"{prefix}_calc_name_1").set_value("Правка")
+    at.run()
+    at.run()
+    assert at.session_state['resource_calculations'][1]['name'] == "Правка"
+    assert at.session_state['widget_prefix'] == prefix
+
+    # Другое содержимое файла применяется заново, в том числе к полям расчетов и названиям групп
+    project["resource_calculations"][1]["name"] = "Расчет 3"
+    project["group_names"] = {"1": "Гибы"}
+    upload_project(at, project)
+    assert at.session_state['widget_prefix'] != prefix
+    assert at.session_state['resource_calculations'][1]['name'] == "Расчет 3"
+    assert at.session_state['group_names']["1"] == "Гибы"
+
+
+def test_calculation_ids_not_reused(project):
+    project["resource_calculations"].append(dict(project["resource_calculations"][1], id=2, name="Копия"))
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    upload_project(at, project)
+    # Повторяющийся номер из старого файла проекта перенумерован
+    assert [calc['id'] for calc in at.session_state['resource_calculations']] == [1, 2, 3]
+
+    prefix = at.session_state['widget_prefix']
+    at.button(key=f"{prefix}_delete_calc_2").click().run()
+    at.button(key=f"{prefix}_copy_calc_1").click().run()
+    next(button for button in at.button if button.label.startswith("➕ Добавить новый")).click().run()
+    assert not at.exception, at.exception
+    assert [calc['id'] for calc in at.session_state['resource_calculations']] == [1, 2, 4, 5]
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from background_jobs import (
+    JOB_CANCELLED,
+    JOB_DONE,
+    JOB_FAILED,
+    active_jobs,
+    cancel_job,
+    find_job,
+    remove_finished_jobs,
+    report_progress,
+    solve_calculations_job,
+    submit_job,
+)
+from conftest import C_TRUNIN
+from resource_core import SOLVER_BRACKETED, calculate_residual_resource
+
+TIMEOUT = 60
+
+
+def wait(job):
+    job['future'].result(timeout=TIMEOUT)
+    return job
+
+
+def test_calculations_reported_one_by_one(pipe_params, approx):
+    tasks = [
+        {'calc_id': calc_id, 'fingerprint': f"f{calc_id}", 'params': dict(pipe_params, s_min=s_min),
+         'approx': approx, 'selected_param': "Трунина", 'C': C_TRUNIN, 'steel_grade': "12Х1МФ",
+         'method': SOLVER_BRACKETED, 'tolerance': 1.0}
+        for calc_id, s_min in ((1, 5.2), (2, 4.6), (3, 4.0))
+    ]
+    jobs = {}
+    job = wait(submit_job(jobs, "Расчет", "calculations", solve_calculations_job, tasks, payload={'key': "k1"}))
+    assert job['status'] == JOB_DONE
+    assert job['result'] == 3 and job['progress'] == 1.0
+    assert [partial[:2] for partial in job['partial']] == [(1, "f1"), (2, "f2"), (3, "f3")]
+    for task, (_, _, tau_prognoz, details) in zip(tasks, job['partial']):
+        expected, _ = calculate_residual_resource(task['params'], approx, "Трунина", C_TRUNIN, "12Х1МФ",
+                                                  task['params']['s_nom'], method=SOLVER_BRACKETED)
+        assert tau_prognoz == pytest.approx(expected)
+        assert details['converged']
+
+    assert find_job(jobs, "calculations", "k1") is job
+    assert find_job(jobs, "calculations", "k2") is None
+    remove_finished_jobs(jobs)
+    assert jobs == {}
+
+
+def test_cancelled_job_discards_result():
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(job):
+        started.set()
+        release.wait(TIMEOUT)
+        return "результат" if report_progress(job, 1, 2) else None
+
+    jobs = {}
+    job = submit_job(jobs, "Отчет", "report", slow)
+    assert started.wait(TIMEOUT)
+    assert active_jobs(jobs, "report") == [job] and active_jobs(jobs, "calculations") == []
+    cancel_job(job)
+    release.set()
+    wait(job)
+    assert job['status'] == JOB_CANCELLED
+    assert job['result'] is None
+    assert active_jobs(jobs) == []
+
+
+def test_failed_job_keeps_error():
+    def broken(job):
+        raise ValueError("нет данных")
+
+    job = wait(submit_job({}, "Отчет", "report", broken))
+    assert job['status'] == JOB_FAILED
+    assert job['error'] == "нет данных"
+    assert job['finished'] is not None
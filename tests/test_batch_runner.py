@@ -0,0 +1,82 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from batch_runner import collect_input_files, document_stems, main, process_file
+from conftest import C_TRUNIN
+from resource_core import SOLVER_BRACKETED, solve_project
+
+OPTIONS = {'method': SOLVER_BRACKETED, 'tolerance': 1.0, 'C': {}, 'param': "Трунина", 'steel': "12Х1МФ",
+           'docx': False}
+
+
+@pytest.fixture
+def archive(tmp_path, project, test_records):
+    (tmp_path / "станция_1").mkdir()
+    with open(tmp_path / "станция_1" / "проект.json", "w", encoding="utf-8") as project_file:
+        json.dump(project, project_file, ensure_ascii=False)
+    pd.DataFrame(test_records).to_excel(tmp_path / "станция_1" / "испытания.xlsx", index=False)
+    (tmp_path / "станция_1" / "заметки.txt").write_text("не проект", encoding="utf-8")
+    (tmp_path / "станция_1" / "сводка_парка.json").write_text("{}", encoding="utf-8")
+    (tmp_path / "испорчен.json").write_text("{", encoding="utf-8")
+    return tmp_path
+
+
+def test_inputs_collected_once_and_sorted(archive):
+    files = collect_input_files([str(archive), str(archive / "**" / "*.json")])
+    assert [os.path.relpath(path, archive) for path in files] == [
+        "испорчен.json", os.path.join("станция_1", "испытания.xlsx"), os.path.join("станция_1", "проект.json")
+    ]
+
+
+def test_project_and_excel_rows(archive, project):
+    rows, documents = process_file(str(archive / "станция_1" / "проект.json"), OPTIONS)
+    assert documents is None
+    expected = solve_project(project, method=SOLVER_BRACKETED)['calculations']
+    assert [row["Остаточный ресурс, ч"] for row in rows] == [calc['tau_prognoz'] for calc in expected]
+    assert all(row["Сходимость"] and row["C"] == C_TRUNIN for row in rows)
+
+    rows, _ = process_file(str(archive / "станция_1" / "испытания.xlsx"), dict(OPTIONS, C={"Трунина": 25.0}))
+    assert [(row["Серия"], row["Группа"], row["C"]) for row in rows] == [("испытания", 1, 25.0)]
+    assert rows[0]["R²"] > 0.9
+
+
+def test_command_line_run_reports_broken_files(archive):
+    output = archive / "итоги.csv"
+    assert main([str(archive), "-o", str(output), "-j", "1"]) == 2
+    results = pd.read_csv(output, encoding="utf-8-sig")
+    errors = results.set_index(results["Файл"].map(os.path.basename))["Ошибка"].fillna("")
+    assert errors["испорчен.json"].startswith("Файл не обработан")
+    assert (errors[["проект.json", "испытания.xlsx"]] == "").all()
+    assert len(results) == 4
+
+
+def test_document_names_unique_per_file(tmp_path):
+    files = [str(tmp_path / "a" / "проект_ресурса.json"), str(tmp_path / "b" / "проект_ресурса.json"),
+             str(tmp_path / "b" / "проект_ресурса.xlsx")]
+    assert list(document_stems(files).values()) == [
+        "a__проект_ресурса", "b__проект_ресурса", "b__проект_ресурса_xlsx"
+    ]
+    assert document_stems(files[:1]) == {files[0]: "проект_ресурса"}
+
+
+def test_same_named_projects_keep_their_documents(tmp_path, project):
+    docx = pytest.importorskip("docx")
+    for folder in ("a", "b"):
+        (tmp_path / "архив" / folder).mkdir(parents=True)
+        with open(tmp_path / "архив" / folder / "проект_ресурса.json", "w", encoding="utf-8") as project_file:
+            json.dump(dict(project, название_серии=f"Серия {folder}"), project_file, ensure_ascii=False)
+
+    docx_dir = tmp_path / "отчеты"
+    assert main([str(tmp_path / "архив"), "-o", str(tmp_path / "итоги.csv"), "-j", "1",
+                 "--docx-dir", str(docx_dir)]) == 0
+    assert sorted(os.listdir(docx_dir)) == [
+        "a__проект_ресурса_отчет.docx", "a__проект_ресурса_таблица.docx",
+        "b__проект_ресурса_отчет.docx", "b__проект_ресурса_таблица.docx",
+    ]
+    for folder in ("a", "b"):
+        text = "\n".join(paragraph.text for paragraph in
+                         docx.Document(str(docx_dir / f"{folder}__проект_ресурса_отчет.docx")).paragraphs)
+        assert f"Серия {folder}" in text
@@ -0,0 +1,77 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from columnar_store import (
+    MANIFEST_FILE,
+    STORE_VERSION,
+    TESTS_DATASET,
+    THICKNESS_DATASET,
+    THICKNESS_GROUP_COLUMNS,
+    dataset_columns,
+    dataset_frame,
+    open_store,
+    reduce_store_tubes,
+    write_store,
+)
+from resource_core import make_test_dataframe
+from thickness_maps import reduce_tube_thickness
+
+
+@pytest.fixture
+def readings():
+    """Замеры вперемешку по трубам, с повторяющимися минимумами и пропусками диаметра."""
+    rng = np.random.default_rng(7)
+    n = 500
+    return pd.DataFrame({
+        "Змеевик": rng.choice(["1", "2", "10"], n),
+        "Труба": rng.choice([str(i) for i in range(1, 9)], n),
+        "Позиция": np.arange(n, dtype=float),
+        "Толщина": np.round(rng.uniform(4.0, 6.5, n), 1),
+        "Диаметр": np.where(rng.random(n) < 0.2, np.nan, np.round(rng.uniform(32.0, 33.0, n), 2)),
+    })
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "архив.rstore")
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 37, 10_000])
+def test_store_reduction_matches_table_reduction(readings, store_path, chunk_rows):
+    write_store(store_path, {THICKNESS_DATASET: readings}, group_by={THICKNESS_DATASET: THICKNESS_GROUP_COLUMNS})
+    tubes = reduce_store_tubes(open_store(store_path), chunk_rows=chunk_rows)
+    pd.testing.assert_frame_equal(tubes, reduce_tube_thickness(readings), check_dtype=False)
+
+
+def test_round_trip_and_memory_mapping(test_records, store_path):
+    tests = make_test_dataframe(test_records)
+    write_store(store_path, {TESTS_DATASET: tests}, metadata={"source": "испытания.xlsx"})
+    store = open_store(store_path)
+    assert store["manifest"]["metadata"] == {"source": "испытания.xlsx"}
+    assert all(isinstance(array, np.memmap) for array in dataset_columns(store, TESTS_DATASET).values())
+    pd.testing.assert_frame_equal(dataset_frame(store, TESTS_DATASET), tests, check_dtype=False)
+    assert dataset_frame(store, TESTS_DATASET, ["T_C"]).columns.tolist() == ["T_C"]
+
+    # Повторная запись заменяет хранилище целиком и не оставляет временных каталогов
+    write_store(store_path, {TESTS_DATASET: tests.head(2)})
+    assert len(dataset_frame(open_store(store_path), TESTS_DATASET)) == 2
+    assert os.listdir(os.path.dirname(store_path)) == [os.path.basename(store_path)]
+
+
+def test_unsupported_stores_rejected(readings, store_path):
+    with pytest.raises(FileNotFoundError):
+        open_store(store_path)
+
+    manifest = write_store(store_path, {THICKNESS_DATASET: readings})
+    with pytest.raises(ValueError):
+        reduce_store_tubes(open_store(store_path))
+
+    manifest["version"] = STORE_VERSION + 1
+    with open(os.path.join(store_path, MANIFEST_FILE), "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file)
+    with pytest.raises(ValueError):
+        open_store(store_path)
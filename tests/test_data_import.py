@@ -0,0 +1,81 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from resource_core import (
+    CHANGELOG_MAX_CELLS,
+    detect_excel_engine,
+    diff_test_data,
+    make_test_dataframe,
+    read_test_excel,
+    # Имя функции начинается с test_: под ним pytest принял бы ее за тест
+    test_data_records as project_test_records,
+    validate_test_data,
+)
+
+
+def excel_bytes(frame: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    frame.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def test_excel_tests_read_with_group_alias(test_records):
+    frame = pd.DataFrame(test_records).rename(columns={"Группа_аппроксимации": "Группа"})
+    frame["Группа"] = frame["Группа"].astype(object)
+    frame.loc[5, "Группа"] = "нет"
+    frame["Примечание"] = "лишний столбец"
+    data = excel_bytes(frame)
+    assert detect_excel_engine(data) == "openpyxl"
+
+    records, missing = read_test_excel(data)
+    assert missing == []
+    assert [record["Группа_аппроксимации"] for record in records] == [1, 1, 1, 1, 1, 0]
+    assert [record["tau_h"] for record in records] == [float(record["tau_h"]) for record in test_records]
+    assert set(records[0]) == {"Образец", "sigma_MPa", "T_C", "tau_h", "Группа_аппроксимации"}
+
+
+def test_excel_without_required_columns(test_records):
+    records, missing = read_test_excel(excel_bytes(pd.DataFrame(test_records).drop(columns=["T_C", "tau_h"])))
+    assert records == []
+    assert missing == ["T_C", "tau_h"]
+
+
+@pytest.mark.parametrize("data, engine", [(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1rest", "xlrd"), (b"<html>", None)])
+def test_excel_engine_detected_by_signature(data, engine):
+    assert detect_excel_engine(data) == engine
+
+
+def test_table_validation_and_records(test_records):
+    test_data = make_test_dataframe(test_records + [
+        {"Образец": None, "sigma_MPa": "много", "T_C": 600, "tau_h": 0.5, "Группа_аппроксимации": 1.5},
+    ])
+    assert test_data["Образец"].iloc[-1] == ""
+    checks = validate_test_data(test_data)
+    assert checks.iloc[:-1].all().all()
+    assert checks.iloc[-1].tolist() == [False, True, False, False]
+
+    records = project_test_records(test_data)
+    assert records[-1]["sigma_MPa"] is None
+    assert records[0]["sigma_MPa"] == 150.0
+
+
+def test_diff_lists_changed_cells(test_records):
+    previous = make_test_dataframe(test_records)
+    current = previous.drop(index=0)
+    current.loc[3, "T_C"] = 625.0
+    current.loc[4, "sigma_MPa"] = np.nan
+    current.loc[10] = ["Обр.11", 100.0, 600.0, 2000.0, 1.0]
+    diff = diff_test_data(previous, current)
+    assert (diff["добавлено_строк"], diff["удалено_строк"], diff["изменено_ячеек"]) == (1, 1, 2)
+    assert [(cell["строка"], cell["столбец"], cell["стало"]) for cell in diff["ячейки"]][0] == (3, "T_C", 625.0)
+    assert diff["ячейки"][1]["строка"] == 4 and np.isnan(diff["ячейки"][1]["стало"])
+
+
+def test_large_diff_counts_cells_only(test_records):
+    previous = make_test_dataframe(test_records * (CHANGELOG_MAX_CELLS // len(test_records) + 1))
+    diff = diff_test_data(previous, previous.assign(T_C=previous["T_C"] + 1))
+    assert diff["изменено_ячеек"] == len(previous) > CHANGELOG_MAX_CELLS
+    assert "ячейки" not in diff
@@ -0,0 +1,54 @@
+import json
+import os
+
+import pytest
+
+from batch_runner import collect_input_files
+from fleet_rollup import FLEET_INDEX_FILE, fleet_table, summarize_fleet, update_fleet_index
+from resource_core import SOLVER_FIXED_POINT
+
+
+def write_project(path, project) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as project_file:
+        json.dump(project, project_file, ensure_ascii=False)
+
+
+@pytest.fixture
+def fleet_folder(tmp_path, project):
+    for unit, name in (("ТЭЦ-1", "змеевик_1"), ("ТЭЦ-1", "змеевик_2"), ("ТЭЦ-2", "змеевик_3")):
+        write_project(tmp_path / unit / f"{name}.json", project)
+    return tmp_path
+
+
+def test_index_reprocesses_only_changed_files(fleet_folder, project):
+    assert update_fleet_index(str(fleet_folder), workers=1)['reprocessed'] == 3
+    assert update_fleet_index(str(fleet_folder), workers=1)['reprocessed'] == 0
+
+    project['параметры_трубы']['s_min'] = 4.8
+    write_project(fleet_folder / "ТЭЦ-1" / "змеевик_2.json", project)
+    os.remove(fleet_folder / "ТЭЦ-2" / "змеевик_3.json")
+    index = update_fleet_index(str(fleet_folder), workers=1)
+    assert index['reprocessed'] == 1
+    assert sorted(index['files']) == [os.path.join("ТЭЦ-1", "змеевик_1.json"), os.path.join("ТЭЦ-1", "змеевик_2.json")]
+
+    # Другой метод решения делает недействительным весь индекс
+    assert update_fleet_index(str(fleet_folder), method=SOLVER_FIXED_POINT, workers=1)['reprocessed'] == 2
+
+
+def test_index_is_not_collected_as_project(fleet_folder):
+    update_fleet_index(str(fleet_folder), workers=1)
+    assert (fleet_folder / FLEET_INDEX_FILE).exists()
+    (fleet_folder / "сводка_парка.json").write_text("{}", encoding="utf-8")
+    files = [os.path.basename(path) for path in collect_input_files([str(fleet_folder)])]
+    assert sorted(files) == ["змеевик_1.json", "змеевик_2.json", "змеевик_3.json"]
+
+
+def test_summary_marks_failed_files(fleet_folder):
+    (fleet_folder / "ТЭЦ-2" / "битый.json").write_text("{", encoding="utf-8")
+    summary = summarize_fleet(fleet_table(update_fleet_index(str(fleet_folder), workers=1)))
+    units = summary['units'].set_index("Объект")
+    assert units.loc["ТЭЦ-1", "Расчетов"] == 4
+    assert units.loc["ТЭЦ-2", "Без результата"] == 1
+    assert units.loc["ТЭЦ-1", "Худший расчет"].endswith("Расчет 2")
+    assert summary['worst']["Остаточный ресурс, ч"].is_monotonic_increasing
@@ -0,0 +1,72 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from materials import (
+    DEFAULT_C,
+    allowable_parameter,
+    allowable_stress,
+    check_allowable_margin,
+    get_material,
+    load_material_registry,
+    material_names,
+)
+from resource_core import calculate_allowable_curve, set_default_coefficients
+
+CUSTOM_GRADE = {"C": {"Трунина": 30.0}, "allowable_curve": {"A": 30000, "B": 3000, "D": 12.0}}
+
+
+def write_registry(path, specs, modified=None):
+    path.write_text(json.dumps(specs, ensure_ascii=False), encoding="utf-8")
+    if modified is not None:
+        os.utime(path, (modified, modified))
+    return str(path)
+
+
+def test_default_registry():
+    assert material_names()[:3] == ["12Х1МФ", "12Х18Н12Т", "ДИ82"]
+    assert set_default_coefficients("12Х1МФ", "Трунина") == 24.88
+    assert set_default_coefficients("ДИ82", "Ларсона-Миллера") == 30.0
+    assert set_default_coefficients("Неизвестная", "Трунина") == DEFAULT_C
+    sigma, P_allow, _ = calculate_allowable_curve("Неизвестная")
+    np.testing.assert_array_equal(P_allow, get_material("12Х1МФ")['plot_P'])
+    with pytest.raises(ValueError):
+        sigma[0] = 0.0
+
+
+def test_allowable_stress_inverts_curve():
+    material = get_material("12Х18Н12Т")
+    sigma = np.array([25.0, 60.0, 140.0])
+    np.testing.assert_allclose(allowable_stress(material, allowable_parameter(sigma, material['curve'])), sigma,
+                               rtol=1e-4)
+    # Вне диапазона кривой σ_доп не определено
+    assert np.isnan(allowable_stress(material, [0.0, 100.0])).all()
+
+    margin = check_allowable_margin(material, allowable_parameter(sigma, material['curve']), sigma * 1.1)
+    # Точка выше кривой: запас положителен и по напряжению, и по параметру
+    np.testing.assert_allclose(margin['stress_margin'], 0.1, rtol=1e-3)
+    assert np.all(margin['P_margin'] > 0)
+
+
+def test_custom_registry_reloaded_on_change(tmp_path):
+    path = write_registry(tmp_path / "materials.json", {"Сталь 20": CUSTOM_GRADE}, modified=1_000_000)
+    assert material_names(path) == ["Сталь 20"]
+    assert load_material_registry(path) is load_material_registry(path)
+
+    write_registry(tmp_path / "materials.json", {"Сталь 20": CUSTOM_GRADE, "15Х1М1Ф": CUSTOM_GRADE},
+                   modified=2_000_000)
+    assert material_names(path) == ["Сталь 20", "15Х1М1Ф"]
+    assert get_material("15Х1М1Ф", path)['C'] == {"Трунина": 30.0}
+
+
+@pytest.mark.parametrize("spec", [
+    {"C": {}},
+    {"allowable_curve": {"A": 30000, "B": -3000, "D": 0.0}},
+    {"allowable_curve": {"A": 30000, "B": 3000, "D": 12.0}, "sigma_range": [150, 20]},
+])
+def test_invalid_grade_rejected(tmp_path, spec):
+    path = write_registry(tmp_path / "materials.json", {"Сталь 20": spec})
+    with pytest.raises(ValueError, match="Сталь 20"):
+        load_material_registry(path)
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+import monte_carlo
+from conftest import C_TRUNIN
+from monte_carlo import DEFAULT_UNCERTAINTY, run_monte_carlo
+
+
+def test_same_seed_gives_same_distribution(pipe_params, approx):
+    first = run_monte_carlo(pipe_params, approx, "Трунина", C_TRUNIN, DEFAULT_UNCERTAINTY, 5000, seed=7)
+    second = run_monte_carlo(pipe_params, approx, "Трунина", C_TRUNIN, DEFAULT_UNCERTAINTY, 5000, seed=7)
+    assert first['n_solved'] == 5000
+    assert first['percentiles'] == second['percentiles']
+    other = run_monte_carlo(pipe_params, approx, "Трунина", C_TRUNIN, DEFAULT_UNCERTAINTY, 5000, seed=8)
+    assert other['percentiles'] != first['percentiles']
+
+
+def test_process_pool_matches_serial_run(pipe_params, approx, monkeypatch):
+    monkeypatch.setattr(monte_carlo, "MONTE_CARLO_CHUNK_SIZE", 2000)
+    serial = run_monte_carlo(pipe_params, approx, "Трунина", C_TRUNIN, DEFAULT_UNCERTAINTY, 6000, workers=1)
+    monkeypatch.setattr(monte_carlo, "MONTE_CARLO_PARALLEL_THRESHOLD", 0)
+    parallel = run_monte_carlo(pipe_params, approx, "Трунина", C_TRUNIN, DEFAULT_UNCERTAINTY, 6000, workers=2)
+    assert parallel['percentiles'] == pytest.approx(serial['percentiles'])
+    assert np.array_equal(parallel['histogram'][0], serial['histogram'][0])
@@ -0,0 +1,154 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import C_TRUNIN
+from operating_history import (
+    SCHEDULE_LIMIT_DAMAGE,
+    accumulate_history_damage,
+    calculate_schedule_life,
+    damage_rate,
+    iterate_history_chunks,
+    parse_schedule_table,
+)
+from resource_core import SOLVER_BRACKETED, build_regression, calculate_residual_resource, corrosion_rate
+
+
+def history_csv(hours: int, time_format: str, **columns) -> bytes:
+    timestamps = pd.date_range("2020-01-01", periods=hours, freq="h")
+    table = {"Время": timestamps.strftime(time_format), "T_C": 545.0, "p_MPa": 14.0}
+    table.update(columns)
+    return pd.DataFrame(table).to_csv(index=False).encode("utf-8")
+
+
+@pytest.mark.parametrize("time_format", ["%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%d.%m.%Y %H:%M"])
+def test_timestamps_parsed_consistently_across_chunks(time_format):
+    # Порция 3000 ч заканчивается 5 января: день ≤ 12 не должен путаться с месяцем
+    chunks = list(iterate_history_chunks(history_csv(20000, time_format), chunk_rows=3000))
+    hours = np.concatenate([chunk["hours"].to_numpy() for chunk in chunks])
+    assert len(chunks) == 7
+    assert not np.isnan(hours).any()
+    np.testing.assert_array_equal(np.diff(hours), 1.0)
+
+
+@pytest.mark.parametrize("time_format", ["%Y-%m-%d %H:%M", "%d.%m.%Y %H:%M"])
+def test_all_operating_hours_counted(time_format, pipe_params, approx):
+    result = accumulate_history_damage(
+        history_csv(20000, time_format), pipe_params, approx, "Трунина", C_TRUNIN, chunk_rows=3000
+    )
+    assert result['operating_hours'] == 19999
+    assert result['skipped_rows'] == 1
+    assert 0 < result['damage'] < 1
+
+
+def test_unreadable_timestamp_drops_only_its_row(pipe_params, approx):
+    table = pd.read_csv(io.BytesIO(history_csv(100, "%Y-%m-%d %H:%M")))
+    # Сбой внутри порции и в первой строке второй порции
+    table.loc[[20, 50], "Время"] = "сбой"
+    result = accumulate_history_damage(table.to_csv(index=False).encode("utf-8"), pipe_params, approx,
+                                       "Трунина", C_TRUNIN, chunk_rows=50)
+    # Интервал после сбоя отсчитывается от последней разобранной метки (2 ч) и засчитывается
+    assert result['operating_hours'] == 99
+    assert result['skipped_rows'] == 3
+
+
+def test_hours_without_time_column(pipe_params, approx):
+    data = pd.DataFrame({"T_C": [545.0] * 10, "p_MPa": [14.0] * 10}).to_csv(index=False).encode("utf-8")
+    result = accumulate_history_damage(data, pipe_params, approx, "Трунина", C_TRUNIN)
+    assert result['operating_hours'] == 9
+
+
+def test_wall_thins_from_reference_thickness(pipe_params, approx):
+    # s_макс > s_н: к концу срока эксплуатации τ_э модельная толщина должна равняться s_мин
+    assert pipe_params['s_max'] > pipe_params['s_nom']
+    hours = 100
+    start_hour = pipe_params['tau_exp'] - (hours - 1)
+    result = accumulate_history_damage(
+        history_csv(hours, "%Y-%m-%d %H:%M"), pipe_params, approx, "Трунина", C_TRUNIN, start_hour=start_hour
+    )
+    assert result['final_thickness'] == pytest.approx(pipe_params['s_min'])
+
+
+def test_corrosion_rate_matches_resource_solver(pipe_params, approx):
+    from operating_history import _damage_model
+    from resource_core import calculate_residual_resource
+
+    details = calculate_residual_resource(
+        pipe_params, approx, "Трунина", C_TRUNIN, "12Х1МФ", pipe_params['s_nom']
+    )[1]
+    assert _damage_model(pipe_params, approx)[2] == pytest.approx(details['v_corr'])
+
+
+def test_decimal_comma_survives_text_cells():
+    # Во второй порции нечисловая ячейка: остальные значения с запятой должны читаться
+    table = pd.DataFrame({"T_C": ["545,5"] * 6, "p_MPa": ["14,2"] * 6})
+    table.loc[4, "T_C"] = "обрыв"
+    source = table.to_csv(index=False, sep=";").encode("utf-8")
+    chunks = list(iterate_history_chunks(source, chunk_rows=3))
+    T_C = np.concatenate([chunk["T_C"].to_numpy() for chunk in chunks])
+    p_MPa = np.concatenate([chunk["p_MPa"].to_numpy() for chunk in chunks])
+    np.testing.assert_array_equal(T_C, [545.5, 545.5, 545.5, 545.5, np.nan, 545.5])
+    np.testing.assert_array_equal(p_MPa, 14.2)
+
+
+def test_schedule_table_parsed_by_scenario():
+    table = pd.DataFrame([
+        {"Сценарий": "Базовый", "Длительность, ч": None, "T_C": 545.0, "p_MPa": 14.0},
+        {"Сценарий": "Форсировка", "Длительность, ч": 20000, "T_C": 560.0, "p_MPa": 14.0},
+        {"Сценарий": "", "Длительность, ч": 1, "T_C": 600.0, "p_MPa": 14.0},
+        {"Сценарий": "Форсировка", "Длительность, ч": None, "T_C": 545.0, "p_MPa": 14.0},
+    ])
+    schedules = parse_schedule_table(table)
+    assert list(schedules) == ["Базовый", "Форсировка"]
+    assert [segment['T_C'] for segment in schedules["Форсировка"]] == [560.0, 545.0]
+
+    table.loc[1, "Длительность, ч"] = None
+    with pytest.raises(ValueError, match="Форсировка"):
+        parse_schedule_table(table)
+
+
+def test_constant_schedule_matches_residual_resource(pipe_params, approx):
+    # Без коррозии повреждаемость при постоянном режиме растет линейно: срок равен τ_р
+    params = dict(pipe_params, s_min=5.2, s_max=5.2, s_nom=5.2)
+    schedules = {
+        "Базовый": [{"hours": np.nan, "T_C": 545.0, "p_MPa": 14.0}],
+        "Форсировка": [{"hours": 20000.0, "T_C": 560.0, "p_MPa": 14.0},
+                       {"hours": np.nan, "T_C": 545.0, "p_MPa": 14.0}],
+        "Горячий": [{"hours": np.nan, "T_C": 560.0, "p_MPa": 14.0}],
+    }
+    forecast = calculate_schedule_life(schedules, params, approx, "Трунина", C_TRUNIN)
+    base, forced, hot = forecast['life']
+    tau_prognoz, _ = calculate_residual_resource(params, approx, "Трунина", C_TRUNIN, "12Х1МФ", params['s_nom'],
+                                                 method=SOLVER_BRACKETED)
+    assert base == pytest.approx(tau_prognoz, rel=1e-3)
+    assert hot < forced < base
+    assert list(forecast['limit']) == [SCHEDULE_LIMIT_DAMAGE] * 3
+
+    exhausted = calculate_schedule_life(schedules, params, approx, "Трунина", C_TRUNIN, initial_damage=1.0)
+    np.testing.assert_array_equal(exhausted['life'], 0.0)
+
+
+def test_corroding_schedule_outlasts_end_of_life_thickness(pipe_params, approx):
+    # При коррозии основной расчет берет τ_р по толщине на конец срока, а график
+    # интегрирует повреждаемость по постепенно утоняющейся стенке
+    schedules = {"Базовый": [{"hours": np.nan, "T_C": pipe_params['T_rab_C'], "p_MPa": pipe_params['p_MPa']}]}
+    life = calculate_schedule_life(schedules, pipe_params, approx, "Трунина", C_TRUNIN)['life'][0]
+    tau_prognoz, _ = calculate_residual_resource(pipe_params, approx, "Трунина", C_TRUNIN, "12Х1МФ",
+                                                 pipe_params['s_nom'], method=SOLVER_BRACKETED)
+    no_corrosion = dict(pipe_params, s_max=pipe_params['s_min'], s_nom=pipe_params['s_min'])
+    tau_uncorroded, _ = calculate_residual_resource(no_corrosion, approx, "Трунина", C_TRUNIN, "12Х1МФ",
+                                                    no_corrosion['s_nom'], method=SOLVER_BRACKETED)
+    assert tau_prognoz < life < tau_uncorroded
+    assert life == pytest.approx(176408, rel=1e-3)
+    assert tau_prognoz == pytest.approx(134437, rel=1e-3)
+
+    # Срок по графику — момент, когда интеграл 1/τ_р по утоняющейся стенке достигает 1
+    a, b, _ = build_regression(approx['P_values'], approx['sigma_values'])
+    v_corr = corrosion_rate(pipe_params['s_nom'], pipe_params['s_max'], pipe_params['s_min'], pipe_params['tau_exp'])
+    edges = np.linspace(0.0, life, 100001)
+    middle = (edges[1:] + edges[:-1]) / 2
+    rate = damage_rate(pipe_params['T_rab_C'], pipe_params['p_MPa'], pipe_params['s_min'] - v_corr * middle,
+                       pipe_params['d_max'], a, b - np.log10(pipe_params['k_zapas']), "Трунина", C_TRUNIN)
+    assert np.sum(rate * np.diff(edges)) == pytest.approx(1.0, rel=1e-4)
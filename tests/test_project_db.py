@@ -0,0 +1,127 @@
+import copy
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from project_db import (
+    DB_SCHEMA_VERSION,
+    calculation_history,
+    distinct_values,
+    list_projects,
+    load_project,
+    main,
+    open_database,
+    open_shared_database,
+    query_calculations,
+    save_project,
+)
+
+
+@pytest.fixture
+def database(tmp_path):
+    connection = open_database(str(tmp_path / "проекты.sqlite"))
+    yield connection
+    connection.close()
+
+
+def test_schema_has_query_indexes(database):
+    indexes = {row[0] for row in database.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"projects_steel", "projects_series", "projects_parameter", "projects_saved_at",
+            "calculations_tau"} <= indexes
+    assert database.execute("PRAGMA user_version").fetchone()[0] == DB_SCHEMA_VERSION
+
+
+def test_newer_schema_is_rejected(tmp_path):
+    path = str(tmp_path / "новая.sqlite")
+    connection = sqlite3.connect(path)
+    connection.execute(f"PRAGMA user_version = {DB_SCHEMA_VERSION + 1}")
+    connection.close()
+    with pytest.raises(ValueError):
+        open_database(path)
+
+
+def test_save_and_load_round_trip(database, project):
+    revision = save_project(database, project, "Котел 1", "ТЭЦ-1", saved_at="2024-05-01T10:00:00")
+    assert load_project(database, revision) == project
+    counts = list_projects(database).iloc[0]
+    assert (counts["Испытаний"], counts["Расчетов"]) == (len(project["испытания"]), 2)
+    with pytest.raises(KeyError):
+        load_project(database, revision + 1)
+
+
+def test_queries_use_latest_revision_and_filters(database, project):
+    save_project(database, project, "Котел 1", "ТЭЦ-1", saved_at="2024-05-01T10:00:00")
+    thinner = copy.deepcopy(project)
+    thinner["параметры_трубы"]["s_min"] = 5.0
+    save_project(database, thinner, "Котел 1", "ТЭЦ-1", saved_at="2025-05-01T10:00:00")
+    other_steel = dict(copy.deepcopy(project), марка_стали="15Х1М1Ф")
+    save_project(database, other_steel, "Котел 2", "ТЭЦ-2", saved_at="2025-06-01T10:00:00")
+
+    assert len(list_projects(database)) == 2
+    assert len(list_projects(database, latest_only=False)) == 3
+    assert distinct_values(database, 'steel_grade') == ["12Х1МФ", "15Х1М1Ф"]
+
+    latest = query_calculations(database, steel_grades=["12Х1МФ"])
+    assert set(latest["Ревизия"]) == {2}
+    tau = latest["Остаточный ресурс, ч"]
+    assert tau.is_monotonic_increasing
+    limited = query_calculations(database, steel_grades=["12Х1МФ"], max_tau=tau.iloc[-1])
+    assert len(limited) == 1
+
+    by_date = query_calculations(database, date_from="2024-01-01", date_to="2024-05-01", latest_only=False)
+    assert set(by_date["Ревизия"]) == {1}
+
+    history = calculation_history(database, "Котел 1", "ТЭЦ-1")
+    assert list(history.index) == ["2024-05-01T10:00:00", "2025-05-01T10:00:00"]
+    assert history["Основной расчет"].iloc[1] < history["Основной расчет"].iloc[0]
+
+
+def test_distinct_values_rejects_unknown_column(database):
+    with pytest.raises(ValueError):
+        distinct_values(database, "project_json")
+
+
+def test_command_line_keeps_same_named_projects_apart(tmp_path, project):
+    for unit, series in (("котел_1", "Серия 1"), ("котел_2", "Серия 2")):
+        (tmp_path / "архив" / unit).mkdir(parents=True)
+        with open(tmp_path / "архив" / unit / "проект_ресурса.json", "w", encoding="utf-8") as project_file:
+            json.dump(dict(project, название_серии=series), project_file, ensure_ascii=False)
+
+    path = str(tmp_path / "проекты.sqlite")
+    assert main([path, str(tmp_path / "архив")]) == 0
+    assert main([path, str(tmp_path / "архив"), "--unit", "ТЭЦ-1"]) == 0
+    connection = open_database(path)
+    try:
+        projects = list_projects(connection).sort_values("Ревизия")
+    finally:
+        connection.close()
+    assert projects[["Объект", "Проект", "Серия"]].values.tolist() == [
+        ["котел_1", "проект_ресурса", "Серия 1"],
+        ["котел_2", "проект_ресурса", "Серия 2"],
+        ["ТЭЦ-1", "котел_1/проект_ресурса", "Серия 1"],
+        ["ТЭЦ-1", "котел_2/проект_ресурса", "Серия 2"],
+    ]
+
+
+def test_shared_database_serializes_threads(tmp_path, project):
+    shared = open_shared_database(str(tmp_path / "проекты.sqlite"))
+
+    def save_and_read(number):
+        with shared['lock']:
+            revision = save_project(shared['connection'], project, f"Проект {number}")
+        with shared['lock']:
+            return revision, load_project(shared['connection'], revision)["название_серии"]
+
+    try:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            saved = list(executor.map(save_and_read, range(12)))
+        projects = list_projects(shared['connection'])
+    finally:
+        shared['connection'].close()
+    assert len({revision for revision, _ in saved}) == 12
+    assert all(series == project["название_серии"] for _, series in saved)
+    # Каждая ревизия получила ровно свои испытания и расчеты
+    assert projects["Испытаний"].eq(len(project["испытания"])).all()
+    assert projects["Расчетов"].eq(len(project["resource_calculations"])).all()
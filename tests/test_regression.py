@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from conftest import C_TRUNIN
+from resource_core import (
+    SOLVER_BRACKETED,
+    build_group_approximations,
+    build_regression_statistics,
+    calculate_lower_prediction_parameter,
+    calculate_regression_bands,
+    calculate_residual_resource,
+    evaluate_C_candidates,
+    fit_parameter_C,
+    prepare_project_tests,
+    student_t_critical,
+)
+
+
+@pytest.mark.parametrize("level, dof, expected", [
+    (0.95, 1, 12.706), (0.95, 4, 2.776), (0.99, 10, 3.169), (0.90, 30, 1.697), (0.95, 2, 4.303),
+])
+def test_student_t_critical(level, dof, expected):
+    assert student_t_critical(level, dof) == pytest.approx(expected, abs=1e-3)
+
+
+def test_student_t_without_degrees_of_freedom():
+    assert np.isnan(student_t_critical(0.95, 0))
+
+
+def test_statistics_match_least_squares_covariance(approx):
+    P_values, sigma_values = approx['P_values'], approx['sigma_values']
+    statistics = build_regression_statistics(P_values, sigma_values)
+    _, cov = np.polyfit(P_values, np.log10(sigma_values), 1, cov=True)
+    np.testing.assert_allclose(statistics['cov'], cov, rtol=1e-6)
+    assert statistics['dof'] == len(P_values) - 2
+
+
+def test_bands_nested_around_regression(test_records):
+    # Вторая группа из двух точек: разброс по ней не оценить
+    records = test_records + [
+        {"Образец": "Обр.7", "sigma_MPa": 100, "T_C": 600, "tau_h": 2000, "Группа_аппроксимации": 2},
+        {"Образец": "Обр.8", "sigma_MPa": 80, "T_C": 620, "tau_h": 3000, "Группа_аппроксимации": 2},
+    ]
+    approximations, _ = build_group_approximations(
+        prepare_project_tests(records, "Трунина", C_TRUNIN), [1, 2], {}, "Трунина"
+    )
+    sigma = np.linspace(50, 160, 12)
+    bands = calculate_regression_bands(approximations, sigma, 0.95)
+    assert list(bands) == [1]
+    (conf_low, conf_high), (pred_low, pred_high) = bands[1]['confidence'], bands[1]['prediction']
+    assert np.all((pred_low < conf_low) & (conf_low < sigma) & (sigma < conf_high) & (conf_high < pred_high))
+    wider = calculate_regression_bands(approximations, sigma, 0.99)[1]['prediction']
+    assert np.all(wider[0] < pred_low)
+
+
+def test_lower_prediction_bound_and_conservative_resource(pipe_params, approx):
+    statistics = approx['statistics']
+    t_value = student_t_critical(0.95, statistics['dof'])
+    log_sigma = np.log10([60.0, 90.0, 120.0])
+    P_lower, _ = calculate_lower_prediction_parameter(log_sigma, statistics['a'], statistics['b'], statistics, t_value)
+    half_width = t_value * np.sqrt(statistics['residual_variance'] * (
+        1 + 1 / statistics['n'] + (P_lower - statistics['P_mean']) ** 2 / statistics['Sxx']
+    ))
+    np.testing.assert_allclose(statistics['a'] * P_lower + statistics['b'] - half_width, log_sigma, atol=1e-10)
+    assert np.all(P_lower < (log_sigma - statistics['b']) / statistics['a'])
+
+    def solve(lower_prediction):
+        return calculate_residual_resource(pipe_params, approx, "Трунина", C_TRUNIN, "12Х1МФ", pipe_params['s_nom'],
+                                           method=SOLVER_BRACKETED, lower_prediction=lower_prediction)
+
+    tau_mean, _ = solve(None)
+    tau_lower, details = solve((statistics, t_value))
+    assert details['converged']
+    assert tau_lower < tau_mean
+
+
+def synthetic_tests(C, a=-0.166, b=5.226, noise=0.0):
+    """Испытания двух групп, точно (или с шумом) лежащие на регрессиях при заданном C."""
+    rng = np.random.default_rng(3)
+    records = []
+    for group, shift in ((1, 0.0), (2, 0.05)):
+        for sigma, T_C in ((150, 560), (120, 580), (95, 600), (70, 620), (60, 630)):
+            T_K = T_C + 273.15
+            P = (np.log10(sigma) - b - shift) / a + noise * rng.standard_normal()
+            tau_h = 10 ** (P * 1000 / T_K + 2 * np.log10(T_K) - C)
+            records.append({"Образец": f"Обр.{len(records) + 1}", "sigma_MPa": sigma, "T_C": T_C,
+                            "tau_h": tau_h, "Группа_аппроксимации": group})
+    return prepare_project_tests(records, "Трунина", C)
+
+
+def test_fit_recovers_generating_C():
+    df_tests = synthetic_tests(23.5)
+    assert len(df_tests) == 10
+    fit = fit_parameter_C(df_tests, [1, 2], {"1": "Прямые"}, "Трунина")
+    assert fit['C'] == pytest.approx(23.5, abs=1e-3)
+    assert fit['pooled_R2'] == pytest.approx(1.0)
+    assert not fit['flat']
+    assert list(fit['curve'].columns) == ["C", "Сводный R²", "Прямые", "Группа 2"]
+
+
+def test_candidate_R2_matches_group_regressions():
+    df_tests = synthetic_tests(24.0, noise=0.2)
+    assert len(df_tests) == 10
+    scan = evaluate_C_candidates(df_tests, [1, 2], "Трунина", [18.0, 24.0])
+    for row, C in enumerate((18.0, 24.0)):
+        approximations, _ = build_group_approximations(prepare_project_tests(df_tests, "Трунина", C), [1, 2], {},
+                                                       "Трунина")
+        np.testing.assert_allclose(scan['R2'][row], [approximations[group]['R2'] for group in (1, 2)])
+
+
+def test_fit_at_single_temperature_is_flat(test_records):
+    df_tests = prepare_project_tests([dict(record, T_C=600) for record in test_records], "Трунина", C_TRUNIN)
+    assert fit_parameter_C(df_tests, [1], {}, "Трунина")['flat']
+    with pytest.raises(ValueError):
+        fit_parameter_C(df_tests, [2], {}, "Трунина")
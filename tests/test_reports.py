@@ -0,0 +1,33 @@
+import io
+
+import pytest
+
+from conftest import C_TRUNIN
+from resource_core import build_word_documents, calculate_parameter_P, format_word_table_number, prepare_project_tests
+
+docx = pytest.importorskip("docx")
+
+
+def table_text(document_bytes: bytes):
+    table = docx.Document(io.BytesIO(document_bytes)).tables[0]
+    return [[cell.text for cell in row.cells] for row in table.rows]
+
+
+def test_word_numbers_without_trailing_zeros():
+    assert [format_word_table_number(value) for value in (545.0, 0.5, 14.25, 2.999)] == ["545", "0,5", "14,25", "3"]
+
+
+def test_word_documents_list_every_test(test_records):
+    test_records[0]["Образец"] = " Обр. 1 "
+    df_tests = prepare_project_tests(test_records, "Трунина", C_TRUNIN)
+    word_table, word_report = build_word_documents("Серия 1", df_tests, "Трунина", C_TRUNIN)
+
+    rows = table_text(word_table)
+    assert rows[0] == ["Образец", "Напряжение, σ, МПа", "Температура, °C", "Длительность испытания, ч"]
+    assert rows[1] == [" Обр. 1 ", "150", "560", "800"]
+    assert len(rows) == len(df_tests) + 1
+
+    report = table_text(word_report)
+    P_values = calculate_parameter_P(df_tests["T_C"].to_numpy() + 273.15, df_tests["tau_h"].to_numpy(), "Трунина",
+                                     C_TRUNIN)
+    assert [row[4] for row in report[1:]] == [f"{P:.2f}".replace(".", ",") for P in P_values]
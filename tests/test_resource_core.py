@@ -0,0 +1,211 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import C_TRUNIN
+from resource_core import (
+    BRACKETED_TOLERANCE,
+    FIXED_POINT_TOLERANCE,
+    REJECTION_HORIZONS_DEFAULT,
+    RESIDUAL_ERROR_MESSAGES,
+    RESIDUAL_ERROR_THICKNESS,
+    RESIDUAL_OK,
+    SOLVER_BRACKETED,
+    SOLVER_FIXED_POINT,
+    build_regression,
+    calculate_pipe_stress,
+    calculate_rejection_stress,
+    calculate_rejection_thickness,
+    calculate_residual_resource,
+    calculate_residual_resource_batch,
+    calculation_fingerprint,
+    solve_project,
+    store_calculation_result,
+    stored_calculation_result,
+)
+
+
+def reference_residual_resource(params, approx, selected_param, C, s_nom):
+    """Исходная скалярная демпфированная итерация (до пакетного решателя): (τ_прогн, сходимость)."""
+    T_rab = params['T_rab_C'] + 273.15
+    a, b, _ = build_regression(approx['P_values'], approx['sigma_values'] / params['k_zapas'])
+    s_max, s_min = params['s_max'], params['s_min']
+    v_corr = ((s_max - s_min) if s_max > s_nom else (s_nom - s_min)) / params['tau_exp']
+    tau_prognoz = 50000.0
+    for _ in range(100):
+        s_min2 = s_min - v_corr * tau_prognoz
+        if s_min2 <= 0:
+            return None, False
+        P_rab = (np.log10(calculate_pipe_stress(params['p_MPa'], params['d_max'], s_min2)) - b) / a
+        if selected_param == "Трунина":
+            tau_r = 10 ** (P_rab / T_rab * 1000 + 2 * np.log10(T_rab) - C)
+        else:
+            tau_r = 10 ** (P_rab / T_rab * 1000 - C)
+        if not np.isfinite(tau_r) or tau_r <= 0:
+            return None, False
+        delta = tau_prognoz - tau_r
+        if abs(delta) <= 200:
+            return tau_prognoz, True
+        tau_prognoz = max(tau_prognoz - np.clip(delta * 0.5, -10000, 10000), 0) or 1000
+    return tau_prognoz, False
+
+
+@pytest.fixture
+def parameter_grid(pipe_params):
+    s_min, T_rab_C, p_MPa = np.meshgrid([3.0, 4.0, 4.6, 5.2, 5.8], [500.0, 530.0, 545.0, 570.0], [10.0, 14.0, 25.0])
+    grid = {name: np.full(s_min.size, value) for name, value in pipe_params.items()}
+    grid.update(s_min=s_min.ravel(), T_rab_C=T_rab_C.ravel(), p_MPa=p_MPa.ravel())
+    return grid
+
+
+def solve_grid(grid, approx, **options):
+    return calculate_residual_resource_batch(
+        grid['s_min'], grid['s_max'], grid['d_max'], grid['p_MPa'], grid['T_rab_C'], grid['tau_exp'],
+        grid['k_zapas'], approx, "Трунина", C_TRUNIN, grid['s_nom'], **options
+    )
+
+
+def test_batch_matches_scalar_reference(parameter_grid, approx):
+    batch = solve_grid(parameter_grid, approx, method=SOLVER_FIXED_POINT)
+    for i in range(parameter_grid['s_min'].size):
+        params = {name: float(values[i]) for name, values in parameter_grid.items()}
+        tau_prognoz, converged = reference_residual_resource(params, approx, "Трунина", C_TRUNIN, params['s_nom'])
+        if tau_prognoz is None:
+            assert batch['error_code'][i] != RESIDUAL_OK
+        else:
+            assert batch['tau_prognoz'][i] == pytest.approx(tau_prognoz, rel=1e-9)
+            assert bool(batch['converged'][i]) == converged
+
+
+def test_worn_wall_reports_thickness_error(pipe_params, approx):
+    worn = dict(pipe_params, s_min=0.5, tau_exp=1000.0)
+    assert reference_residual_resource(worn, approx, "Трунина", C_TRUNIN, worn['s_nom']) == (None, False)
+    tau_prognoz, details = calculate_residual_resource(
+        worn, approx, "Трунина", C_TRUNIN, "12Х1МФ", worn['s_nom'], method=SOLVER_FIXED_POINT
+    )
+    assert tau_prognoz is None
+    assert details['error'] == RESIDUAL_ERROR_MESSAGES[RESIDUAL_ERROR_THICKNESS]
+
+
+def test_scalar_wrapper_matches_batch(pipe_params, approx):
+    tau_prognoz, details = calculate_residual_resource(
+        pipe_params, approx, "Трунина", C_TRUNIN, "12Х1МФ", pipe_params['s_nom'], method=SOLVER_FIXED_POINT
+    )
+    batch = calculate_residual_resource_batch(
+        *(pipe_params[name] for name in ('s_min', 's_max', 'd_max', 'p_MPa', 'T_rab_C', 'tau_exp', 'k_zapas')),
+        approx, "Трунина", C_TRUNIN, pipe_params['s_nom'], method=SOLVER_FIXED_POINT
+    )
+    assert tau_prognoz == batch['tau_prognoz'][0]
+    assert len(details['iterations']) == batch['iteration_count'][0]
+
+
+def test_bracketed_converges_to_tolerance(parameter_grid, approx):
+    batch = solve_grid(parameter_grid, approx, method=SOLVER_BRACKETED)
+    assert batch['converged'].all()
+    assert np.all(np.abs(batch['delta']) <= BRACKETED_TOLERANCE)
+
+
+def test_bracketed_agrees_with_fixed_point(parameter_grid, approx):
+    fixed_point = solve_grid(parameter_grid, approx, method=SOLVER_FIXED_POINT)
+    bracketed = solve_grid(parameter_grid, approx, method=SOLVER_BRACKETED)
+    converged = fixed_point['converged']
+    assert converged.any()
+    np.testing.assert_allclose(
+        bracketed['tau_prognoz'][converged], fixed_point['tau_prognoz'][converged], atol=FIXED_POINT_TOLERANCE
+    )
+
+
+def test_bracketed_warm_start_saves_iterations(parameter_grid, approx):
+    cold = solve_grid(parameter_grid, approx, method=SOLVER_BRACKETED)
+    warm = solve_grid(parameter_grid, approx, method=SOLVER_BRACKETED, tau_start=cold['tau_prognoz'] * 1.01)
+    np.testing.assert_allclose(warm['tau_prognoz'], cold['tau_prognoz'], atol=BRACKETED_TOLERANCE)
+    assert warm['iteration_count'].sum() < cold['iteration_count'].sum()
+
+
+def test_unknown_method_rejected(pipe_params, approx):
+    with pytest.raises(ValueError):
+        solve_grid({name: np.array([value]) for name, value in pipe_params.items()}, approx, method="secant")
+
+
+def test_rejection_thickness_round_trip(pipe_params, approx):
+    horizons = np.asarray(REJECTION_HORIZONS_DEFAULT)
+    sigma_allow = calculate_rejection_stress(
+        approx, pipe_params['T_rab_C'], horizons, pipe_params['k_zapas'], "Трунина", C_TRUNIN
+    )
+    s_rejection = calculate_rejection_thickness(
+        sigma_allow, pipe_params['d_max'], pipe_params['p_MPa'], pipe_params['s_nom'],
+        pipe_params['s_max'], pipe_params['tau_exp'], horizons
+    )[0]
+    assert np.all(np.diff(s_rejection) > 0)
+
+    grid = {name: np.full(horizons.size, value) for name, value in pipe_params.items()}
+    grid['s_min'] = s_rejection
+    batch = solve_grid(grid, approx, method=SOLVER_BRACKETED, tolerance=1e-3)
+    np.testing.assert_allclose(batch['tau_prognoz'], horizons, rtol=1e-6)
+
+    grid['s_min'] = s_rejection + 0.05
+    assert np.all(solve_grid(grid, approx, method=SOLVER_BRACKETED)['tau_prognoz'] > horizons)
+
+
+def test_rejection_stress_shape(approx):
+    sigma_allow = calculate_rejection_stress(approx, [530.0, 545.0, 560.0], REJECTION_HORIZONS_DEFAULT, 1.5,
+                                             "Трунина", C_TRUNIN)
+    assert sigma_allow.shape == (3, len(REJECTION_HORIZONS_DEFAULT))
+    # Чем выше температура и длиннее горизонт, тем ниже допускаемое напряжение
+    assert np.all(np.diff(sigma_allow, axis=0) < 0) and np.all(np.diff(sigma_allow, axis=1) < 0)
+
+
+def test_fingerprint_hit_and_miss(pipe_params, approx):
+    fingerprint = calculation_fingerprint(pipe_params, approx, "Трунина", C_TRUNIN, "12Х1МФ", SOLVER_BRACKETED, 1.0)
+    calc = {"id": 2, "params": dict(pipe_params)}
+    assert stored_calculation_result(calc, fingerprint) is None
+
+    store_calculation_result(calc, fingerprint, 12345.0, {"converged": True})
+    assert stored_calculation_result(calc, fingerprint) == (12345.0, {"converged": True})
+    # Значения, равные как числа, дают тот же отпечаток
+    same = dict(pipe_params, tau_exp=int(pipe_params['tau_exp']))
+    assert calculation_fingerprint(same, approx, "Трунина", C_TRUNIN, "12Х1МФ", SOLVER_BRACKETED, 1) == fingerprint
+
+    changed = [
+        calculation_fingerprint(dict(pipe_params, s_min=5.1), approx, "Трунина", C_TRUNIN, "12Х1МФ",
+                                SOLVER_BRACKETED, 1.0),
+        calculation_fingerprint(pipe_params, approx, "Трунина", 25.0, "12Х1МФ", SOLVER_BRACKETED, 1.0),
+        calculation_fingerprint(pipe_params, approx, "Трунина", C_TRUNIN, "12Х1МФ", SOLVER_FIXED_POINT, 1.0),
+        calculation_fingerprint(pipe_params, dict(approx, sigma_values=approx['sigma_values'] * 1.01), "Трунина",
+                                C_TRUNIN, "12Х1МФ", SOLVER_BRACKETED, 1.0),
+    ]
+    assert all(stored_calculation_result(calc, other) is None for other in changed)
+
+
+def test_solve_project_reuses_stored_results(project):
+    first = solve_project(project, method=SOLVER_BRACKETED)
+    assert not any(calc['reused'] for calc in first['calculations'])
+    for calc, result in zip(project['resource_calculations'], first['calculations']):
+        fingerprint = calculation_fingerprint(
+            result['params'], first['approximations'][result['selected_group']], first['selected_param'],
+            first['C'], first['steel_grade'], SOLVER_BRACKETED, BRACKETED_TOLERANCE
+        )
+        store_calculation_result(calc, fingerprint, result['tau_prognoz'], result['details'])
+
+    second = solve_project(project, method=SOLVER_BRACKETED)
+    assert all(calc['reused'] for calc in second['calculations'])
+    assert [calc['tau_prognoz'] for calc in second['calculations']] == [
+        calc['tau_prognoz'] for calc in first['calculations']
+    ]
+
+    project['resource_calculations'][1]['params']['s_min'] = 4.5
+    third = solve_project(project, method=SOLVER_BRACKETED)
+    assert [calc['reused'] for calc in third['calculations']] == [True, False]
+    assert third['calculations'][1]['tau_prognoz'] < first['calculations'][1]['tau_prognoz']
+    assert not any(calc['reused'] for calc in solve_project(project, method=SOLVER_FIXED_POINT)['calculations'])
+
+
+def test_core_modules_do_not_import_streamlit():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    modules = sorted(name[:-3] for name in os.listdir(root) if name.endswith(".py") and name != "app.py")
+    code = f"import sys\nfor name in {modules!r}:\n    __import__(name)\nprint('streamlit' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
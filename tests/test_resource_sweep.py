@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from conftest import C_TRUNIN
+from resource_core import SOLVER_BRACKETED, calculate_residual_resource
+from resource_sweep import calculate_resource_sweep, sweep_axis, sweep_table
+
+
+def test_sweep_nodes_match_scalar_solver(pipe_params, approx):
+    sweep = calculate_resource_sweep(pipe_params, approx, "Трунина", C_TRUNIN, [530.0, 545.0, 560.0], [10.0, 14.0],
+                                     k_values=[1.0, 1.5])
+    assert sweep['tau'].shape == (2, 3, 2)
+    assert sweep['solved_points'] == 12
+    for (k_index, T_index, p_index), tau in np.ndenumerate(sweep['tau']):
+        params = dict(pipe_params, k_zapas=sweep['k'][k_index], T_rab_C=sweep['T'][T_index], p_MPa=sweep['p'][p_index])
+        expected, _ = calculate_residual_resource(params, approx, "Трунина", C_TRUNIN, "12Х1МФ", params['s_nom'],
+                                                  method=SOLVER_BRACKETED)
+        assert tau == pytest.approx(expected)
+    assert len(sweep_table(sweep)) == sweep['tau'].size
+
+
+def test_sweep_reuses_previous_nodes(pipe_params, approx):
+    first = calculate_resource_sweep(pipe_params, approx, "Трунина", C_TRUNIN, sweep_axis(520, 560, 5),
+                                     sweep_axis(10, 16, 4))
+    # Ось расширена: пересчитываются только новые температуры
+    T_values = sweep_axis(500, 560, 7)
+    second = calculate_resource_sweep(pipe_params, approx, "Трунина", C_TRUNIN, T_values, sweep_axis(10, 16, 4),
+                                      previous=first)
+    assert second['solved_points'] == 2 * 4
+    full = calculate_resource_sweep(pipe_params, approx, "Трунина", C_TRUNIN, T_values, sweep_axis(10, 16, 4))
+    np.testing.assert_array_equal(second['tau'], full['tau'])
+
+    # Другие прочие входные данные — пересчитывается вся сетка
+    thinner = calculate_resource_sweep(dict(pipe_params, s_min=5.0), approx, "Трунина", C_TRUNIN, T_values,
+                                       sweep_axis(10, 16, 4), previous=full)
+    assert thinner['solved_points'] == full['tau'].size
+    assert np.all(thinner['tau'] < full['tau'])
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from conftest import C_TRUNIN
+from resource_core import (
+    SOLVER_BRACKETED,
+    build_group_approximations,
+    calculate_residual_resource,
+    prepare_project_tests,
+)
+from sensitivity import SENSITIVITY_PARAMETERS, calculate_sensitivity, sensitivity_C_values
+
+STEP = 0.02
+
+
+@pytest.fixture
+def approximations_by_C(test_records):
+    approximations = {}
+    for C in (C_TRUNIN, *sensitivity_C_values(C_TRUNIN, STEP)):
+        df_tests = prepare_project_tests(test_records, "Трунина", C)
+        approximations[C] = build_group_approximations(df_tests, [1], {}, "Трунина")[0]
+    return approximations
+
+
+def solve(params, approx, C):
+    tau_prognoz, _ = calculate_residual_resource(params, approx, "Трунина", C, "12Х1МФ", params['s_nom'],
+                                                 method=SOLVER_BRACKETED)
+    return tau_prognoz
+
+
+def test_variants_match_scalar_solver(pipe_params, approximations_by_C):
+    calculations = [
+        {'name': "Основной", 'params': pipe_params, 'group': 1},
+        {'name': "Без группы", 'params': pipe_params, 'group': 2},
+    ]
+    table = calculate_sensitivity(calculations, approximations_by_C, "Трунина", C_TRUNIN, step=STEP)
+    assert table["Расчет"].unique().tolist() == ["Основной"]
+    assert table["Параметр"].tolist() == list(SENSITIVITY_PARAMETERS.values())
+
+    rows = table.set_index("Параметр")
+    approx = approximations_by_C[C_TRUNIN][1]
+    assert rows["Ресурс, ч"].iloc[0] == pytest.approx(solve(pipe_params, approx, C_TRUNIN))
+    assert rows.loc["s_мин", "Ресурс при +δ, ч"] == pytest.approx(
+        solve(dict(pipe_params, s_min=pipe_params['s_min'] * (1 + STEP)), approx, C_TRUNIN)
+    )
+    # Температура отклоняется в кельвинах
+    T_low = (pipe_params['T_rab_C'] + 273.15) * (1 - STEP) - 273.15
+    assert rows.loc["T_раб", "Ресурс при −δ, ч"] == pytest.approx(
+        solve(dict(pipe_params, T_rab_C=T_low), approx, C_TRUNIN)
+    )
+    C_high = C_TRUNIN * (1 + STEP)
+    assert rows.loc["C", "Ресурс при +δ, ч"] == pytest.approx(
+        solve(pipe_params, approximations_by_C[C_high][1], C_high)
+    )
+
+
+def test_elasticity_signs(pipe_params, approximations_by_C):
+    table = calculate_sensitivity([{'name': "Основной", 'params': pipe_params, 'group': 1}], approximations_by_C,
+                                  "Трунина", C_TRUNIN, step=STEP)
+    elasticity = table.set_index("Параметр")["Эластичность"]
+    assert elasticity["s_мин"] > 0
+    assert elasticity["T_раб"] < 0 and elasticity["p"] < 0 and elasticity["k_зап"] < 0
+    assert np.isfinite(elasticity).all()
+
+
+def test_no_approximated_calculations(pipe_params, approximations_by_C):
+    table = calculate_sensitivity([{'name': "Без группы", 'params': pipe_params, 'group': 3}], approximations_by_C,
+                                  "Трунина", C_TRUNIN, step=STEP)
+    assert table.empty
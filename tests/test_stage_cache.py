@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from resource_core import (
+    STAGE_CACHE_MAX_ENTRIES,
+    cached_stage,
+    create_stage_cache,
+    hash_stage_inputs,
+    peek_stage,
+    stage_cache_stats,
+    stage_is_cached,
+)
+
+
+def counting(value):
+    calls = []
+
+    def compute():
+        calls.append(value)
+        return value
+    return compute, calls
+
+
+def test_inputs_hashed_by_value():
+    frame = pd.DataFrame({"T_C": [545.0, 560.0], "p_MPa": [14.0, 14.0]})
+    key = hash_stage_inputs((frame, {"b": 1, "a": np.float64(2.0)}))
+    assert key == hash_stage_inputs((frame.copy(), {"a": 2.0, "b": 1}))
+    assert hash_stage_inputs(frame) != hash_stage_inputs(frame.assign(T_C=[545.0, 561.0]))
+    assert hash_stage_inputs(np.arange(3.0)) != hash_stage_inputs(np.arange(3))
+    assert hash_stage_inputs([1, 2]) != hash_stage_inputs([[1], 2])
+
+
+def test_stage_hit_and_miss():
+    cache = create_stage_cache()
+    compute, calls = counting("P")
+    assert cached_stage(cache, "P", (1.0, "Трунина"), compute) == "P"
+    assert cached_stage(cache, "P", (1.0, "Трунина"), compute) == "P"
+    assert stage_is_cached(cache, "P", (1.0, "Трунина"))
+    assert not stage_is_cached(cache, "P", (2.0, "Трунина"))
+    assert not stage_is_cached(cache, "Регрессия", (1.0, "Трунина"))
+    cached_stage(cache, "P", (2.0, "Трунина"), compute)
+    assert calls == ["P", "P"]
+
+    stats = stage_cache_stats(cache).set_index("Этап")
+    assert stats.loc["P", ["Попадания", "Промахи", "Записей"]].tolist() == [1, 2, 2]
+
+
+def test_peek_does_not_count_hits():
+    cache = create_stage_cache()
+    cached_stage(cache, "Word", ("Серия 1", 24.88), lambda: (b"table", b"report"))
+    cached_stage(cache, "P", 1.0, lambda: "P")
+    for _ in range(3):
+        assert peek_stage(cache, "Word", ("Серия 1", 24.88)) == (b"table", b"report")
+    assert peek_stage(cache, "Word", ("Серия 2", 24.88)) is None
+    assert peek_stage(cache, "Регрессия", 1.0) is None
+
+    stats = stage_cache_stats(cache).set_index("Этап")
+    assert stats.loc["Word", ["Попадания", "Промахи"]].tolist() == [0, 1]
+    # Порядок вытеснения тоже не меняется: первой по-прежнему идет запись Word
+    assert next(iter(cache['lru']))[0] == "Word"
+
+
+def test_least_recently_used_entry_evicted():
+    cache = create_stage_cache()
+    for key in range(STAGE_CACHE_MAX_ENTRIES):
+        cached_stage(cache, "График", key, lambda: key)
+    cached_stage(cache, "График", 0, lambda: None)
+    cached_stage(cache, "График", STAGE_CACHE_MAX_ENTRIES, lambda: None)
+    # Запись 0 недавно использована, поэтому вытеснена запись 1
+    assert stage_is_cached(cache, "График", 0)
+    assert not stage_is_cached(cache, "График", 1)
+    assert cache['evictions'] == {"График": 1}
+
+
+def test_memory_budget_shared_by_stages():
+    cache = create_stage_cache(memory_budget=3 * 1024)
+    cached_stage(cache, "Документ", "отчет", lambda: b"x" * 1024)
+    cached_stage(cache, "График", "png", lambda: b"x" * 1024)
+    cached_stage(cache, "Документ", "отчет", lambda: None)
+    cached_stage(cache, "Ресурс", "таблица", lambda: np.zeros(256))
+    assert cache['memory_used'] <= cache['memory_budget']
+    # Вытеснен давно не использованный график, а не недавно прочитанный отчет
+    assert stage_is_cached(cache, "Документ", "отчет")
+    assert not stage_is_cached(cache, "График", "png")
+    assert cache['evictions'] == {"График": 1}
+
+    # Значение больше бюджета остается единственной записью
+    cached_stage(cache, "Документ", "большой", lambda: b"x" * 4096)
+    assert list(cache['lru']) == [("Документ", hash_stage_inputs("большой"))]
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from conftest import C_TRUNIN
+from resource_core import SOLVER_BRACKETED, calculate_residual_resource, calculate_rejection_stress
+from thickness_maps import (
+    calculate_tube_rejection,
+    calculate_tube_resources,
+    rank_worst_tubes,
+    read_thickness_map,
+    reduce_tube_thickness,
+    rejection_column,
+    summarize_tube_rejection,
+)
+
+# Карта в формате отечественных программ: «;» и десятичная запятая
+THICKNESS_MAP_CSV = """Змеевик;Труба;Позиция;Толщина, мм
+1;1;1;5,9
+1;1;2;5,4
+1;2;1;6,1
+1;2;2;6,0
+2;1;1;4,1
+2;1;2;нет
+2;1;3;4,8
+2;2;1;0
+2;2;2;5,6
+""".encode("utf-8")
+
+
+@pytest.fixture
+def tubes():
+    readings, missing = read_thickness_map(THICKNESS_MAP_CSV, "карта.csv")
+    assert missing == []
+    return reduce_tube_thickness(readings)
+
+
+def test_missing_columns_reported():
+    readings, missing = read_thickness_map("Змеевик,Труба\n1,1\n".encode("utf-8"), "карта.csv")
+    assert readings.empty
+    assert missing == ["Позиция", "Толщина"]
+
+
+def test_readings_reduced_per_tube(tubes):
+    assert list(zip(tubes["Змеевик"], tubes["Труба"])) == [("1", "1"), ("1", "2"), ("2", "1"), ("2", "2")]
+    # Нечисловые и нулевые толщины отброшены
+    assert tubes["Замеров"].tolist() == [2, 2, 2, 1]
+    assert tubes["s_min"].tolist() == [5.4, 6.0, 4.1, 5.6]
+    assert tubes["s_max"].tolist() == [5.9, 6.1, 4.8, 5.6]
+    assert tubes["Позиция s_мин"].tolist() == [2, 2, 1, 2]
+
+
+def test_tube_resources_match_scalar_solver(tubes, pipe_params, approx):
+    results = calculate_tube_resources(tubes, pipe_params, approx, "Трунина", C_TRUNIN)
+    for _, tube in results.iterrows():
+        params = dict(pipe_params, s_min=tube["s_min"], s_max=tube["s_max"])
+        tau_prognoz, _ = calculate_residual_resource(
+            params, approx, "Трунина", C_TRUNIN, "12Х1МФ", params['s_nom'], method=SOLVER_BRACKETED
+        )
+        assert tube["Остаточный ресурс, ч"] == pytest.approx(tau_prognoz)
+        assert tube["Ошибка"] == ""
+    assert rank_worst_tubes(results, 1)["Труба"].tolist() == ["1"]
+    assert rank_worst_tubes(results, 1)["Змеевик"].tolist() == ["2"]
+
+
+def test_tube_rejection_summary(tubes, pipe_params, approx):
+    horizons = [8760.0, 87600.0]
+    sigma_allow = calculate_rejection_stress(
+        approx, pipe_params['T_rab_C'], horizons, pipe_params['k_zapas'], "Трунина", C_TRUNIN
+    )
+    rejection = calculate_tube_rejection(tubes, pipe_params, sigma_allow, horizons)
+    assert np.all(rejection[rejection_column(87600.0)] > rejection[rejection_column(8760.0)])
+
+    summary = summarize_tube_rejection(rejection, horizons)
+    expected = [int((rejection["s_min"] < rejection[rejection_column(horizon)]).sum()) for horizon in horizons]
+    assert summary["Труб к замене"].tolist() == expected
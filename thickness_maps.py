@@ -0,0 +1,204 @@
+"""Остаточный ресурс труб пакета змеевиков по картам ультразвуковой толщинометрии.
+
+Карта — таблица замеров «змеевик — труба — позиция — толщина» (CSV или Excel).
+Замеры каждой трубы сводятся к определяющей минимальной толщине одной групповой
+операцией, а остаточный ресурс всех труб рассчитывается одним вызовом пакетного
+решателя.
+"""
+import io
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from matplotlib import colormaps
+from matplotlib.figure import Figure
+
+from resource_core import (
+    BRACKETED_TOLERANCE,
+    RESIDUAL_ERROR_MESSAGES,
+    SOLVER_BRACKETED,
+    calculate_rejection_thickness,
+    calculate_residual_resource_batch,
+    detect_excel_engine,
+    parse_numbers,
+)
+
+# Столбцы карты и допустимые варианты их названий в файле
+THICKNESS_MAP_COLUMNS = {
+    "Змеевик": ["Змеевик", "coil"],
+    "Труба": ["Труба", "tube"],
+    "Позиция": ["Позиция", "position"],
+    "Толщина": ["Толщина", "Толщина, мм", "thickness"],
+}
+THICKNESS_MAP_OPTIONAL_COLUMNS = {
+    "Диаметр": ["Диаметр", "Диаметр, мм", "diameter"],
+}
+
+WORST_TUBES_DEFAULT = 20
+
+
+def _read_table(data: bytes, filename: str) -> pd.DataFrame:
+    if filename.lower().endswith((".xlsx", ".xls")):
+        return pd.read_excel(io.BytesIO(data), engine=detect_excel_engine(data))
+    # CSV из отечественных программ обычно с «;» и десятичной запятой
+    header = data[:4096].decode("utf-8-sig", errors="ignore").splitlines()[0] if data else ""
+    if ";" in header:
+        return pd.read_csv(io.BytesIO(data), sep=";", decimal=",", encoding="utf-8-sig")
+    return pd.read_csv(io.BytesIO(data), encoding="utf-8-sig")
+
+
+def read_thickness_map(data: bytes, filename: str) -> Tuple[pd.DataFrame, List[str]]:
+    """Читает карту толщин и возвращает (замеры, отсутствующие столбцы).
+
+    Строки с нечисловой или неположительной толщиной отбрасываются.
+    """
+    raw = _read_table(data, filename)
+    raw.columns = [str(column).strip() for column in raw.columns]
+    columns = {**THICKNESS_MAP_COLUMNS, **THICKNESS_MAP_OPTIONAL_COLUMNS}
+    found = {
+        name: next((alias for alias in aliases if alias in raw.columns), None)
+        for name, aliases in columns.items()
+    }
+    missing = [name for name in THICKNESS_MAP_COLUMNS if found[name] is None]
+    if missing:
+        return pd.DataFrame(), missing
+
+    readings = pd.DataFrame({
+        "Змеевик": raw[found["Змеевик"]].astype(str),
+        "Труба": raw[found["Труба"]].astype(str),
+        "Позиция": parse_numbers(raw[found["Позиция"]]),
+        "Толщина": parse_numbers(raw[found["Толщина"]]),
+    })
+    if found["Диаметр"] is not None:
+        readings["Диаметр"] = parse_numbers(raw[found["Диаметр"]])
+    readings = readings[np.isfinite(readings["Толщина"]) & (readings["Толщина"] > 0)]
+    return readings.reset_index(drop=True), []
+
+
+def reduce_tube_thickness(readings: pd.DataFrame) -> pd.DataFrame:
+    """Сводит замеры к одной строке на трубу: s_мин, s_макс, позиция минимума, d_макс.
+
+    Змеевики и трубы сохраняют порядок первого появления в файле.
+    """
+    grouped = readings.groupby(["Змеевик", "Труба"], sort=False)
+    aggregations = {
+        "Замеров": ("Толщина", "size"),
+        "s_min": ("Толщина", "min"),
+        "s_max": ("Толщина", "max"),
+    }
+    if "Диаметр" in readings.columns:
+        aggregations["d_max"] = ("Диаметр", "max")
+    tubes = grouped.agg(**aggregations)
+    tubes["Позиция s_мин"] = readings["Позиция"].values[grouped["Толщина"].idxmin().values]
+    return tubes.reset_index()
+
+
+def calculate_tube_resources(tubes: pd.DataFrame, pipe_params: Dict, approx: Dict, selected_param: str,
+                             C: float, method: str = SOLVER_BRACKETED,
+                             tolerance: float = BRACKETED_TOLERANCE) -> pd.DataFrame:
+    """Остаточный ресурс всех труб одним пакетным расчетом.
+
+    Толщины (и диаметр, если он есть в карте) берутся по трубам, остальные
+    параметры — общие параметры трубы расчета.
+    """
+    d_max = pipe_params['d_max']
+    if "d_max" in tubes.columns:
+        d_max = tubes["d_max"].fillna(pipe_params['d_max']).values
+    batch = calculate_residual_resource_batch(
+        tubes["s_min"].values, tubes["s_max"].values, d_max, pipe_params['p_MPa'],
+        pipe_params['T_rab_C'], pipe_params['tau_exp'], pipe_params['k_zapas'],
+        approx, selected_param, C, pipe_params['s_nom'], method=method, tolerance=tolerance
+    )
+    results = tubes.copy()
+    tau_prognoz = np.where(batch['converged'], batch['tau_prognoz'], np.nan)
+    results["Остаточный ресурс, ч"] = tau_prognoz
+    results["Остаточный ресурс, лет"] = tau_prognoz / 8760
+    results["Ошибка"] = [
+        RESIDUAL_ERROR_MESSAGES.get(int(code), "") if code else ("" if converged else "Нет сходимости")
+        for code, converged in zip(batch['error_code'], batch['converged'])
+    ]
+    return results
+
+
+def rejection_column(horizon: float) -> str:
+    return f"s_отбр на {horizon:,.0f} ч, мм"
+
+
+def calculate_tube_rejection(tubes: pd.DataFrame, pipe_params: Dict, sigma_allow: np.ndarray,
+                             horizons: List[float]) -> pd.DataFrame:
+    """Отбраковочная толщина всех труб для каждого горизонта.
+
+    ``sigma_allow`` — таблица calculate_rejection_stress для режима трубы. Для
+    каждой трубы и горизонта возвращает толщину s_отбр и признак «заменить до
+    горизонта» (текущая s_мин меньше s_отбр или горизонт недостижим).
+    """
+    d_max = pipe_params['d_max']
+    if "d_max" in tubes.columns:
+        d_max = tubes["d_max"].fillna(pipe_params['d_max']).values
+    thickness = calculate_rejection_thickness(
+        sigma_allow, d_max, pipe_params['p_MPa'], pipe_params['s_nom'], tubes["s_max"].values,
+        pipe_params['tau_exp'], horizons
+    )
+    thickness = np.broadcast_to(thickness, (len(tubes), len(horizons)))
+    rejection = tubes[["Змеевик", "Труба", "s_min"]].copy()
+    for column, horizon in enumerate(horizons):
+        rejection[rejection_column(horizon)] = thickness[:, column]
+    return rejection
+
+
+def summarize_tube_rejection(rejection: pd.DataFrame, horizons: List[float]) -> pd.DataFrame:
+    """Число труб, которые нужно заменить до каждого горизонта."""
+    rows = []
+    for horizon in horizons:
+        thickness = rejection[rejection_column(horizon)]
+        replace = ~(rejection["s_min"] >= thickness)
+        rows.append({
+            "Горизонт, ч": f"{horizon:,.0f}",
+            "Горизонт, лет": round(horizon / 8760, 1),
+            "Труб к замене": int(replace.sum()),
+            "Доля труб": f"{replace.mean():.1%}",
+        })
+    return pd.DataFrame(rows)
+
+
+def rank_worst_tubes(results: pd.DataFrame, count: int = WORST_TUBES_DEFAULT) -> pd.DataFrame:
+    """Трубы с наименьшим остаточным ресурсом; трубы с ошибкой расчета — первыми."""
+    return results.sort_values("Остаточный ресурс, ч", na_position='first', kind="stable").head(count)
+
+
+def build_tube_heatmap(results: pd.DataFrame, title: str, figsize: Tuple[float, float],
+                       max_labels: int = 40) -> Figure:
+    """Тепловая карта остаточного ресурса (лет): строки — змеевики, столбцы — трубы."""
+    years = results.pivot(index="Змеевик", columns="Труба", values="Остаточный ресурс, лет")
+    years = years.reindex(index=results["Змеевик"].unique(), columns=results["Труба"].unique())
+
+    fig = Figure(figsize=figsize)
+    ax = fig.add_subplot()
+    # Трубы без результата (ошибка расчета) закрашиваются серым
+    cmap = colormaps['RdYlGn'].with_extremes(bad='lightgray')
+    image = ax.imshow(np.ma.masked_invalid(years.values), aspect='auto', cmap=cmap, interpolation='nearest')
+    fig.colorbar(image, ax=ax, label="Остаточный ресурс, лет")
+
+    for axis, labels, set_ticks, set_labels in (
+        ("x", years.columns, ax.set_xticks, ax.set_xticklabels),
+        ("y", years.index, ax.set_yticks, ax.set_yticklabels),
+    ):
+        step = max(1, int(np.ceil(len(labels) / max_labels)))
+        positions = np.arange(0, len(labels), step)
+        set_ticks(positions)
+        set_labels([labels[i] for i in positions], fontsize=7, rotation=90 if axis == "x" else 0)
+
+    ax.set_xlabel("Труба")
+    ax.set_ylabel("Змеевик")
+    ax.set_title(title, fontsize=11)
+    return fig
+
+
+def summarize_tube_resources(results: pd.DataFrame) -> Dict[str, Optional[float]]:
+    """Число труб, число труб с ошибкой и минимальный ресурс по пакету."""
+    tau = results["Остаточный ресурс, ч"]
+    return {
+        'tubes': len(results),
+        'failed': int(tau.isna().sum()),
+        'min_tau': float(tau.min()) if tau.notna().any() else None,
+    }